@@ -0,0 +1,32 @@
+import pathlib
+import timeit
+
+from npiai.utils import CompactMarkdownConverter, LxmlMarkdownConverter
+
+CORPUS_DIR = pathlib.Path(__file__).parent / "corpus"
+
+
+def bench(converter, htmls, number: int = 5) -> float:
+    return min(
+        timeit.repeat(
+            lambda: [converter.convert(html) for html in htmls],
+            number=number,
+            repeat=5,
+        )
+    )
+
+
+def main():
+    # repeat the corpus to get a page-sized workload
+    htmls = [f.read_text() for f in sorted(CORPUS_DIR.glob("*.html"))] * 20
+
+    baseline = bench(CompactMarkdownConverter(), htmls)
+    fast = bench(LxmlMarkdownConverter(), htmls)
+
+    print(f"CompactMarkdownConverter: {baseline:.3f}s")
+    print(f"LxmlMarkdownConverter:    {fast:.3f}s")
+    print(f"Speedup: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
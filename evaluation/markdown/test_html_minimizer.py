@@ -0,0 +1,46 @@
+import pathlib
+
+import pytest
+from playwright.async_api import async_playwright
+
+from npiai.tools.scrapers.utils import DEFAULT_ALLOWED_ATTRIBUTES
+from npiai.utils import html_to_markdown
+
+CORPUS_DIR = pathlib.Path(__file__).parent / "corpus"
+NPI_UTILS_JS = (
+    pathlib.Path(__file__).parents[2] / "npiai/core/browser/assets/npi-utils.js"
+)
+
+corpus = sorted(CORPUS_DIR.glob("*.html"))
+
+
+@pytest.fixture(scope="module")
+async def page():
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        page = await browser.new_page()
+        yield page
+        await browser.close()
+
+
+@pytest.mark.parametrize("file", corpus, ids=[f.name for f in corpus])
+async def test_minimized_markdown_parity(page, file: pathlib.Path):
+    await page.set_content(file.read_text())
+    await page.add_script_tag(content=NPI_UTILS_JS.read_text())
+
+    # the top-level elements and their children stand for the scraped items
+    items = await page.evaluate(
+        """(attributes) => {
+            npi.setAllowedAttributes(attributes);
+
+            return [...document.querySelectorAll('body > *, body > * > *')].map(
+                elem => [elem.outerHTML, npi.minimizeHTML(elem)],
+            );
+        }""",
+        DEFAULT_ALLOWED_ATTRIBUTES,
+    )
+
+    assert items
+
+    for raw, minimized in items:
+        assert html_to_markdown(minimized) == html_to_markdown(raw)
@@ -0,0 +1,34 @@
+import pathlib
+
+import pytest
+
+from npiai.utils import CompactMarkdownConverter, LxmlMarkdownConverter
+
+CORPUS_DIR = pathlib.Path(__file__).parent / "corpus"
+
+corpus = sorted(CORPUS_DIR.glob("*.html"))
+
+snippets = [
+    "plain text only",
+    "<td>cell</td>",
+    "<pre>\ncode\n</pre>",
+    "<ul><li>a<!-- comment --> b</li></ul>",
+    "<input type=checkbox checked><input type=radio><input type=text>",
+    "<a href='https://a.com'>https://a.com</a> <a>no href</a> &amp; &lt;tag&gt;",
+]
+
+
+@pytest.mark.parametrize("file", corpus, ids=[f.name for f in corpus])
+def test_corpus_parity(file: pathlib.Path):
+    html = file.read_text()
+
+    assert LxmlMarkdownConverter().convert(html) == CompactMarkdownConverter().convert(
+        html
+    )
+
+
+@pytest.mark.parametrize("html", snippets)
+def test_snippet_parity(html: str):
+    assert LxmlMarkdownConverter().convert(html) == CompactMarkdownConverter().convert(
+        html
+    )
@@ -0,0 +1,46 @@
+import pytest
+
+from npiai import Context
+from npiai.tools.scrapers.page_analyzer import PageAnalyzer
+
+from testdata import testdata
+
+# candidate thresholds of a fast path that skips the LLM for confident candidates
+CONFIDENCE_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9]
+
+# (url, confidence, whether the candidate is the expected button) of the evaluated pages
+results = []
+
+
+@pytest.fixture(scope="module", autouse=True)
+def report_hit_rate(request):
+    yield
+
+    if not results:
+        return
+
+    reporter = request.config.pluginmanager.get_plugin("terminalreporter")
+
+    for threshold in CONFIDENCE_THRESHOLDS:
+        hits = [
+            correct for _, confidence, correct in results if confidence >= threshold
+        ]
+        false_positives = len(hits) - sum(hits)
+        reporter.write_line(
+            f"Pagination scorer at {threshold:.1f}: "
+            f"hit rate {len(hits)}/{len(results)} "
+            f"({100.0 * len(hits) / len(results):.0f}%), "
+            f"false positives {false_positives}/{len(hits) or 1} "
+            f"({100.0 * false_positives / (len(hits) or 1):.0f}%)"
+        )
+
+
+@pytest.mark.parametrize("data", testdata)
+async def test_pagination_heuristics(data):
+    async with PageAnalyzer() as analyzer:
+        await analyzer.load_page(ctx=Context(), url=data["url"], full_rendering=True)
+        candidate = await analyzer.find_pagination_candidate()
+        confidence = candidate["confidence"] if candidate else 0
+        correct = bool(candidate) and candidate["selector"] == data["pagination_button"]
+
+        results.append((data["url"], confidence, correct))
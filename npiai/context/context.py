@@ -80,7 +80,8 @@ class Context:
     def llm(self) -> LLM:
         if self._llm is None:
             # raise AttributeError("LLM Client has not been set")
-            return OpenAI(
+            # keep the default client so that its stats are preserved across calls
+            self._llm = OpenAI(
                 api_key=os.environ.get("OPENAI_API_KEY", None),
                 model="gpt-4o",
             )
@@ -1,10 +1,17 @@
-from npiai.core.browser import PlaywrightContext, NavigatorAgent
+from npiai.core.browser import (
+    PlaywrightContext,
+    BrowserPool,
+    ResourcePolicy,
+    NavigatorAgent,
+)
 from .hitl import HITL
 from .base import BaseTool
 
 __all__ = [
     "BaseTool",
     "PlaywrightContext",
+    "BrowserPool",
+    "ResourcePolicy",
     "NavigatorAgent",
     "HITL",
 ]
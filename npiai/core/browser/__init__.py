@@ -1,4 +1,28 @@
 from ._playwright import PlaywrightContext
+from ._pool import BrowserPool, get_browser_pool, stop_browser_pools
+from ._resource_policy import ResourcePolicy, DEFAULT_BLOCKED_DOMAINS
+from ._screenshot import (
+    ImageFormat,
+    IMAGE_TOKEN_TILE_SIZE,
+    DEFAULT_TILE_SIZE,
+    capture_screenshot,
+    capture_screenshot_tiles,
+    to_data_url,
+)
 from npiai.core.browser._navigator import NavigatorAgent
 
-__all__ = ["PlaywrightContext", "NavigatorAgent"]
+__all__ = [
+    "PlaywrightContext",
+    "BrowserPool",
+    "get_browser_pool",
+    "stop_browser_pools",
+    "ResourcePolicy",
+    "DEFAULT_BLOCKED_DOMAINS",
+    "ImageFormat",
+    "IMAGE_TOKEN_TILE_SIZE",
+    "DEFAULT_TILE_SIZE",
+    "capture_screenshot",
+    "capture_screenshot_tiles",
+    "to_data_url",
+    "NavigatorAgent",
+]
@@ -149,6 +149,9 @@ class NavigatorAgent(BrowserAgentTool):
     description = "Perform any task by simulating keyboard/mouse interaction on a specific web page. If the some action needs user confirmation, please specify them."
     system_prompt = __PROMPT__
 
+    # screenshot taken after the last action, which is also the raw screenshot of the next step
+    _action_screenshot: str | None
+
     def __init__(
         self,
         playwright: PlaywrightContext,
@@ -165,6 +168,7 @@ class NavigatorAgent(BrowserAgentTool):
         )
 
         self.max_steps = max_steps
+        self._action_screenshot = None
 
     # navigator uses shared playwright context, so we don't need to start it again here
     async def start(self):
@@ -177,7 +181,14 @@ class NavigatorAgent(BrowserAgentTool):
         self, ctx: Context, task: str, history: List[Response]
     ):
         await self._browser_app.clear_bboxes()
-        raw_screenshot = await self._browser_app.get_screenshot()
+
+        # the bounding boxes are cleared before each action, so the screenshot
+        # sent after the action is reused instead of capturing the same page again
+        raw_screenshot = (
+            self._action_screenshot or await self._browser_app.get_screenshot()
+        )
+        self._action_screenshot = None
+
         elements, added_ids = await self._browser_app.get_interactive_elements(
             raw_screenshot
         )
@@ -240,6 +251,8 @@ class NavigatorAgent(BrowserAgentTool):
 
     async def chat(self, ctx: Context, instruction: str) -> str | None:
         history: List[Response] = []
+        # the page may have changed since the last chat
+        self._action_screenshot = None
 
         step = 0
 
@@ -362,6 +375,7 @@ class NavigatorAgent(BrowserAgentTool):
             await self._browser_app.playwright.page.wait_for_timeout(3000)
 
         # update screenshot after each action
-        await ctx.send_screenshot(await self.get_screenshot())
+        self._action_screenshot = await self.get_screenshot()
+        await ctx.send_screenshot(self._action_screenshot)
 
         return result, elem_json
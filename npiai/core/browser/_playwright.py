@@ -1,8 +1,10 @@
+import functools
+import hashlib
 import os
 import pathlib
 import tempfile
-from textwrap import dedent
-from urllib.request import urlretrieve
+from typing import Dict
+from urllib.request import urlopen
 
 from playwright.async_api import (
     async_playwright,
@@ -14,27 +16,109 @@ from playwright.async_api import (
     StorageState,
     Dialog,
     Download,
+    Route,
+    Error,
 )
 
+from npiai.utils import logger
+
+from ._pool import (
+    BrowserPool,
+    launch_browser,
+    _borrow_shared_pool,
+    _return_shared_pool,
+)
+from ._resource_policy import ResourcePolicy
+
 __BROWSER_UTILS_VERSION__ = "0.0.20"
 
+_ASSETS_DIR = pathlib.Path(__file__).parent / "assets"
+_BROWSER_UTILS_FILENAME = f"browser-utils@{__BROWSER_UTILS_VERSION__}.js"
+
+
+@functools.cache
+def _get_asset_checksums() -> Dict[str, str]:
+    # `sha256sum` output of the vendored scripts, see `make browser-checksums`
+    checksums = {}
+
+    for line in (_ASSETS_DIR / "SHA256SUMS").read_text().splitlines():
+        if line.strip():
+            digest, filename = line.split(maxsplit=1)
+            checksums[filename.lstrip("*")] = digest
+
+    return checksums
+
+
+def _verify_script(filename: str, content: bytes):
+    expected = _get_asset_checksums().get(filename)
 
-def _prepare_browser_utils():
-    # path to the js bundle
+    if expected is None:
+        # TODO: make this fatal once the browser-utils bundle is vendored with its checksum
+        logger.warning(
+            f"No checksum of {filename} in {_ASSETS_DIR / 'SHA256SUMS'}, the script is not verified. "
+            "Run `make browser-checksums` to vendor the browser scripts."
+        )
+        return
+
+    actual = hashlib.sha256(content).hexdigest()
+
+    if actual != expected:
+        raise RuntimeError(
+            f"Integrity check failed for {filename}: expected sha256 {expected}, got {actual}"
+        )
+
+
+def _download_browser_utils() -> bytes:
+    # fallback for source checkouts without the vendored bundle
     cache_dir = pathlib.Path(tempfile.gettempdir()) / ".npi"
-    js_path = cache_dir / f"chrome-utils@{__BROWSER_UTILS_VERSION__}.js"
+    js_path = cache_dir / _BROWSER_UTILS_FILENAME
 
     if js_path.exists():
-        return js_path
+        content = js_path.read_bytes()
+        _verify_script(_BROWSER_UTILS_FILENAME, content)
+        return content
 
     os.makedirs(cache_dir, exist_ok=True)
 
-    urlretrieve(
-        f"https://unpkg.com/@npi-ai/browser-utils@{__BROWSER_UTILS_VERSION__}/dist/index.global.js",
-        js_path,
-    )
+    with urlopen(
+        f"https://unpkg.com/@npi-ai/browser-utils@{__BROWSER_UTILS_VERSION__}/dist/index.global.js"
+    ) as response:
+        content = response.read()
+
+    _verify_script(_BROWSER_UTILS_FILENAME, content)
+
+    # write to a temporary file first so that concurrent processes never read a partial bundle
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".js")
 
-    return js_path
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+
+    os.replace(tmp_path, js_path)
+
+    return content
+
+
+@functools.cache
+def _prepare_browser_utils() -> str:
+    """Get the browser-utils bundle followed by the npi helpers as a single init script"""
+    vendored_path = _ASSETS_DIR / _BROWSER_UTILS_FILENAME
+
+    if vendored_path.exists():
+        browser_utils = vendored_path.read_bytes()
+        _verify_script(_BROWSER_UTILS_FILENAME, browser_utils)
+    else:
+        browser_utils = _download_browser_utils()
+
+    npi_utils = (_ASSETS_DIR / "npi-utils.js").read_bytes()
+    _verify_script("npi-utils.js", npi_utils)
+
+    return "\n".join(
+        [
+            browser_utils.decode(),
+            "window.npi = new window.BrowserUtils();",
+            npi_utils.decode(),
+        ]
+    )
 
 
 class PlaywrightContext:
@@ -47,12 +131,30 @@ class PlaywrightContext:
     page: Page | None
     channel: str | None
     storage_state: str | pathlib.Path | StorageState | None
+    resource_policy: ResourcePolicy | None
+    pool: BrowserPool | None
+    use_shared_pool: bool
+
+    # number of pages loaded since the browser context is created
+    _pages_loaded: int
+
+    # whether the resource policy route is registered on the current browser context
+    _resource_route_registered: bool
+
+    # whether the browser is launched by this context, and closed with it
+    _owns_browser: bool
+
+    # whether the pool is the process-wide pool borrowed by this context, and returned when it stops
+    _borrows_pool: bool
 
     def __init__(
         self,
         headless: bool = True,
         channel: str | None = None,
         storage_state: str | pathlib.Path | StorageState | None = None,
+        resource_policy: ResourcePolicy | None = None,
+        pool: BrowserPool | None = None,
+        use_shared_pool: bool = True,
     ):
         """
         Initialize a Playwright context
@@ -61,6 +163,9 @@ class PlaywrightContext:
             headless: Whether to run playwright in headless mode
             channel: The browser channel to use, see: https://playwright.dev/python/docs/browsers#google-chrome--microsoft-edge
             storage_state: Previously saved state to use for the browser context
+            resource_policy: Policy of the requests to block, e.g. `ResourcePolicy.text_only()`. All resources are loaded if None.
+            pool: Browser pool to get the browser context from. The headless and channel options of the pool are used. If None, the process-wide pool is used, see `use_shared_pool`.
+            use_shared_pool: Whether to get the browser context from the process-wide pool when no pool is given. The pool is stopped with the last context using it, unless it is kept running by `get_browser_pool()`. If False, a dedicated browser is launched and closed with this context.
         """
         self.headless = headless
         self.ready = False
@@ -71,6 +176,13 @@ class PlaywrightContext:
         self.page = None
         self.channel = channel
         self.storage_state = storage_state
+        self.resource_policy = resource_policy
+        self._resource_route_registered = False
+        self.pool = pool
+        self.use_shared_pool = use_shared_pool
+        self._pages_loaded = 0
+        self._owns_browser = False
+        self._borrows_pool = False
 
     async def clone(self):
         state = await self.get_state()
@@ -79,24 +191,58 @@ class PlaywrightContext:
             headless=self.headless,
             channel=self.channel,
             storage_state=state,
+            resource_policy=self.resource_policy,
+            # a clone borrows the shared pool itself, since it may outlive this context
+            pool=None if self._borrows_pool else self.pool,
+            use_shared_pool=self.use_shared_pool,
+        )
+
+    async def new_sibling(self) -> "PlaywrightContext":
+        """
+        Create a started playwright context with a copy of the storage state in a new browser context.
+        The browser context is created on the same browser or from the same pool, so no browser is launched.
+        """
+        sibling = PlaywrightContext(
+            headless=self.headless,
+            channel=self.channel,
+            storage_state=await self.get_state(),
+            resource_policy=self.resource_policy,
+            pool=self.pool,
+            use_shared_pool=self.use_shared_pool,
         )
+        sibling.playwright = self.playwright
+        sibling.browser = self.browser
+
+        if self._borrows_pool:
+            # keep the shared pool running until both contexts are stopped
+            sibling.pool = _borrow_shared_pool(self.headless, self.channel)
+            sibling._borrows_pool = True
+
+        await sibling.restore_state(sibling.storage_state)
+        sibling.ready = True
+
+        return sibling
 
     async def start(self):
         """Start the Playwright chrome"""
         if self.ready:
             return
 
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=self.headless,
-            channel=self.channel,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--disable-extensions",
-                "--disable-file-system",
-            ],
-            # args=["--disable-gpu", "--single-process"],
-        )
+        if self.pool is None and self.use_shared_pool:
+            self.pool = _borrow_shared_pool(self.headless, self.channel)
+            self._borrows_pool = True
+
+        if self.pool:
+            await self.pool.start()
+            self.playwright = self.pool.playwright
+        else:
+            self.playwright = await async_playwright().start()
+            self.browser = await launch_browser(
+                self.playwright,
+                headless=self.headless,
+                channel=self.channel,
+            )
+            self._owns_browser = True
 
         await self.restore_state(self.storage_state)
 
@@ -118,24 +264,26 @@ class PlaywrightContext:
             self.detach_events(self.page)
             self.page = None
         if self.context:
-            await self.context.close()
-            self.context = None
+            await self._close_context()
 
-        self.context = await self.browser.new_context(
+        options = dict(
             locale="en-US",
             bypass_csp=True,
             storage_state=state,
             **self.playwright.devices["Desktop Chrome"],
         )
+
+        if self.pool:
+            self.context = await self.pool.new_context(**options)
+            self.browser = self.context.browser
+        else:
+            self.context = await self.browser.new_context(**options)
+
+        self._pages_loaded = 0
         # self.context.set_default_timeout(3000)
-        await self.context.add_init_script(path=_prepare_browser_utils())
+        await self.context.add_init_script(script=_prepare_browser_utils())
         await self.context.add_init_script(
-            script=dedent(
-                """
-                window.npi = new window.BrowserUtils();
-                window['ga-disable-GA_MEASUREMENT_ID'] = true;
-                """
-            )
+            script="window['ga-disable-GA_MEASUREMENT_ID'] = true;"
         )
 
         def block_route(route):
@@ -153,9 +301,81 @@ class PlaywrightContext:
             block_route,
         )
 
+        self._resource_route_registered = False
+
+        if self.resource_policy:
+            await self._register_resource_route()
+
         self.page = await self.context.new_page()
         self.attach_events(self.page)
 
+    async def _close_context(self):
+        if self.pool:
+            await self.pool.release_context(self.context)
+        else:
+            await self.context.close()
+
+        self.context = None
+
+    async def recycle_if_needed(self) -> bool:
+        """
+        Replace the browser context of a pooled playwright context with a fresh one
+        once the page or memory budget of the pool is exceeded. The storage state is kept.
+        This should be called before loading a new page, since the open pages are closed.
+        """
+        if not self.pool or not self.context:
+            return False
+
+        self._pages_loaded += 1
+
+        if not await self.pool.should_recycle(self.context, self._pages_loaded):
+            return False
+
+        await self.restore_state(await self.get_state())
+        return True
+
+    async def set_resource_policy(self, policy: ResourcePolicy | None):
+        """
+        Change the policy of the requests to block. The policy applies to all pages from the next request on.
+
+        Args:
+            policy: The resource policy. All resources are loaded if None.
+        """
+        self.resource_policy = policy
+
+        if policy and self.context and not self._resource_route_registered:
+            await self._register_resource_route()
+
+    async def _register_resource_route(self):
+        # registered only when needed since routing every request adds a round trip,
+        # the handler falls back to the other routes once the policy is removed
+        await self.context.route("**/*", self._route_resource)
+        self._resource_route_registered = True
+
+    async def _route_resource(self, route: Route):
+        request = route.request
+        policy = self.resource_policy
+
+        if (
+            policy
+            and not self._is_main_frame_navigation(route)
+            and policy.should_block(request.resource_type, request.url)
+        ):
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    @staticmethod
+    def _is_main_frame_navigation(route: Route) -> bool:
+        try:
+            return (
+                route.request.is_navigation_request()
+                and route.request.frame.parent_frame is None
+            )
+        except Error:
+            # requests from service workers have no frame
+            return False
+
     def attach_events(self, page: Page):
         page.on("dialog", self.on_dialog)
         page.on("download", self.on_download)
@@ -222,9 +442,23 @@ class PlaywrightContext:
         """
         self.ready = False
         self.closed = True
-        await self.context.close()
-        await self.browser.close()
-        await self.playwright.stop()
+
+        if self.page:
+            self.detach_events(self.page)
+            self.page = None
+
+        await self._close_context()
+
+        # pooled and shared browsers are kept running for the other sessions
+        if self._owns_browser:
+            await self.browser.close()
+            await self.playwright.stop()
+            self._owns_browser = False
+
+        if self._borrows_pool:
+            pool, self.pool = self.pool, None
+            self._borrows_pool = False
+            await _return_shared_pool(pool)
 
     async def __aenter__(self):
         await self.start()
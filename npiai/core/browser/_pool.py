@@ -0,0 +1,364 @@
+import asyncio
+from typing import Dict, List, Set, Tuple
+
+from playwright.async_api import (
+    async_playwright,
+    Playwright,
+    Browser,
+    BrowserContext,
+)
+
+from npiai.utils import logger
+
+BROWSER_LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--disable-extensions",
+    "--disable-file-system",
+    # `performance.memory` is bucketed and only refreshed every few minutes otherwise,
+    # see `BrowserPool.should_recycle`
+    "--enable-precise-memory-info",
+]
+
+
+async def launch_browser(
+    playwright: Playwright,
+    headless: bool = True,
+    channel: str | None = None,
+) -> Browser:
+    return await playwright.chromium.launch(
+        headless=headless,
+        channel=channel,
+        args=BROWSER_LAUNCH_ARGS,
+        # args=["--disable-gpu", "--single-process"],
+    )
+
+
+class _PooledBrowser:
+    browser: Browser
+    # number of open contexts
+    active: int
+    # number of contexts created since the launch
+    served: int
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.active = 0
+        self.served = 0
+
+
+class BrowserPool:
+    """
+    Keep warm Chromium instances and hand out isolated browser contexts.
+
+    All pooled browsers share one playwright driver. Contexts are distributed to the
+    least busy browser, and a browser is relaunched after it has served
+    `max_contexts_per_browser` contexts to release the memory leaked by long sessions.
+
+    Usage:
+        pool = BrowserPool(size=2)
+
+        async with PlaywrightContext(pool=pool) as playwright:
+            ...
+    """
+
+    size: int
+    headless: bool
+    channel: str | None
+    max_contexts_per_browser: int
+    max_pages_per_context: int | None
+    max_js_heap_size: int | None
+    playwright: Playwright | None
+
+    _browsers: List[_PooledBrowser]
+    _contexts: Dict[BrowserContext, _PooledBrowser]
+    # number of pages opened in each context
+    _pages_opened: Dict[BrowserContext, int]
+    _lock: asyncio.Lock | None
+
+    def __init__(
+        self,
+        size: int = 1,
+        headless: bool = True,
+        channel: str | None = None,
+        max_contexts_per_browser: int = 100,
+        max_pages_per_context: int | None = 50,
+        max_js_heap_size: int | None = 512 * 1024 * 1024,
+    ):
+        """
+        Initialize a browser pool
+
+        Args:
+            size: Number of browser processes to keep running.
+            headless: Whether to run the browsers in headless mode.
+            channel: The browser channel to use, see: https://playwright.dev/python/docs/browsers#google-chrome--microsoft-edge
+            max_contexts_per_browser: Number of contexts served by a browser before it is relaunched.
+            max_pages_per_context: Number of pages opened or loaded in a context before it should be recycled. None to disable.
+            max_js_heap_size: JS heap size in bytes of a context before it should be recycled. None to disable.
+        """
+        self.size = size
+        self.headless = headless
+        self.channel = channel
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self.max_pages_per_context = max_pages_per_context
+        self.max_js_heap_size = max_js_heap_size
+        self.playwright = None
+        self._browsers = []
+        self._contexts = {}
+        self._pages_opened = {}
+        self._lock = None
+
+    @property
+    def ready(self) -> bool:
+        return self.playwright is not None
+
+    async def start(self):
+        """Start the playwright driver and launch the browsers"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+
+            await self._fill()
+
+    async def _fill(self):
+        self._browsers = [b for b in self._browsers if b.browser.is_connected()]
+        available = [b for b in self._browsers if not self._is_retiring(b)]
+
+        if len(available) >= self.size:
+            return
+
+        browsers = await asyncio.gather(
+            *[
+                launch_browser(self.playwright, self.headless, self.channel)
+                for _ in range(self.size - len(available))
+            ]
+        )
+
+        self._browsers.extend(_PooledBrowser(browser) for browser in browsers)
+
+    def _is_retiring(self, pooled: _PooledBrowser) -> bool:
+        return pooled.served >= self.max_contexts_per_browser
+
+    async def new_context(self, **options) -> BrowserContext:
+        """
+        Create an isolated browser context on the least busy browser
+
+        Args:
+            **options: Options of `Browser.new_context`, e.g. `storage_state`.
+        """
+        if not self.ready:
+            await self.start()
+
+        async with self._lock:
+            await self._fill()
+
+            pooled = min(
+                (b for b in self._browsers if not self._is_retiring(b)),
+                key=lambda b: b.active,
+            )
+            pooled.active += 1
+            pooled.served += 1
+
+        try:
+            context = await pooled.browser.new_context(**options)
+        except Exception:
+            pooled.active -= 1
+            raise
+
+        self._contexts[context] = pooled
+        self._pages_opened[context] = 0
+
+        def on_page(_):
+            self._pages_opened[context] = self._pages_opened.get(context, 0) + 1
+
+        context.on("page", on_page)
+
+        return context
+
+    async def release_context(self, context: BrowserContext):
+        """
+        Close a context created by the pool. Retired browsers are closed once all their contexts are released.
+
+        Args:
+            context: The browser context to release.
+        """
+        pooled = self._contexts.pop(context, None)
+        self._pages_opened.pop(context, None)
+
+        try:
+            await context.close()
+        except Exception as e:
+            # the browser may have crashed
+            logger.debug(f"Failed to close browser context: {e!r}")
+
+        if pooled is None:
+            return
+
+        pooled.active -= 1
+
+        if pooled.active == 0 and self._is_retiring(pooled):
+            # disconnected browsers are already dropped by `_fill`
+            if pooled in self._browsers:
+                self._browsers.remove(pooled)
+
+            await pooled.browser.close()
+
+    async def should_recycle(
+        self, context: BrowserContext, navigations: int = 0
+    ) -> bool:
+        """
+        Check if a context has exceeded the page or memory budget
+
+        Args:
+            context: The browser context to check.
+            navigations: Number of pages loaded in the existing pages of the context.
+        """
+        pages = self._pages_opened.get(context, len(context.pages)) + navigations
+
+        if self.max_pages_per_context and pages >= self.max_pages_per_context:
+            return True
+
+        if self.max_js_heap_size and context.pages:
+            heap_sizes = await asyncio.gather(
+                *[
+                    page.evaluate(
+                        "() => performance.memory?.usedJSHeapSize ?? 0",
+                    )
+                    for page in context.pages
+                ],
+                return_exceptions=True,
+            )
+
+            total = sum(size for size in heap_sizes if isinstance(size, int))
+            return total >= self.max_js_heap_size
+
+        return False
+
+    async def stop(self):
+        """Close all contexts and browsers, and stop the playwright driver"""
+        for context in list(self._contexts):
+            await self.release_context(context)
+
+        for pooled in self._browsers:
+            await pooled.browser.close()
+
+        self._browsers = []
+
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+
+# process-wide pools, bound to the event loop they are created in
+_shared_pools: Dict[
+    Tuple[bool, str | None], Tuple[asyncio.AbstractEventLoop, BrowserPool]
+] = {}
+
+# shared pools kept running by the application until `stop_browser_pools()`
+_held_pools: Set[BrowserPool] = set()
+
+# number of playwright contexts using each shared pool
+_pool_borrowers: Dict[BrowserPool, int] = {}
+
+
+def _get_shared_pool(headless: bool, channel: str | None) -> BrowserPool:
+    loop = asyncio.get_running_loop()
+    key = (headless, channel)
+    entry = _shared_pools.get(key)
+
+    if entry is not None and entry[0] is not loop:
+        _stop_detached_pool(*entry)
+        entry = None
+
+    if entry is None:
+        entry = _shared_pools[key] = (
+            loop,
+            BrowserPool(headless=headless, channel=channel),
+        )
+
+    return entry[1]
+
+
+def get_browser_pool(headless: bool = True, channel: str | None = None) -> BrowserPool:
+    """
+    Get the process-wide browser pool of the current event loop and keep it running between sessions.
+    The pool keeps running until `stop_browser_pools()` is called by its owner, e.g. on application shutdown.
+
+    Args:
+        headless: Whether the browsers run in headless mode.
+        channel: The browser channel.
+    """
+    pool = _get_shared_pool(headless, channel)
+    _held_pools.add(pool)
+
+    return pool
+
+
+def _borrow_shared_pool(headless: bool, channel: str | None) -> BrowserPool:
+    """
+    Get the process-wide browser pool for a playwright context.
+    Unless it is held by `get_browser_pool()`, the pool is stopped when the last borrower returns it,
+    so that no browser outlives the sessions of a script.
+    """
+    pool = _get_shared_pool(headless, channel)
+    _pool_borrowers[pool] = _pool_borrowers.get(pool, 0) + 1
+
+    return pool
+
+
+async def _return_shared_pool(pool: BrowserPool):
+    borrowers = _pool_borrowers.get(pool, 0) - 1
+
+    if borrowers > 0:
+        _pool_borrowers[pool] = borrowers
+        return
+
+    _pool_borrowers.pop(pool, None)
+
+    if pool in _held_pools:
+        return
+
+    for key, (_, shared_pool) in list(_shared_pools.items()):
+        if shared_pool is pool:
+            # the next borrower starts a new pool instead of the stopping one
+            del _shared_pools[key]
+
+    await pool.stop()
+
+
+def _stop_detached_pool(loop: asyncio.AbstractEventLoop, pool: BrowserPool):
+    _held_pools.discard(pool)
+    _pool_borrowers.pop(pool, None)
+
+    if not pool.ready:
+        return
+
+    if loop.is_running() and not loop.is_closed():
+        # the pool can only be stopped in the loop it is created in
+        asyncio.run_coroutine_threadsafe(pool.stop(), loop)
+    else:
+        logger.warning(
+            "A shared browser pool was left running by a closed event loop, "
+            "call `stop_browser_pools()` before closing the loop"
+        )
+
+
+async def stop_browser_pools():
+    """Stop the process-wide browser pools of the current event loop"""
+    loop = asyncio.get_running_loop()
+
+    for key, (pool_loop, pool) in list(_shared_pools.items()):
+        if pool_loop is loop:
+            del _shared_pools[key]
+            _held_pools.discard(pool)
+            _pool_borrowers.pop(pool, None)
+            await pool.stop()
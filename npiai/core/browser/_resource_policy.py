@@ -0,0 +1,132 @@
+from typing import Iterable, Literal
+from urllib.parse import urlsplit
+
+ResourceType = Literal[
+    "document",
+    "stylesheet",
+    "image",
+    "media",
+    "font",
+    "script",
+    "texttrack",
+    "xhr",
+    "fetch",
+    "eventsource",
+    "websocket",
+    "manifest",
+    "other",
+]
+
+# analytics, tracking and ad networks that never contribute to the page content
+DEFAULT_BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "analytics.tiktok.com",
+    "static.ads-twitter.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "segment.io",
+    "cdn.segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "adnxs.com",
+    "amazon-adsystem.com",
+    "nr-data.net",
+]
+
+
+def _match_domain(hostname: str, domains: frozenset[str]) -> bool:
+    # match the domain itself and all of its subdomains
+    parts = hostname.split(".")
+    return any(".".join(parts[i:]) in domains for i in range(len(parts)))
+
+
+class ResourcePolicy:
+    """
+    Decide which requests are aborted while loading pages.
+
+    Requests to the allowed domains are never blocked. Other requests are blocked
+    if their resource type or domain is in the blocklists.
+    """
+
+    blocked_resource_types: frozenset[ResourceType]
+    blocked_domains: frozenset[str]
+    allowed_domains: frozenset[str]
+
+    def __init__(
+        self,
+        blocked_resource_types: Iterable[ResourceType] = (),
+        blocked_domains: Iterable[str] = (),
+        allowed_domains: Iterable[str] = (),
+    ):
+        """
+        Initialize a resource policy
+
+        Args:
+            blocked_resource_types: Resource types to block, see: https://playwright.dev/python/docs/api/class-request#request-resource-type
+            blocked_domains: Domains to block, including their subdomains.
+            allowed_domains: Domains that are never blocked, including their subdomains.
+        """
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.blocked_domains = frozenset(d.lower() for d in blocked_domains)
+        self.allowed_domains = frozenset(d.lower() for d in allowed_domains)
+
+    @classmethod
+    def text_only(
+        cls,
+        blocked_domains: Iterable[str] = (),
+        allowed_domains: Iterable[str] = (),
+    ) -> "ResourcePolicy":
+        """
+        Preset for text scraping: block images, media, fonts, analytics and ads.
+        Scripts and stylesheets are kept since the content and the scrolling depend on them.
+
+        Args:
+            blocked_domains: Additional domains to block.
+            allowed_domains: Domains that are never blocked.
+        """
+        return cls(
+            blocked_resource_types=["image", "media", "font", "texttrack", "manifest"],
+            blocked_domains=[*DEFAULT_BLOCKED_DOMAINS, *blocked_domains],
+            allowed_domains=allowed_domains,
+        )
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """
+        Check if a request should be blocked
+
+        Args:
+            resource_type: Resource type of the request.
+            url: URL of the request.
+        """
+        hostname = (urlsplit(url).hostname or "").lower()
+
+        if not hostname:
+            # data: and blob: URLs are not fetched from the network
+            return False
+
+        if self.allowed_domains and _match_domain(hostname, self.allowed_domains):
+            return False
+
+        return resource_type in self.blocked_resource_types or (
+            bool(self.blocked_domains) and _match_domain(hostname, self.blocked_domains)
+        )
+
+    def __repr__(self):
+        return (
+            f"ResourcePolicy(blocked_resource_types={sorted(self.blocked_resource_types)}, "
+            f"blocked_domains={len(self.blocked_domains)}, allowed_domains={sorted(self.allowed_domains)})"
+        )
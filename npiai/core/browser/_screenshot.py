@@ -0,0 +1,165 @@
+import math
+import weakref
+from typing import List, Literal, Tuple
+
+from playwright.async_api import Page, CDPSession
+
+ImageFormat = Literal["png", "jpeg", "webp"]
+
+# vision models bill images by square tiles, e.g. 512px tiles for OpenAI models,
+# so images sized in multiples of the tile size do not pay for partially filled tiles
+IMAGE_TOKEN_TILE_SIZE = 512
+
+# the screenshot tiles default to 2x2 image token tiles,
+# which is also below the size that Anthropic models downscale
+DEFAULT_TILE_SIZE = (2 * IMAGE_TOKEN_TILE_SIZE, 2 * IMAGE_TOKEN_TILE_SIZE)
+
+_cdp_sessions: "weakref.WeakKeyDictionary[Page, CDPSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def _get_cdp_session(page: Page) -> CDPSession:
+    session = _cdp_sessions.get(page)
+
+    if session is None:
+        session = await page.context.new_cdp_session(page)
+        _cdp_sessions[page] = session
+
+    return session
+
+
+def to_data_url(data: str, format: ImageFormat) -> str:
+    """
+    Wrap base64 encoded image data into a data URL
+
+    Args:
+        data: Base64 encoded image data.
+        format: Image format of the data.
+    """
+    return f"data:image/{format};base64,{data}"
+
+
+def _get_scale(width: float, height: float, max_size: Tuple[int, int] | None) -> float:
+    if not max_size or not width or not height:
+        return 1
+
+    return min(1, max_size[0] / width, max_size[1] / height)
+
+
+async def _capture(
+    session: CDPSession,
+    clip: dict,
+    format: ImageFormat,
+    quality: int | None,
+    capture_beyond_viewport: bool,
+) -> str:
+    params = {
+        "format": format,
+        "clip": clip,
+        "captureBeyondViewport": capture_beyond_viewport,
+        "fromSurface": True,
+    }
+
+    # png is lossless and does not take the quality option
+    if format != "png" and quality is not None:
+        params["quality"] = quality
+
+    result = await session.send("Page.captureScreenshot", params)
+    return result["data"]
+
+
+async def capture_screenshot(
+    page: Page,
+    full_page: bool = False,
+    max_size: Tuple[int, int] | None = None,
+    format: ImageFormat = "png",
+    quality: int | None = None,
+) -> str:
+    """
+    Capture a screenshot through CDP and return it as base64 encoded data.
+    The page is clipped and downscaled by the browser, so the image is never decoded in Python.
+
+    Args:
+        page: The page to capture.
+        full_page: Whether to capture the full scrollable page instead of the viewport.
+        max_size: Maximum width and height of the image, the aspect ratio is kept. The image is not upscaled.
+        format: Image format.
+        quality: Quality of jpeg and webp images between 0 and 100.
+    """
+    session = await _get_cdp_session(page)
+    metrics = await session.send("Page.getLayoutMetrics")
+
+    if full_page:
+        content = metrics["cssContentSize"]
+        x, y, width, height = 0, 0, content["width"], content["height"]
+    else:
+        viewport = metrics["cssVisualViewport"]
+        x, y = viewport["pageX"], viewport["pageY"]
+        width, height = viewport["clientWidth"], viewport["clientHeight"]
+
+    return await _capture(
+        session,
+        clip={
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "scale": _get_scale(width, height, max_size),
+        },
+        format=format,
+        quality=quality,
+        capture_beyond_viewport=full_page,
+    )
+
+
+async def capture_screenshot_tiles(
+    page: Page,
+    tile_size: Tuple[int, int] = DEFAULT_TILE_SIZE,
+    max_tiles: int = 4,
+    format: ImageFormat = "png",
+    quality: int | None = None,
+) -> List[str]:
+    """
+    Capture the full page as a top-to-bottom sequence of tiles and return them as base64 encoded data.
+    The page is scaled to the tile width, so tall pages stay readable instead of being shrunk into one image.
+
+    Args:
+        page: The page to capture.
+        tile_size: Width and height of the tiles in pixels. Use multiples of `IMAGE_TOKEN_TILE_SIZE` to avoid paying for partially filled image tokens.
+        max_tiles: Maximum number of tiles, the rest of the page is not captured.
+        format: Image format.
+        quality: Quality of jpeg and webp images between 0 and 100.
+    """
+    session = await _get_cdp_session(page)
+    metrics = await session.send("Page.getLayoutMetrics")
+    content = metrics["cssContentSize"]
+    width, height = content["width"], content["height"]
+
+    scale = _get_scale(width, height, (tile_size[0], math.inf))
+    # height of a tile in css pixels
+    tile_height = tile_size[1] / scale
+    count = min(max_tiles, max(1, math.ceil(height / tile_height)))
+
+    tiles = []
+
+    for i in range(count):
+        y = i * tile_height
+
+        tiles.append(
+            await _capture(
+                session,
+                clip={
+                    "x": 0,
+                    "y": y,
+                    "width": width,
+                    "height": min(tile_height, height - y),
+                    "scale": scale,
+                },
+                format=format,
+                quality=quality,
+                capture_beyond_viewport=True,
+            )
+        )
+
+    return tiles
@@ -0,0 +1,726 @@
+/**
+ * Scraping helpers installed on `window.npi` next to @npi-ai/browser-utils.
+ *
+ * The file is loaded as an init script, so the helpers are available in every page
+ * without sending their source on each `page.evaluate` call.
+ */
+(() => {
+  const npi = window.npi || (window.npi = {});
+
+  const VISITED_ATTR = 'data-npi-visited';
+  // tags the markdown converters drop, removing them does not change the markdown
+  const REMOVED_TAGS = 'script, style, noscript';
+  // attributes read by the markdown converters, keep in sync with `DEFAULT_ALLOWED_ATTRIBUTES`
+  const MARKDOWN_ATTRIBUTES = [
+    'href', 'src', 'alt', 'title', 'type', 'checked', 'aria-label', 'colspan', 'rowspan', 'start',
+  ];
+  // tags left out of the page structure skeleton
+  const NON_CONTENT_TAGS = 'script, style, noscript, svg, template, link, meta, iframe, canvas';
+
+  const state = {
+    // elements matching the items selector added since `initItemsObserver`
+    addedNodes: null,
+    itemsObserver: null,
+    // attributes kept by `minimizeHTML`, null to serialize the raw HTML
+    allowedAttributes: null,
+    knownFingerprints: new Set(),
+    relativeLinksProcessed: false,
+  };
+
+  const nextFrame = () => new Promise(resolve => requestAnimationFrame(resolve));
+  const isEmpty = elem => (elem.textContent?.replace(/\s/g, '').length || 0) <= 10;
+  const normalizeText = text => (text || '').replace(/\s+/g, ' ').trim();
+
+  // 53-bit string hash (cyrb53)
+  function hash(str) {
+    let h1 = 0xdeadbeef;
+    let h2 = 0x41c6ce57;
+
+    for (let i = 0; i < str.length; i++) {
+      const ch = str.charCodeAt(i);
+      h1 = Math.imul(h1 ^ ch, 2654435761);
+      h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+
+    return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16);
+  }
+
+  /* --------------------------- pagination scorer --------------------------- */
+
+  const PAGINATION_CANDIDATES =
+    'a[href], button, [role="button"], [role="link"], input[type="button"], input[type="submit"]';
+  // accessible names of "next page" controls
+  const NEXT_NAME_RE =
+    /^(go to )?(the )?(next|next page|next results|weiter|suivant|siguiente|successiva|próxima|volgende|次へ|次のページ|下一页|下一頁|다음)(\s*[›»>→⟩❯])?(,? page \d+)?$/i;
+  const LOAD_MORE_NAME_RE = /^(load|show|see|view) more( results| items| posts)?$|^more results$/i;
+  const NEXT_GLYPH_RE = /^[›»>→⟩❯]+$/;
+  const PREV_NAME_RE = /\b(prev|previous|back|zurück|précédent|anterior)\b|前へ|上一页|^[‹«<←⟨❮]+$/i;
+  const NEXT_TOKEN_RE = /(^|[-_\s])(next|pnnext)([-_\s]|$)|next$/i;
+  const PAGINATION_CONTAINER_RE = /pagin|pager|page-nav|pages/i;
+  // the next buttons of carousels and galleries switch slides instead of pages
+  const CAROUSEL_SELECTOR = ['carousel', 'slick', 'swiper', 'slider', 'gallery', 'lightbox']
+    .map(name => `[class*="${name}" i]`)
+    .join(', ');
+  const PAGE_PARAM_RE = /^(page|p|pg|paged|pagenum|start|offset|from|skip)$/i;
+
+  function resolveURL(href) {
+    try {
+      return new URL(href, window.location.href);
+    } catch {
+      return null;
+    }
+  }
+
+  function accessibleName(el) {
+    return normalizeText(
+      el.getAttribute('aria-label') ||
+        el.getAttribute('title') ||
+        el.textContent ||
+        el.getAttribute('value') ||
+        el.querySelector('img[alt]')?.getAttribute('alt'),
+    );
+  }
+
+  function isUsable(el) {
+    if (!el.getClientRects().length || el.closest('[disabled], [aria-disabled="true"]')) {
+      return false;
+    }
+
+    const style = getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.pointerEvents !== 'none';
+  }
+
+  // numeric page params of a url, e.g. `?page=2` or `/page/2`
+  function pageNumbers(url) {
+    const numbers = {};
+
+    for (const [key, value] of url.searchParams) {
+      if (PAGE_PARAM_RE.test(key) && /^\d+$/.test(value)) {
+        numbers[key] = Number(value);
+      }
+    }
+
+    const match = url.pathname.match(/\/(?:page|p)[/-]?(\d+)\/?$/i);
+
+    if (match) {
+      numbers['#path'] = Number(match[1]);
+    }
+
+    return numbers;
+  }
+
+  // whether the link moves forward in the page params of the current url
+  function isForwardLink(href) {
+    const url = resolveURL(href);
+
+    if (!url || url.host !== window.location.host) {
+      return false;
+    }
+
+    const current = pageNumbers(new URL(window.location.href));
+    const next = pageNumbers(url);
+
+    // the first page usually has no page number
+    return Object.entries(next).some(([key, value]) => value > (current[key] ?? (key === '#path' ? 1 : 0)));
+  }
+
+  function scorePaginationCandidate(el, linkedNext) {
+    const name = accessibleName(el);
+
+    if (!name && !el.matches('a[rel~="next"]')) {
+      return null;
+    }
+
+    if (PREV_NAME_RE.test(name) || name.length > 40 || el.closest(CAROUSEL_SELECTOR)) {
+      return null;
+    }
+
+    const href = el.closest('a[href]')?.getAttribute('href');
+    const url = href && resolveURL(href);
+
+    // links to the current page are not pagination buttons
+    if (url && url.href.split('#')[0] === window.location.href.split('#')[0]) {
+      return null;
+    }
+
+    const signals = [];
+    let score = 0;
+
+    const add = (signal, weight) => {
+      signals.push(signal);
+      score += weight;
+    };
+
+    if (
+      el.closest('a[rel~="next"]') ||
+      (url && url.href === linkedNext)
+    ) {
+      add('rel-next', 0.6);
+    }
+
+    if (NEXT_NAME_RE.test(name)) {
+      add('name-next', 0.5);
+    } else if (LOAD_MORE_NAME_RE.test(name)) {
+      add('name-load-more', 0.6);
+    } else if (NEXT_GLYPH_RE.test(name)) {
+      add('name-glyph', 0.3);
+    }
+
+    if (NEXT_TOKEN_RE.test(`${el.id} ${el.getAttribute('class') || ''}`)) {
+      add('id-or-class-next', 0.2);
+    }
+
+    if (href && isForwardLink(href)) {
+      add('href-page-number', 0.3);
+    }
+
+    const container = el.closest(
+      'nav, [role="navigation"], [class*="pagin" i], [id*="pagin" i], [class*="pager" i]',
+    );
+
+    if (
+      container &&
+      (container.matches('nav, [role="navigation"]') ||
+        PAGINATION_CONTAINER_RE.test(`${container.id} ${container.getAttribute('class') || ''}`))
+    ) {
+      add('pagination-container', 0.2);
+    }
+
+    return score ? { el, href, score, signals } : null;
+  }
+
+  Object.assign(npi, {
+    /* ---------------------------- items observer ---------------------------- */
+
+    initItemsObserver(ancestorSelector, itemsSelector) {
+      const ancestor = document.querySelector(ancestorSelector);
+
+      if (!ancestor) {
+        return;
+      }
+
+      state.itemsObserver?.disconnect();
+      state.addedNodes = [];
+
+      state.itemsObserver = new MutationObserver(records => {
+        for (const record of records) {
+          for (const addedNode of record.addedNodes) {
+            if (
+              addedNode.nodeType === Node.ELEMENT_NODE &&
+              (addedNode.matches(itemsSelector) || addedNode.querySelector(itemsSelector))
+            ) {
+              state.addedNodes.push(addedNode);
+            }
+          }
+        }
+      });
+
+      state.itemsObserver.observe(ancestor, { childList: true, subtree: true });
+    },
+
+    hasItemsAdded(timeout) {
+      return new Promise(resolve => {
+        let count = 0;
+        const maxCount = Math.floor(timeout / 100);
+
+        function check() {
+          if (!state.addedNodes) {
+            return resolve(false);
+          }
+          if (state.addedNodes.length > 0) {
+            return resolve(true);
+          }
+          if (count > maxCount) {
+            return resolve(false);
+          }
+
+          count++;
+          setTimeout(check, 100);
+        }
+
+        check();
+      });
+    },
+
+    disconnectItemsObserver() {
+      state.itemsObserver?.disconnect();
+    },
+
+    // serialize and clear the added elements, null if there are none
+    takeAddedNodes() {
+      const { addedNodes } = state;
+
+      if (!addedNodes?.length) {
+        return null;
+      }
+
+      state.addedNodes = [];
+      return addedNodes.map(node => npi.minimizeHTML(node));
+    },
+
+    /* ---------------------------- html minimizer ---------------------------- */
+
+    setAllowedAttributes(allowedAttributes) {
+      state.allowedAttributes = allowedAttributes ? new Set(allowedAttributes) : null;
+    },
+
+    // serialize a copy of the element without scripts, styles, base64 images
+    // and attributes outside the allowlist
+    minimizeHTML(elem) {
+      const allowed = state.allowedAttributes;
+
+      if (!allowed) {
+        return elem.outerHTML;
+      }
+
+      const clone = elem.cloneNode(true);
+
+      clone.querySelectorAll(REMOVED_TAGS).forEach(el => el.remove());
+
+      for (const el of [clone, ...clone.querySelectorAll('*')]) {
+        for (const { name, value } of [...el.attributes]) {
+          if (!allowed.has(name)) {
+            el.removeAttribute(name);
+          } else if (name === 'src' && value.startsWith('data:image')) {
+            // the converters replace inline images with a placeholder,
+            // keep the prefix so that they still recognize them
+            el.setAttribute(name, value.split(',')[0] + ',');
+          }
+        }
+      }
+
+      return clone.outerHTML;
+    },
+
+    /* ------------------------------ fingerprints ----------------------------- */
+
+    // hash of the content the markdown is generated from, i.e. the text and the attributes
+    // the converters read, which is stable across runs as long as the markdown does not change
+    fingerprint(elem) {
+      const parts = [];
+      const walker = document.createTreeWalker(elem, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+        acceptNode: node =>
+          node.nodeType === Node.ELEMENT_NODE && node.matches(REMOVED_TAGS)
+            ? NodeFilter.FILTER_REJECT
+            : NodeFilter.FILTER_ACCEPT,
+      });
+
+      for (let node = walker.currentNode; node; node = walker.nextNode()) {
+        if (node.nodeType === Node.TEXT_NODE) {
+          const text = normalizeText(node.data);
+
+          if (text) {
+            parts.push(text);
+          }
+
+          continue;
+        }
+
+        for (const name of MARKDOWN_ATTRIBUTES) {
+          const value = node.getAttribute(name);
+
+          if (value !== null) {
+            // inline images are replaced with a placeholder in the markdown
+            parts.push(`${name}=${value.startsWith('data:image') ? 'data:image' : value}`);
+          }
+        }
+      }
+
+      return hash(parts.join('\n'));
+    },
+
+    setKnownFingerprints(fingerprints) {
+      state.knownFingerprints = new Set(fingerprints);
+    },
+
+    // add the fingerprints to the known ones, returns false without adding them
+    // if the page does not hold the expected number of known fingerprints, e.g. after a reload
+    addKnownFingerprints(fingerprints, knownCount) {
+      if (state.knownFingerprints.size !== knownCount) {
+        return false;
+      }
+
+      for (const fingerprint of fingerprints) {
+        state.knownFingerprints.add(fingerprint);
+      }
+
+      return true;
+    },
+
+    /* ------------------------------- extraction ------------------------------ */
+
+    clearVisited() {
+      window.scrollTo(0, 0);
+
+      for (const elem of document.querySelectorAll(`[${VISITED_ATTR}]`)) {
+        elem.removeAttribute(VISITED_ATTR);
+      }
+    },
+
+    hasUnvisited(selector) {
+      return !!document.querySelector(`${selector}:not([${VISITED_ATTR}])`);
+    },
+
+    markVisited(elem) {
+      elem.setAttribute(VISITED_ATTR, 'true');
+      return npi.minimizeHTML(elem);
+    },
+
+    scrollToLastVisited(ancestorSelector) {
+      const items = document.querySelectorAll(`[${VISITED_ATTR}]`);
+
+      if (items.length) {
+        items[items.length - 1].scrollIntoView();
+      } else {
+        document.querySelector(ancestorSelector)?.scrollIntoView({ block: 'end' });
+      }
+    },
+
+    // mark, scroll and serialize the unvisited items,
+    // known items are marked as visited and returned without HTML
+    async extractItems(selector, limit) {
+      const known = state.knownFingerprints;
+      const elems = [];
+      const skipped = [];
+
+      for (const elem of document.querySelectorAll(`${selector}:not([${VISITED_ATTR}])`)) {
+        if (limit !== -1 && elems.length >= limit) {
+          break;
+        }
+
+        elem.setAttribute(VISITED_ATTR, 'true');
+
+        // lazy loaded items are checked after the content is loaded
+        const fingerprint = isEmpty(elem) ? null : npi.fingerprint(elem);
+
+        if (fingerprint !== null && known.has(fingerprint)) {
+          skipped.push({ fingerprint, html: null });
+        } else {
+          elems.push(elem);
+        }
+      }
+
+      if (!elems.length) {
+        return skipped;
+      }
+
+      const pending = elems.filter(isEmpty);
+
+      // in case the page uses lazy loading,
+      // bring the empty items into view to trigger loading
+      for (const elem of pending) {
+        elem.scrollIntoView();
+        await nextFrame();
+      }
+
+      elems[elems.length - 1].scrollIntoView();
+
+      if (pending.length) {
+        // wait until all empty items are filled or the DOM settles
+        await new Promise(resolve => {
+          let quietTimer;
+
+          const done = () => {
+            observer.disconnect();
+            clearTimeout(quietTimer);
+            clearTimeout(maxTimer);
+            resolve();
+          };
+
+          const observer = new MutationObserver(() => {
+            if (!pending.some(isEmpty)) {
+              return done();
+            }
+
+            clearTimeout(quietTimer);
+            quietTimer = setTimeout(done, 100);
+          });
+
+          pending.forEach(elem =>
+            observer.observe(elem, {
+              childList: true,
+              subtree: true,
+              characterData: true,
+              attributes: true,
+            }),
+          );
+
+          quietTimer = setTimeout(done, 300);
+          const maxTimer = setTimeout(done, 1000);
+        });
+      }
+
+      return [
+        ...skipped,
+        ...elems.map(elem => {
+          const id = npi.fingerprint(elem);
+          return { fingerprint: id, html: known.has(id) ? null : npi.minimizeHTML(elem) };
+        }),
+      ];
+    },
+
+    // convert relative links to absolute links, including the links added later
+    absolutizeLinks() {
+      if (state.relativeLinksProcessed) {
+        return;
+      }
+
+      function process(root) {
+        const elements = [...root.querySelectorAll('a[href]')];
+
+        if (root.matches('a[href]')) {
+          elements.push(root);
+        }
+
+        for (const a of elements) {
+          const href = a.getAttribute('href');
+
+          if (href) {
+            a.setAttribute('href', new URL(href, window.location.href).href);
+          }
+        }
+      }
+
+      process(document.body);
+
+      const observer = new MutationObserver(records => {
+        for (const record of records) {
+          for (const node of record.addedNodes) {
+            if (node.nodeType === Node.ELEMENT_NODE) {
+              process(node);
+            }
+          }
+        }
+      });
+
+      observer.observe(document.body, { childList: true, subtree: true });
+
+      state.relativeLinksProcessed = true;
+    },
+
+    /* ------------------------------- pagination ------------------------------ */
+
+    // absolute url of the pagination button if it is a link
+    getPaginationLink(selector) {
+      const button = document.querySelector(selector);
+      const link = button?.closest('a[href]') || button?.querySelector('a[href]');
+
+      if (!link || link.getAttribute('aria-disabled') === 'true') {
+        return null;
+      }
+
+      const url = new URL(link.getAttribute('href'), window.location.href);
+
+      if (!url.protocol.startsWith('http')) {
+        return null;
+      }
+
+      url.hash = '';
+      return url.href;
+    },
+
+    // summary of the first and the last items to tell whether two pages show the same items
+    getPageSignature(selector) {
+      const items = [...document.querySelectorAll(selector)];
+
+      if (!items.length) {
+        return null;
+      }
+
+      const text = el => normalizeText(el.textContent).slice(0, 200);
+      return `${items.length}:${text(items[0])}:${text(items.at(-1))}`;
+    },
+
+    /* ------------------------------ page analyzer ----------------------------- */
+
+    // hash of the tag and class skeleton of the page, classes with digits are ignored
+    // and repeated siblings are collapsed, so that the pages rendered from the same
+    // template share the fingerprint regardless of their content and item count
+    getStructureFingerprint(maxDepth) {
+      function skeleton(elem, depth) {
+        const classes = [...elem.classList].filter(c => !/\d/.test(c)).sort();
+        const tag = [elem.tagName.toLowerCase(), ...classes].join('.');
+
+        if (depth >= maxDepth) {
+          return tag;
+        }
+
+        const children = new Set();
+
+        for (const child of elem.children) {
+          if (!child.matches(NON_CONTENT_TAGS)) {
+            children.add(skeleton(child, depth + 1));
+          }
+        }
+
+        return children.size ? `${tag}(${[...children].join(',')})` : tag;
+      }
+
+      return hash(skeleton(document.body, 0));
+    },
+
+    // score the "next page" and "load more" controls by their rel attributes, accessible names
+    // and links, and return the best one with a confidence between 0 and 1
+    findPaginationButton() {
+      const linkedNext = document.querySelector('link[rel~="next"][href]')?.href;
+      const candidates = [];
+
+      for (const el of document.querySelectorAll(PAGINATION_CANDIDATES)) {
+        // nested candidates are scored on the outermost control
+        if (el.parentElement?.closest(PAGINATION_CANDIDATES) || !isUsable(el)) {
+          continue;
+        }
+
+        const candidate = scorePaginationCandidate(el, linkedNext);
+
+        if (candidate) {
+          candidates.push(candidate);
+        }
+      }
+
+      if (!candidates.length) {
+        return null;
+      }
+
+      candidates.sort((a, b) => b.score - a.score);
+
+      const [best] = candidates;
+      // controls leading to the same page, e.g. the pagination above and below the list,
+      // do not make the result ambiguous
+      const target = c => c.href || accessibleName(c.el);
+      const rival = candidates.find(c => target(c) !== target(best));
+      let confidence = best.score;
+
+      if (!rival) {
+        confidence += 0.1;
+      } else if (best.score - rival.score < 0.2) {
+        confidence -= 0.3;
+      }
+
+      return {
+        selector: npi.getUniqueSelector(best.el),
+        confidence: Math.min(1, Math.max(0, Math.round(confidence * 100) / 100)),
+        signals: best.signals,
+      };
+    },
+
+    // number of elements matching each selector, -1 for invalid selectors
+    countElements(selectors) {
+      return selectors.map(selector => {
+        try {
+          return document.querySelectorAll(selector).length;
+        } catch {
+          return -1;
+        }
+      });
+    },
+
+    getSelectorOfMarker(markerId) {
+      const el = npi.getElement(markerId);
+      return el && npi.getUniqueSelector(el);
+    },
+
+    // resolve the selectors before the markers are replaced by another snapshot
+    getSelectorsOfMarkers(markerIds) {
+      return Object.fromEntries(markerIds.map(id => [id, npi.getSelectorOfMarker(id)]));
+    },
+
+    computeCommonSelectors(anchorIds) {
+      try {
+        const anchorElements = anchorIds.map(id => npi.getElement(id));
+        const selectors = npi.selectorUtils.getCommonItemsAndAncestor(...anchorElements);
+
+        if (!selectors) {
+          return null;
+        }
+
+        const splitSelectors = selectors.items.split(' ');
+        const lastSelector = splitSelectors.at(-1);
+        const isDirectChildrenSelector = splitSelectors.at(-2) === '>';
+
+        if (!lastSelector) {
+          return null;
+        }
+
+        if (!isDirectChildrenSelector && !lastSelector.startsWith('.') && !lastSelector.startsWith('[')) {
+          // avoid using tag name selector to select all descendants
+          return null;
+        }
+
+        return {
+          ...selectors,
+          anchors: anchorElements.map(el => npi.getUniqueSelector(el)).join(', '),
+        };
+      } catch {
+        return null;
+      }
+    },
+
+    // scroll down the page and check if new items are added
+    supportInfiniteScroll(itemsSelector) {
+      let mutateElementsCount = 0;
+      const threshold = itemsSelector === '*' ? 10 : 3;
+      const targetSelector = `${itemsSelector}, ${itemsSelector} *`;
+
+      const scrollObserver = new MutationObserver(records => {
+        for (const record of records) {
+          for (const node of record.addedNodes) {
+            if (node.nodeType === Node.ELEMENT_NODE && node.matches(targetSelector)) {
+              mutateElementsCount++;
+            }
+          }
+        }
+      });
+
+      scrollObserver.observe(document.body, { childList: true, subtree: true });
+
+      return new Promise(resolve => {
+        function done() {
+          scrollObserver.disconnect();
+          resolve(mutateElementsCount >= threshold);
+        }
+
+        const body = document.body;
+        const html = document.documentElement;
+
+        const pageHeight = Math.max(
+          body.scrollHeight,
+          body.offsetHeight,
+          html.clientHeight,
+          html.scrollHeight,
+          html.offsetHeight,
+        );
+
+        const stepSize = pageHeight / 10;
+        let current = 0;
+
+        if (itemsSelector !== '*') {
+          const lastItem = [...document.querySelectorAll(itemsSelector)].at(-1);
+
+          if (lastItem) {
+            current = lastItem.getBoundingClientRect().top;
+            window.scrollTo(0, current);
+          }
+        }
+
+        const interval = setInterval(() => {
+          current += stepSize;
+          window.scrollTo(0, current);
+
+          if (current >= pageHeight || mutateElementsCount >= threshold) {
+            clearInterval(interval);
+
+            if (mutateElementsCount >= threshold) {
+              done();
+            } else {
+              setTimeout(done, 300);
+            }
+          }
+        }, 300);
+      });
+    },
+  });
+})();
@@ -1,9 +1,6 @@
-import base64
-import io
 from textwrap import dedent
-from typing import Literal
+from typing import Literal, List, Tuple
 
-from PIL import Image
 from playwright.async_api import ElementHandle, TimeoutError
 
 from litellm.types.completion import (
@@ -12,24 +9,43 @@ from litellm.types.completion import (
 )
 
 from npiai.context import Context
-from npiai.core.browser import PlaywrightContext
-from npiai.utils import html_to_markdown, llm_tool_call
+from npiai.core.browser import (
+    PlaywrightContext,
+    ResourcePolicy,
+    BrowserPool,
+    ImageFormat,
+    DEFAULT_TILE_SIZE,
+    capture_screenshot,
+    capture_screenshot_tiles,
+    to_data_url,
+)
+from npiai.utils import ahtml_to_markdown, llm_tool_call
 
 from ._function import FunctionTool, function
 
-# Disable the maximum image pixels limit
-Image.MAX_IMAGE_PIXELS = None
-
 
 class BrowserTool(FunctionTool):
     use_screenshot: bool
     playwright: PlaywrightContext
 
+    # policy applied when loading pages, None to keep the policy of the playwright context
+    resource_policy: ResourcePolicy | None
+    # whether the playwright context is created by this tool, the policy of a context passed in is left to its owner
+    _owns_playwright: bool
+
+    screenshot_format: ImageFormat
+    screenshot_quality: int | None
+
     def __init__(
         self,
         playwright: PlaywrightContext = None,
         use_screenshot: bool = True,
         headless: bool = True,
+        resource_policy: ResourcePolicy | None = None,
+        browser_pool: BrowserPool | None = None,
+        use_shared_pool: bool = True,
+        screenshot_format: ImageFormat = "png",
+        screenshot_quality: int | None = None,
     ):
         """
         Initialize a Browser App
@@ -38,10 +54,23 @@ class BrowserTool(FunctionTool):
             playwright: Playwright context to use. A new playwright context is created if None.
             use_screenshot: Whether to send a screenshot of the current page to the vision model. This should be used with a navigator and a vision model.
             headless: Whether to run playwright in headless mode.
+            resource_policy: Policy of the requests to block when loading pages, e.g. `ResourcePolicy.text_only()`. Only applied to the playwright context created by the tool, a context passed in keeps its own policy.
+            browser_pool: Browser pool to get the browser context from when a new playwright context is created. The process-wide pool is used if None, see `get_browser_pool()`.
+            use_shared_pool: Whether a new playwright context uses the process-wide pool when no pool is given. Set to False to launch a dedicated browser.
+            screenshot_format: Image format of the screenshots. Jpeg and webp are much smaller than png for vision prompts, e.g. `screenshot_format="jpeg", screenshot_quality=80`.
+            screenshot_quality: Quality of jpeg and webp screenshots between 0 and 100.
         """
         super().__init__()
         self.use_screenshot = use_screenshot
-        self.playwright = playwright or PlaywrightContext(headless)
+        self.playwright = playwright or PlaywrightContext(
+            headless,
+            pool=browser_pool,
+            use_shared_pool=use_shared_pool,
+        )
+        self.resource_policy = resource_policy
+        self._owns_playwright = playwright is None
+        self.screenshot_format = screenshot_format
+        self.screenshot_quality = screenshot_quality
 
     async def load_page(
         self,
@@ -50,7 +79,19 @@ class BrowserTool(FunctionTool):
         wait_for_selector: str = None,
         timeout: int | None = None,
         force_capcha_detection: bool = False,
+        full_rendering: bool = False,
     ):
+        await self.playwright.recycle_if_needed()
+
+        policy = self.resource_policy if self._owns_playwright else None
+
+        if policy:
+            # pages used for screenshots need all the resources,
+            # including the pages checked for captchas
+            await self.playwright.set_resource_policy(
+                None if full_rendering or force_capcha_detection else policy
+            )
+
         await self.playwright.page.goto(url)
 
         if wait_for_selector is not None:
@@ -73,8 +114,18 @@ class BrowserTool(FunctionTool):
         # await self.playwright.page.wait_for_timeout(wait)
 
         if force_capcha_detection:
+            if policy and self.playwright.resource_policy is not None:
+                # the page is loaded with the policy when the selector times out,
+                # load it again with the images and styles that a captcha needs
+                await self.playwright.set_resource_policy(None)
+                await self.playwright.page.reload()
+
             await self.detect_captcha(ctx, return_to=url)
 
+            if policy and not full_rendering:
+                # block the resources again for the following requests, e.g. pagination clicks
+                await self.playwright.set_resource_policy(policy)
+
     @function
     async def get_text(self):
         """Get the text content (as markdown) of the current page"""
@@ -92,7 +143,7 @@ class BrowserTool(FunctionTool):
             }
             """
         )
-        return html_to_markdown(html)
+        return await ahtml_to_markdown(html)
 
     async def start(self):
         """Start the Browser App"""
@@ -116,8 +167,18 @@ class BrowserTool(FunctionTool):
         self,
         full_page: bool = False,
         max_size: tuple[int, int] | None = None,
+        format: ImageFormat | None = None,
+        quality: int | None = None,
     ) -> str | None:
-        """Get the screenshot of the current page"""
+        """
+        Get the screenshot of the current page as a data URL
+
+        Args:
+            full_page: Whether to capture the full scrollable page instead of the viewport.
+            max_size: Maximum width and height of the screenshot. The page is downscaled by the browser.
+            format: Image format. Defaults to the screenshot format of the tool.
+            quality: Quality of jpeg and webp screenshots. Defaults to the screenshot quality of the tool.
+        """
         if (
             not self.playwright
             or not self.playwright.ready
@@ -125,20 +186,50 @@ class BrowserTool(FunctionTool):
         ):
             return None
 
-        screenshot = await self.playwright.page.screenshot(
-            caret="initial",
+        format = format or self.screenshot_format
+        data = await capture_screenshot(
+            self.playwright.page,
             full_page=full_page,
-            # clip={"x": 0, "y": 0, "width": 1280, "height": 720 * 4},
+            max_size=max_size,
+            format=format,
+            quality=quality if quality is not None else self.screenshot_quality,
         )
 
-        if max_size:
-            img = Image.open(io.BytesIO(screenshot))
-            img.thumbnail(max_size)
-            buffer = io.BytesIO()
-            img.save(buffer, format="PNG")
-            screenshot = buffer.getvalue()
+        return to_data_url(data, format)
+
+    async def get_screenshot_tiles(
+        self,
+        tile_size: Tuple[int, int] = DEFAULT_TILE_SIZE,
+        max_tiles: int = 4,
+        format: ImageFormat | None = None,
+        quality: int | None = None,
+    ) -> List[str]:
+        """
+        Get the full page as a top-to-bottom sequence of screenshot tiles, which keeps tall pages readable
+
+        Args:
+            tile_size: Width and height of the tiles. Use multiples of 512 pixels to fill whole image tokens.
+            max_tiles: Maximum number of tiles, the rest of the page is not captured.
+            format: Image format. Defaults to the screenshot format of the tool.
+            quality: Quality of jpeg and webp screenshots. Defaults to the screenshot quality of the tool.
+        """
+        if (
+            not self.playwright
+            or not self.playwright.ready
+            or self.playwright.page.url == "about:blank"
+        ):
+            return []
+
+        format = format or self.screenshot_format
+        tiles = await capture_screenshot_tiles(
+            self.playwright.page,
+            tile_size=tile_size,
+            max_tiles=max_tiles,
+            format=format,
+            quality=quality if quality is not None else self.screenshot_quality,
+        )
 
-        return "data:image/png;base64," + base64.b64encode(screenshot).decode()
+        return [to_data_url(data, format) for data in tiles]
 
     async def get_page_url(self):
         """Get the URL of the current page"""
@@ -1,5 +1,7 @@
 from .auth import UnauthorizedError
+from .llm import TruncatedResponseError
 
 __all__ = [
     UnauthorizedError,
+    TruncatedResponseError,
 ]
@@ -1,3 +1,14 @@
-from npiai.llm.llm import LLM, OpenAI, Anthropic, AzureOpenAI, Gemini
+from npiai.llm.llm import LLM, LLMStats, OpenAI, Anthropic, AzureOpenAI, Gemini
+from npiai.llm.cache import LLMCache
+from npiai.llm.rate_limiter import RateLimiter
 
-__all__ = ["LLM", "OpenAI", "Anthropic", "AzureOpenAI", "Gemini"]
+__all__ = [
+    "LLM",
+    "LLMStats",
+    "OpenAI",
+    "Anthropic",
+    "AzureOpenAI",
+    "Gemini",
+    "LLMCache",
+    "RateLimiter",
+]
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import tempfile
+from typing import Any, Dict
+
+from litellm import ModelResponse
+
+from npiai.utils.sqlite_store import SqliteStore
+
+# request params that do not affect the generated response
+_IGNORED_PARAMS = {"stream", "timeout", "num_retries", "metadata", "api_key"}
+
+
+def _json_default(obj: Any):
+    # litellm messages are pydantic models
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    return str(obj)
+
+
+def get_request_key(model: str, params: Dict[str, Any]) -> str:
+    """
+    Compute a content-addressed key for a completion request
+
+    Args:
+        model: The model name
+        params: The completion params, e.g. messages, tools, tool_choice and sampling params
+    """
+    payload = {
+        "model": model,
+        **{k: v for k, v in params.items() if k not in _IGNORED_PARAMS},
+    }
+
+    serialized = json.dumps(
+        payload,
+        default=_json_default,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+class LLMCache(SqliteStore):
+    """
+    Persistent response cache backed by sqlite.
+
+    The database file can be shared across processes. Entries expire after `ttl` seconds,
+    and the least recently used entries are evicted once the total size exceeds `max_size` bytes.
+    """
+
+    table = "responses"
+
+    def __init__(
+        self,
+        path: str | pathlib.Path | None = None,
+        ttl: float | None = 7 * 24 * 3600,
+        max_size: int = 512 * 1024 * 1024,
+    ):
+        """
+        Initialize the LLM response cache
+
+        Args:
+            path: Path to the sqlite database. Defaults to `<tmpdir>/.npi/llm_cache.sqlite`.
+            ttl: Time-to-live of the cached responses in seconds. None means never expire.
+            max_size: Maximum total size of the cached responses in bytes.
+        """
+        super().__init__(
+            path=path
+            or pathlib.Path(tempfile.gettempdir()) / ".npi" / "llm_cache.sqlite",
+            ttl=ttl,
+            max_size=max_size,
+        )
+
+    async def get(self, key: str) -> ModelResponse | None:
+        """
+        Get the cached response of the given key
+
+        Args:
+            key: Request key computed by `get_request_key`
+        """
+        value = await asyncio.to_thread(self._get, key)
+
+        if value is None:
+            return None
+
+        return ModelResponse(**json.loads(value))
+
+    async def set(self, key: str, response: ModelResponse):
+        """
+        Save the response into cache
+
+        Args:
+            key: Request key computed by `get_request_key`
+            response: The model response to cache
+        """
+        await asyncio.to_thread(self._set, key, response.model_dump_json())
@@ -1,8 +1,15 @@
+from dataclasses import dataclass
 from enum import Enum
+import copy
 import os
 import asyncio
+import weakref
+from typing import Dict, Tuple
 from litellm import completion, acompletion, ModelResponse, CustomStreamWrapper
 
+from .cache import LLMCache, get_request_key
+from .rate_limiter import RateLimiter
+
 
 class Provider(Enum):
     OpenAI = 1
@@ -13,11 +20,36 @@ class Provider(Enum):
     Gemini = 6
 
 
+@dataclass
+class LLMStats:
+    # completions sent to the provider
+    requests: int = 0
+    # completions served from the response cache
+    cache_hits: int = 0
+    # completions that awaited an identical in-flight request
+    coalesced: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.cache_hits + self.coalesced
+
+
 class LLM:
+    # identical requests in flight, shared by the clients with the same configuration.
+    # event loop -> (client key, request key) -> task
+    _inflight: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    _cache: LLMCache | None
+    _rate_limiter: RateLimiter | None
+    stats: LLMStats
+
     def __init__(self, api_key: str, model: str, provider: Provider):
         self.model = model
         self.api_key = api_key
         self.provider = provider
+        self._cache = None
+        self._rate_limiter = None
+        self.stats = LLMStats()
 
     def default_model(self) -> str:
         return self.model
@@ -25,8 +57,84 @@ class LLM:
     def get_provider(self) -> Provider:
         return self.provider
 
+    def _client_key(self) -> Tuple:
+        """The configuration that the responses depend on besides the request params"""
+        return self.provider, self.api_key
+
+    def use_cache(self, cache: LLMCache | None) -> None:
+        """
+        Enable the persistent response cache for non-streaming completions
+
+        Args:
+            cache: The cache to use. Pass None to disable caching.
+        """
+        self._cache = cache
+
+    def use_rate_limiter(self, rate_limiter: RateLimiter | None) -> None:
+        """
+        Throttle completions with the given rate limiter
+
+        Args:
+            rate_limiter: The rate limiter to use. Share it between clients of the same model to enforce a common budget.
+        """
+        self._rate_limiter = rate_limiter
+
     # TODO: kwargs typings
     async def acompletion(self, **kwargs) -> ModelResponse | CustomStreamWrapper:
+        if kwargs.get("stream"):
+            self.stats.requests += 1
+            return await self._governed_acompletion(**kwargs)
+
+        key = get_request_key(self.model, kwargs)
+
+        # sampled completions differ between identical requests,
+        # so only deterministic or cached responses are shared
+        if kwargs.get("temperature") != 0 and self._cache is None:
+            return await self._cached_acompletion(key, **kwargs)
+
+        inflight_key = (*self._client_key(), key)
+        # tasks can only be awaited in the loop they are created in
+        inflight = LLM._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(inflight_key)
+
+        if task is not None:
+            # an identical request is in flight, wait for its result instead of sending a duplicate
+            self.stats.coalesced += 1
+            # the callers may modify the response, e.g. by appending its message to the history
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.create_task(self._cached_acompletion(key, **kwargs))
+        inflight[inflight_key] = task
+        task.add_done_callback(lambda _: inflight.pop(inflight_key, None))
+
+        # shield the shared task so that cancelling this caller does not affect the others
+        return await asyncio.shield(task)
+
+    async def _cached_acompletion(self, key: str, **kwargs) -> ModelResponse:
+        if self._cache is not None:
+            response = await self._cache.get(key)
+
+            if response is not None:
+                self.stats.cache_hits += 1
+                return response
+
+        self.stats.requests += 1
+        response = await self._governed_acompletion(**kwargs)
+
+        if self._cache is not None:
+            await self._cache.set(key, response)
+
+        return response
+
+    async def _governed_acompletion(
+        self, **kwargs
+    ) -> ModelResponse | CustomStreamWrapper:
+        if self._rate_limiter is None:
+            return await self._acompletion(**kwargs)
+
+        return await self._rate_limiter.run(self._acompletion, **kwargs)
+
+    async def _acompletion(self, **kwargs) -> ModelResponse | CustomStreamWrapper:
         return await acompletion(
             model=self.model, api_key=self.api_key, drop_params=True, **kwargs
         )
@@ -55,8 +163,13 @@ class AzureOpenAI(LLM):
     ):
         os.environ["AZURE_API_BASE"] = api_base
         os.environ["AZURE_API_VERSION"] = api_version
+        self.api_base = api_base
+        self.api_version = api_version
         super().__init__(f"azure/{deployment_name}", api_key, Provider.AzureOpenAI)
 
+    def _client_key(self) -> Tuple:
+        return *super()._client_key(), self.api_base, self.api_version
+
 
 class Gemini(LLM):
     def __init__(self, api_key: str, model: str):
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping
+
+import litellm
+
+# rough token cost of an image in vision prompts
+_IMAGE_TOKENS = 1000
+
+
+def estimate_tokens(params: Dict[str, Any]) -> int:
+    """
+    Estimate the number of tokens a completion request consumes, including the completion budget
+
+    Args:
+        params: The completion params
+    """
+    chars = 0
+    images = 0
+
+    for message in params.get("messages", []):
+        if hasattr(message, "model_dump"):
+            message = message.model_dump()
+
+        content = message.get("content")
+
+        if isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    images += 1
+                else:
+                    chars += len(part.get("text", ""))
+        elif content:
+            chars += len(content)
+
+        if message.get("tool_calls"):
+            chars += len(json.dumps(message["tool_calls"], default=str))
+
+    if params.get("tools"):
+        chars += len(json.dumps(params["tools"], default=str))
+
+    # ~4 characters per token for english text
+    return chars // 4 + images * _IMAGE_TOKENS + (params.get("max_tokens") or 0)
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse durations like `1.5`, `20ms` or `6m0s` into seconds"""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = re.findall(r"([\d.]+)(ms|s|m|h)", value)
+
+    if not parts:
+        return None
+
+    return sum(float(num) * units[unit] for num, unit in parts)
+
+
+def _parse_int(value: Any) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    """Token bucket that refills `capacity` units per minute"""
+
+    capacity: float
+    available: float
+    updated_at: float
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.available = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.available = min(
+            self.capacity,
+            self.available + (now - self.updated_at) * self.capacity / 60,
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        # oversized requests are admitted once the bucket is full
+        amount = min(amount, self.capacity)
+
+        if self.available >= amount:
+            return 0
+
+        return (amount - self.available) * 60 / self.capacity
+
+    def consume(self, amount: float):
+        self.available -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self.available = min(self.capacity, self.available + amount)
+
+    def resize(self, capacity: float):
+        if capacity > 0 and capacity != self.capacity:
+            self.available = min(self.available, capacity)
+            self.capacity = capacity
+
+
+class RateLimiter:
+    """
+    Request- and token-rate governor for LLM completions.
+
+    Callers are admitted in FIFO order once both the RPM and the estimated TPM budgets allow.
+    The budgets adapt to the rate-limit headers returned by the provider,
+    and 429 responses pause the whole queue until `retry-after` has elapsed.
+    Share one instance between clients that use the same model and account.
+    """
+
+    max_retries: int
+
+    _requests: _Bucket | None
+    _tokens: _Bucket | None
+    _paused_until: float
+    _lock: asyncio.Lock
+
+    def __init__(
+        self,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        max_retries: int = 3,
+    ):
+        """
+        Initialize the rate limiter
+
+        Args:
+            rpm: Requests per minute. If None, the limit is learned from the response headers.
+            tpm: Tokens per minute. If None, the limit is learned from the response headers.
+            max_retries: Number of retries after a rate limit error.
+        """
+        self.max_retries = max_retries
+        self._requests = _Bucket(rpm) if rpm else None
+        self._tokens = _Bucket(tpm) if tpm else None
+        self._paused_until = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        """
+        Wait until the request fits into the budgets
+
+        Args:
+            tokens: Estimated number of tokens of the request
+        """
+        # asyncio.Lock wakes up waiters in FIFO order
+        async with self._lock:
+            while True:
+                wait = self._paused_until - time.monotonic()
+
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    if bucket is not None:
+                        bucket.refill()
+                        wait = max(wait, bucket.wait_time(amount))
+
+                if wait <= 0:
+                    break
+
+                await asyncio.sleep(wait)
+
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(tokens)
+
+    def update(self, headers: Mapping[str, str], estimated: int, used: int | None):
+        """
+        Adapt the budgets to the provider feedback
+
+        Args:
+            headers: Response headers
+            estimated: Estimated number of tokens of the request
+            used: Actual number of tokens reported in the usage
+        """
+        headers = {k.lower(): v for k, v in headers.items()}
+
+        limit_requests = _parse_int(headers.get("x-ratelimit-limit-requests"))
+        limit_tokens = _parse_int(headers.get("x-ratelimit-limit-tokens"))
+
+        if limit_requests:
+            if self._requests is None:
+                self._requests = _Bucket(limit_requests)
+            else:
+                self._requests.resize(limit_requests)
+
+        if limit_tokens:
+            if self._tokens is None:
+                self._tokens = _Bucket(limit_tokens)
+            else:
+                self._tokens.resize(limit_tokens)
+
+        if self._tokens is not None and used is not None:
+            self._tokens.refund(estimated - used)
+
+        for bucket, key in (
+            (self._requests, "x-ratelimit-remaining-requests"),
+            (self._tokens, "x-ratelimit-remaining-tokens"),
+        ):
+            remaining = _parse_int(headers.get(key))
+
+            if bucket is not None and remaining is not None:
+                bucket.refill()
+                bucket.available = min(bucket.available, remaining)
+
+    def pause(self, seconds: float):
+        """
+        Stop admitting requests for the given duration
+
+        Args:
+            seconds: Pause duration in seconds
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def run[T](self, fn: Callable[..., Awaitable[T]], **kwargs) -> T:
+        """
+        Run the completion function under the rate limits
+
+        Args:
+            fn: The completion function
+            **kwargs: Completion params
+        """
+        estimated = estimate_tokens(kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(estimated)
+
+            try:
+                response = await fn(**kwargs)
+            except litellm.RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+
+                headers = getattr(getattr(e, "response", None), "headers", None) or {}
+                retry_after = _parse_duration(
+                    headers.get("retry-after")
+                    or headers.get("x-ratelimit-reset-requests")
+                    or headers.get("x-ratelimit-reset-tokens")
+                    or ""
+                )
+                # exponential backoff if the provider did not tell us when to retry
+                self.pause(retry_after or 2**attempt)
+                continue
+
+            hidden_params = getattr(response, "_hidden_params", None) or {}
+            usage = getattr(response, "usage", None)
+
+            self.update(
+                headers=hidden_params.get("additional_headers") or {},
+                estimated=estimated,
+                used=getattr(usage, "total_tokens", None),
+            )
+
+            return response
@@ -15,7 +15,7 @@ from npiai import function, utils
 from npiai.error import UnauthorizedError
 from npiai.context import Context
 from npiai.constant import app
-from npiai.utils import html_to_markdown
+from npiai.utils import html_to_markdown, ahtml_to_markdown
 from npiai.tools.shared_types.base_email_tool import (
     BaseEmailTool,
     EmailMessage,
@@ -91,6 +91,17 @@ class Gmail(BaseEmailTool):
         await super().start()
 
     def convert_message(self, message: Message) -> EmailMessage:
+        body = message.plain or html_to_markdown(message.html)
+        return self._build_email_message(message, body)
+
+    async def aconvert_message(self, message: Message) -> EmailMessage:
+        """Convert the message with the HTML body converted off the event loop"""
+        body = message.plain or (
+            await ahtml_to_markdown(message.html) if message.html else None
+        )
+        return self._build_email_message(message, body)
+
+    def _build_email_message(self, message: Message, body: str | None) -> EmailMessage:
         attachments = []
 
         if message.attachments:
@@ -105,8 +116,6 @@ class Gmail(BaseEmailTool):
                     )
                 )
 
-        body = message.plain or html_to_markdown(message.html)
-
         if body:
             body = re.sub(r"\n+", "\n", body).strip()
 
@@ -126,7 +135,7 @@ class Gmail(BaseEmailTool):
     async def get_message_by_id(self, message_id: str) -> EmailMessage | None:
         try:
             message = self._gmail_client.get_message_by_id(message_id)
-            return self.convert_message(message)
+            return await self.aconvert_message(message)
         except HttpError:
             return None
 
@@ -194,7 +203,7 @@ class Gmail(BaseEmailTool):
                     message_ref=msg_ref,
                 )
 
-                yield self.convert_message(msg)
+                yield await self.aconvert_message(msg)
 
                 count += 1
 
@@ -268,7 +277,7 @@ class Gmail(BaseEmailTool):
         return "Labels removed"
 
     @function
-    def create_draft(
+    async def create_draft(
         self,
         to: str,
         subject: str,
@@ -297,11 +306,11 @@ class Gmail(BaseEmailTool):
         )
 
         return "The following draft is created:\n" + json.dumps(
-            self.convert_message(msg), ensure_ascii=False
+            await self.aconvert_message(msg), ensure_ascii=False
         )
 
     @function
-    def create_reply_draft(
+    async def create_reply_draft(
         self,
         to: str,
         subject: str,
@@ -348,11 +357,11 @@ class Gmail(BaseEmailTool):
         )
 
         return "The following reply draft is created:\n" + json.dumps(
-            self.convert_message(msg), ensure_ascii=False
+            await self.aconvert_message(msg), ensure_ascii=False
         )
 
     @function
-    def reply(
+    async def reply(
         self,
         to: str,
         subject: str,
@@ -399,11 +408,11 @@ class Gmail(BaseEmailTool):
         )
 
         return "The following reply is sent:\n" + json.dumps(
-            self.convert_message(msg), ensure_ascii=False
+            await self.aconvert_message(msg), ensure_ascii=False
         )
 
     @function
-    def search_emails(self, query: str = None, max_results: int = 100) -> str:
+    async def search_emails(self, query: str = None, max_results: int = 100) -> str:
         """
         Search for emails with a query.
 
@@ -416,7 +425,10 @@ class Gmail(BaseEmailTool):
             max_results=max_results,
         )
 
-        return json.dumps([self.convert_message(m) for m in msgs], ensure_ascii=False)
+        return json.dumps(
+            await asyncio.gather(*[self.aconvert_message(m) for m in msgs]),
+            ensure_ascii=False,
+        )
 
     @function
     async def send_email(
@@ -458,7 +470,7 @@ class Gmail(BaseEmailTool):
         )
 
         return "Sending Success\n" + json.dumps(
-            self.convert_message(msg), ensure_ascii=False
+            await self.aconvert_message(msg), ensure_ascii=False
         )
 
     @function
@@ -478,6 +490,6 @@ class Gmail(BaseEmailTool):
             if len(messages):
                 msg = messages[0]
                 msg.mark_as_read()
-                return json.dumps(self.convert_message(msg), ensure_ascii=False)
+                return json.dumps(await self.aconvert_message(msg), ensure_ascii=False)
 
             await asyncio.sleep(3)
@@ -23,7 +23,7 @@ from msgraph.generated.users.item.messages.item.attachments.attachments_request_
 )
 
 from npiai import function, Context
-from npiai.utils import html_to_markdown
+from npiai.utils import ahtml_to_markdown
 from npiai.tools.shared_types.base_email_tool import (
     BaseEmailTool,
     EmailMessage,
@@ -75,7 +75,7 @@ class Outlook(BaseEmailTool):
             else None
         )
 
-        body = html_to_markdown(message.body.content) if message.body else None
+        body = await ahtml_to_markdown(message.body.content) if message.body else None
 
         if body:
             body = re.sub(r"\n+", "\n", body).strip()
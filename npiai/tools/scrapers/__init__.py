@@ -1,2 +1,3 @@
 from .base import BaseScraper
+from .row_cache import RowCache
 from .types import *
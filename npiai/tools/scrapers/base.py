@@ -1,10 +1,15 @@
 import asyncio
 import csv
 import json
+import math
 import os
 import traceback
 from abc import ABC, abstractmethod
-from typing import List, AsyncGenerator, Any
+from collections import deque
+from contextlib import aclosing
+from typing import List, AsyncGenerator, Any, Literal, Deque, Dict, Tuple
+
+from typing_extensions import TypedDict
 
 from litellm.types.completion import (
     ChatCompletionSystemMessageParam,
@@ -12,18 +17,35 @@ from litellm.types.completion import (
 )
 
 from npiai import function, Context, FunctionTool
-from npiai.utils import llm_tool_call, llm_summarize, concurrent_task_runner, logger
+from npiai.error import TruncatedResponseError
+from npiai.utils import (
+    llm_tool_call,
+    llm_summarize,
+    concurrent_task_runner,
+    is_congestion_error,
+    logger,
+    AdaptiveConcurrency,
+    LoopLagMonitor,
+)
 from .prompts import (
     DEFAULT_COLUMN_INFERENCE_PROMPT,
     DEFAULT_COLUMN_SUMMARIZE_PROMPT,
 )
+from .row_cache import RowCache, get_row_key
 from .types import (
     Column,
     SourceItem,
     Row,
     RowBatch,
+    BatchStats,
 )
 
+# maximum number of attempts to fetch or summarize a batch
+_MAX_BATCH_ATTEMPTS = 3
+
+# expected output tokens per column before any rows are summarized
+_COLUMN_OUTPUT_TOKENS = 16
+
 __INDEX_COLUMN__ = Column(
     name="__npi_item_index__",
     type="number",
@@ -31,6 +53,27 @@ __INDEX_COLUMN__ = Column(
 )
 
 
+class _PendingBatch(TypedDict):
+    batch_id: int
+    # row offset of this batch in the current task
+    offset: int
+    requested_count: int
+    items: List[SourceItem]
+    attempts: int
+
+
+class _TruncatedBatchError(Exception):
+    """Raised after the rows of a truncated summary, carrying the items that were not summarized"""
+
+    rows: List[Row]
+    missing_items: List[SourceItem]
+
+    def __init__(self, missing_items: List[SourceItem]):
+        super().__init__(f"{len(missing_items)} items were not summarized")
+        self.rows = []
+        self.missing_items = missing_items
+
+
 class BaseScraper(FunctionTool, ABC):
     name = "base_scraper"
     description = "Generic scraper tool"
@@ -38,6 +81,28 @@ class BaseScraper(FunctionTool, ABC):
     summarize_prompt: str = DEFAULT_COLUMN_SUMMARIZE_PROMPT
     infer_prompt: str = DEFAULT_COLUMN_INFERENCE_PROMPT
 
+    # maximum number of output tokens of each summary call
+    summarize_max_tokens: int = 4096
+
+    # estimated number of output tokens per summarized row, learned from the responses
+    _row_tokens_estimate: float | None = None
+
+    # token usage of the batches packed by `batch_tokens`
+    _batch_stats: List[BatchStats]
+
+    _row_cache: RowCache | None = None
+
+    _loop_lag: LoopLagMonitor | None = None
+
+    def use_row_cache(self, cache: RowCache | None) -> None:
+        """
+        Serve the rows of unchanged items from a persistent cache instead of summarizing them again
+
+        Args:
+            cache: The cache to use. Pass None to disable caching.
+        """
+        self._row_cache = cache
+
     @abstractmethod
     async def init_data(self, ctx: Context): ...
 
@@ -50,8 +115,10 @@ class BaseScraper(FunctionTool, ABC):
         output_columns: List[Column],
         batch_size: int = 1,
         limit: int = -1,
-        concurrency: int = 1,
+        concurrency: int | Literal["auto"] | AdaptiveConcurrency = 1,
         row_offset: int = 0,
+        stream_rows: bool = False,
+        batch_tokens: int | None = None,
     ) -> AsyncGenerator[RowBatch, None]:
         """
         Summarize the content of a webpage into a csv table represented as a stream of item objects.
@@ -62,7 +129,9 @@ class BaseScraper(FunctionTool, ABC):
             output_columns: The columns of the output table. If not provided, use the `infer_columns` function to infer the columns.
             batch_size: The number of rows to summarize in each batch. Default is 1.
             limit: The maximum number of rows to summarize. If -1, all rows are summarized.
-            concurrency: The number of concurrent tasks to run. Default is 1.
+            concurrency: The number of concurrent tasks to run. Use "auto" to adjust the concurrency adaptively. Default is 1.
+            stream_rows: Whether to stream the LLM response and yield each row in its own batch as soon as it is generated.
+            batch_tokens: If set, pack items into batches by the estimated input and output tokens instead of a fixed count. `batch_size` still caps the number of items in a batch.
 
         Returns:
             A stream of rows. Each item is a dictionary with keys corresponding to the column names and values corresponding to the column values.
@@ -72,80 +141,318 @@ class BaseScraper(FunctionTool, ABC):
 
         await self.init_data(ctx)
 
+        if concurrency == "auto":
+            concurrency = AdaptiveConcurrency()
+
+        self._batch_stats = []
+        # tokens of the instructions sent along with every batch
+        prompt_tokens = self._estimate_tokens(
+            self._build_summarize_prompt(output_columns)
+        )
+
         total_row_summarized = 0
         # remaining rows to summarize, excluding the rows being summarized
         remaining_rows = limit
         batch_no = 0
+        row_number_count = 0
+        # number of batches fetched but not yet summarized
+        pending_batches = 0
+
+        # notified when the remaining count or the pending batches change
+        cond = asyncio.Condition()
+
+        # fetched batches waiting to be summarized, None marks the end of the items
+        items_queue: asyncio.Queue[_PendingBatch | None] = asyncio.Queue(
+            maxsize=(
+                concurrency.max_concurrency
+                if isinstance(concurrency, AdaptiveConcurrency)
+                else concurrency
+            )
+        )
+        # failed batches waiting to be retried
+        retry_batches: Deque[_PendingBatch] = deque()
+        # whether the producer has finished
+        all_fetched = False
+
+        async def fetch_batches():
+            """Producer: retrieve items from the source and put them into the queue"""
+            nonlocal remaining_rows, batch_no, row_number_count, pending_batches
+
+            # items retrieved but not yet packed into a batch
+            carry: List[SourceItem] = []
+            source_exhausted = False
+
+            while True:
+                async with cond:
+                    # the summarized rows may fall short of the requested count,
+                    # wait for the pending batches to give back the quota
+                    await cond.wait_for(
+                        lambda: limit == -1
+                        or remaining_rows > 0
+                        or pending_batches == 0
+                    )
 
-        lock = asyncio.Lock()
+                    if limit != -1 and remaining_rows <= 0:
+                        return
 
-        row_number_count = 0
+                    # shrink the batch if its output is not expected to fit into one response
+                    max_count = min(
+                        batch_size,
+                        self._max_rows_per_call() or batch_size,
+                    )
 
-        # TODO
-        # 1. one task for retrieve html items
-        # 2. one task for summarize html items
+                    if limit != -1:
+                        max_count = min(max_count, remaining_rows)
 
-        async def run_batch(results_queue: asyncio.Queue[RowBatch]):
-            nonlocal total_row_summarized, row_number_count, remaining_rows, batch_no
+                if len(carry) < max_count and not source_exhausted:
+                    data = await self._next_items_with_retry(
+                        ctx, max_count - len(carry)
+                    )
 
-            if limit != -1 and remaining_rows <= 0:
-                return
+                    if data:
+                        carry.extend(data)
+                    else:
+                        source_exhausted = True
+
+                if not carry:
+                    await ctx.send_debug_message(f"[{self.name}] No more rows found")
+                    return
+
+                if batch_tokens is None:
+                    count = min(len(carry), max_count)
+                else:
+                    count, estimated_tokens = self._pack_items(
+                        items=carry[:max_count],
+                        budget=batch_tokens - prompt_tokens,
+                        output_columns=output_columns,
+                    )
+                    self._batch_stats.append(
+                        BatchStats(
+                            batch_id=batch_no,
+                            item_count=count,
+                            estimated_tokens=prompt_tokens + estimated_tokens,
+                            budget=batch_tokens,
+                        )
+                    )
+                    await ctx.send_debug_message(
+                        f"[{self.name}] Packed {count} items into batch #{batch_no}, "
+                        f"~{prompt_tokens + estimated_tokens}/{batch_tokens} tokens "
+                        f"({(prompt_tokens + estimated_tokens) / batch_tokens:.0%} full)"
+                    )
 
-            async with lock:
-                current_batch = batch_no
-                batch_no += 1
+                data, carry = carry[:count], carry[count:]
 
-                # calculate the number of rows to summarize in the current batch
-                requested_count = (
-                    min(batch_size, remaining_rows) if limit != -1 else batch_size
-                )
-                # reduce the remaining count by the number of rows in the current batch
-                # so that the other tasks will not exceed the limit
-                remaining_rows -= requested_count
+                async with cond:
+                    batch = _PendingBatch(
+                        batch_id=batch_no,
+                        offset=row_number_count,
+                        requested_count=len(data),
+                        items=data,
+                        attempts=0,
+                    )
+                    batch_no += 1
+                    row_number_count += len(data)
+                    pending_batches += 1
+                    # reduce the remaining count by the number of rows in the current batch
+                    # so that the other batches will not exceed the limit
+                    remaining_rows -= len(data)
 
-            data = await self.next_items(ctx=ctx, count=requested_count)
+                await items_queue.put(batch)
 
-            if not data:
-                await ctx.send_debug_message(f"[{self.name}] No more rows found")
-                return
+        async def run_producer():
+            try:
+                await fetch_batches()
+            except Exception:
+                logger.error(f"Error fetching items: {traceback.format_exc()}")
 
-            # await ctx.send_debug_message(
-            #     f"[{self.name}] Parsed markdown: {parsed_result.markdown}"
-            # )
+            await items_queue.put(None)
 
-            async with lock:
-                current_batch_row_number_offset = row_number_count
-                row_number_count += len(data)
+        async def finish_batch(summarized_count: int, requested_count: int):
+            nonlocal remaining_rows, pending_batches, total_row_summarized
 
-            rows = await self._summarize_llm_call(
+            async with cond:
+                pending_batches -= 1
+                total_row_summarized += summarized_count
+                # recalculate the remaining count in case summary returned fewer rows than requested
+                if summarized_count < requested_count:
+                    remaining_rows += requested_count - summarized_count
+                cond.notify_all()
+
+        async def next_batch() -> _PendingBatch | None:
+            nonlocal all_fetched
+
+            while True:
+                if retry_batches:
+                    return retry_batches.popleft()
+
+                if all_fetched:
+                    # wait for the batches being summarized in case they fail and need retrying
+                    async with cond:
+                        await cond.wait_for(
+                            lambda: retry_batches or pending_batches == 0
+                        )
+
+                    if retry_batches:
+                        continue
+
+                    return None
+
+                batch = await items_queue.get()
+
+                if batch is not None:
+                    return batch
+
+                # put the end mark back for the other consumers
+                all_fetched = True
+                items_queue.put_nowait(None)
+
+        async def retry_later(batch: _PendingBatch):
+            batch["attempts"] += 1
+
+            if batch["attempts"] < _MAX_BATCH_ATTEMPTS:
+                async with cond:
+                    retry_batches.append(batch)
+                    cond.notify_all()
+            else:
+                await finish_batch(0, batch["requested_count"])
+
+        async def split_batch(
+            batch: _PendingBatch,
+            summarized_count: int,
+            missing_items: List[SourceItem],
+        ):
+            """Queue the items missing from a truncated response as smaller batches for the idle consumers"""
+            nonlocal batch_no, pending_batches
+
+            chunk_size = max(
+                1,
+                min(
+                    math.ceil(len(missing_items) / 2),
+                    self._max_rows_per_call() or len(missing_items),
+                ),
+            )
+
+            async with cond:
+                for i in range(0, len(missing_items), chunk_size):
+                    chunk = missing_items[i : i + chunk_size]
+                    retry_batches.append(
+                        _PendingBatch(
+                            batch_id=batch_no,
+                            offset=batch["offset"] + summarized_count + i,
+                            requested_count=len(chunk),
+                            items=chunk,
+                            attempts=0,
+                        )
+                    )
+                    batch_no += 1
+                    pending_batches += 1
+
+            await ctx.send_debug_message(
+                f"[{self.name}] Response truncated, re-dispatching {len(missing_items)} items "
+                f"in {math.ceil(len(missing_items) / chunk_size)} batches"
+            )
+
+            # the quota of the missing items is taken over by the new batches
+            await finish_batch(
+                summarized_count,
+                batch["requested_count"] - len(missing_items),
+            )
+
+        async def stream_batch(
+            batch: _PendingBatch,
+            results_queue: asyncio.Queue[RowBatch],
+        ) -> int:
+            requested_count = batch["requested_count"]
+            count = 0
+
+            stream = self._summarize_llm_call_stream(
                 ctx=ctx,
-                items=data,
+                items=batch["items"],
                 output_columns=output_columns,
             )
 
+            try:
+                async with aclosing(stream):
+                    async for row in stream:
+                        if limit != -1 and count >= requested_count:
+                            break
+
+                        count += 1
+                        row["row_no"] = batch["offset"] + row_offset + count
+
+                        # forward each row downstream as soon as it is parsed
+                        await results_queue.put(
+                            RowBatch(
+                                offset=row["row_no"] - 1,
+                                batch_id=batch["batch_id"],
+                                items=[row],
+                            )
+                        )
+            except _TruncatedBatchError as e:
+                await split_batch(batch, count, e.missing_items)
+                return count
+            except Exception:
+                # rows already emitted can not be taken back, so only retry untouched batches
+                if count == 0:
+                    await retry_later(batch)
+                else:
+                    await finish_batch(count, requested_count)
+                raise
+
+            await finish_batch(count, requested_count)
+
+            return count
+
+        async def summarize_batch(results_queue: asyncio.Queue[RowBatch]) -> bool:
+            """Consumer: summarize the fetched items with LLM"""
+            batch = await next_batch()
+
+            if batch is None:
+                return False
+
+            if stream_rows:
+                count = await stream_batch(batch, results_queue)
+
+                await ctx.send_debug_message(f"[{self.name}] Summarized {count} rows")
+                await ctx.send_debug_message(
+                    f"[{self.name}] Summarized {total_row_summarized} rows in total"
+                )
+
+                return True
+
+            missing_items = []
+
+            try:
+                rows = await self._summarize_llm_call(
+                    ctx=ctx,
+                    items=batch["items"],
+                    output_columns=output_columns,
+                )
+            except _TruncatedBatchError as e:
+                rows, missing_items = e.rows, e.missing_items
+            except Exception:
+                await retry_later(batch)
+                raise
+
             await ctx.send_debug_message(f"[{self.name}] Summarized {len(rows)} rows")
-            #
-            # if not rows:
-            #     await ctx.send_debug_message(f"[{self.name}] No rows summarized")
-            #     return
-
-            async with lock:
-                items_slice = rows[:requested_count] if limit != -1 else rows
-                summarized_count = len(items_slice)
-                total_row_summarized += summarized_count
-                # recalculate the remaining count in case summary returned fewer rows than requested
-                if summarized_count < requested_count:
-                    remaining_rows += requested_count - summarized_count
+
+            requested_count = batch["requested_count"] - len(missing_items)
+            items_slice = rows[:requested_count] if limit != -1 else rows
+
+            if missing_items:
+                await split_batch(batch, len(items_slice), missing_items)
+            else:
+                await finish_batch(len(items_slice), requested_count)
 
             count = 1
             for row in items_slice:
-                row["row_no"] = current_batch_row_number_offset + row_offset + count
+                row["row_no"] = batch["offset"] + row_offset + count
                 count += 1
 
             await results_queue.put(
                 RowBatch(
-                    offset=current_batch_row_number_offset + row_offset,
-                    batch_id=current_batch,
+                    offset=batch["offset"] + row_offset,
+                    batch_id=batch["batch_id"],
                     items=items_slice,
                 )
             )
@@ -154,11 +461,48 @@ class BaseScraper(FunctionTool, ABC):
                 f"[{self.name}] Summarized {total_row_summarized} rows in total"
             )
 
-            if limit == -1 or remaining_rows > 0:
-                await run_batch(results_queue)
+            return True
+
+        # fetch items in the background so that the browser keeps working
+        # while the LLM is summarizing the previous batches
+        producer = asyncio.create_task(run_producer())
+        # measure how long the event loop is blocked by synchronous work
+        self._loop_lag = LoopLagMonitor()
+        self._loop_lag.start()
+
+        try:
+            async for chunk in concurrent_task_runner(summarize_batch, concurrency):
+                yield chunk
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            await self._loop_lag.stop()
+
+        await ctx.send_debug_message(
+            f"[{self.name}] Event loop lag: max {self._loop_lag.max_lag * 1000:.0f}ms, "
+            f"avg {self._loop_lag.avg_lag * 1000:.1f}ms"
+        )
+
+    async def _next_items_with_retry(
+        self,
+        ctx: Context,
+        count: int,
+    ) -> List[SourceItem] | None:
+        """
+        Retrieve the next items, retrying on congestion errors like browser timeouts
+
+        Args:
+            ctx: NPi context.
+            count: The number of items to retrieve.
+        """
+        for attempt in range(_MAX_BATCH_ATTEMPTS):
+            try:
+                return await self.next_items(ctx=ctx, count=count)
+            except Exception as e:
+                if not is_congestion_error(e) or attempt == _MAX_BATCH_ATTEMPTS - 1:
+                    raise
 
-        async for chunk in concurrent_task_runner(run_batch, concurrency):
-            yield chunk
+                await asyncio.sleep(attempt + 1)
 
     @function
     async def summarize(
@@ -280,9 +624,101 @@ class BaseScraper(FunctionTool, ABC):
         Returns:
             The summarized items as a list of dictionaries.
         """
+        rows = []
 
-        # add id column to the output columns
-        output_columns_with_index = [__INDEX_COLUMN__, *output_columns]
+        try:
+            async for row in self._summarize_llm_call_stream(
+                ctx=ctx,
+                items=items,
+                output_columns=output_columns,
+                stream=False,
+            ):
+                rows.append(row)
+        except _TruncatedBatchError as e:
+            e.rows = sorted(rows, key=lambda row: row["original_data_index"])
+            raise
+
+        # cached rows are yielded before the summarized ones
+        return sorted(rows, key=lambda row: row["original_data_index"])
+
+    async def _summarize_llm_call_stream(
+        self,
+        ctx: Context,
+        items: List[SourceItem],
+        output_columns: List[Column],
+        stream: bool = True,
+    ) -> AsyncGenerator[Row, None]:
+        """
+        Summarize the content of a webpage into a table using LLM, yielding the rows as they are generated.
+        Rows in the row cache are yielded directly and only the missed items are sent to the LLM.
+
+        Args:
+            ctx: NPi context.
+            items: The items to summarize.
+            output_columns: The columns of the output table.
+            stream: Whether to stream the completion.
+        """
+        if self._row_cache is None:
+            rows_stream = self._summarize_items_stream(
+                ctx=ctx,
+                items=items,
+                output_columns=output_columns,
+                stream=stream,
+            )
+
+            async with aclosing(rows_stream):
+                async for row in rows_stream:
+                    yield row
+
+            return
+
+        column_spec = self._build_summarize_prompt(output_columns)
+        keys = [get_row_key(item["hash"], column_spec, ctx.llm.model) for item in items]
+        missing_indices = []
+
+        for index, key in enumerate(keys):
+            values = await self._row_cache.get(key)
+
+            if values is None:
+                missing_indices.append(index)
+                continue
+
+            yield Row(
+                hash=items[index]["hash"],
+                original_data_index=index,
+                values=values,
+            )
+
+        if len(missing_indices) < len(items):
+            await ctx.send_debug_message(
+                f"[{self.name}] Served {len(items) - len(missing_indices)} rows from cache"
+            )
+
+        if not missing_indices:
+            return
+
+        rows_stream = self._summarize_items_stream(
+            ctx=ctx,
+            items=[items[i] for i in missing_indices],
+            output_columns=output_columns,
+            stream=stream,
+        )
+
+        async with aclosing(rows_stream):
+            async for row in rows_stream:
+                # map the index back to the original items
+                index = missing_indices[row["original_data_index"]]
+                row["original_data_index"] = index
+                await self._row_cache.set(keys[index], row["values"])
+                yield row
+
+    async def _summarize_items_stream(
+        self,
+        ctx: Context,
+        items: List[SourceItem],
+        output_columns: List[Column],
+        stream: bool = True,
+    ) -> AsyncGenerator[Row, None]:
 
         items_with_index = [
             {"index": i, "data": item["data"]} for i, item in enumerate(items)
@@ -291,11 +727,7 @@ class BaseScraper(FunctionTool, ABC):
         messages = [
             ChatCompletionSystemMessageParam(
                 role="system",
-                content=self.summarize_prompt.format(
-                    column_defs=json.dumps(
-                        output_columns_with_index, ensure_ascii=False
-                    )
-                ),
+                content=self._build_summarize_prompt(output_columns),
             ),
             ChatCompletionUserMessageParam(
                 role="user",
@@ -303,27 +735,131 @@ class BaseScraper(FunctionTool, ABC):
             ),
         ]
 
-        results = []
+        emitted_indices = set()
+        truncated = False
 
         try:
-            async for row in llm_summarize(ctx, messages):
-                index = int(row.pop(__INDEX_COLUMN__["name"]))
-                if index >= len(items):
-                    logger.warning(
-                        f"Index {index} out of range, row: {row}, items: {items}"
-                    )
-                    continue
-                results.append(
-                    Row(
+            rows_stream = llm_summarize(
+                ctx,
+                messages,
+                stream=stream,
+                max_tokens=self.summarize_max_tokens,
+                # a single item can not be split any further
+                continue_on_length=len(items) == 1,
+            )
+
+            async with aclosing(rows_stream):
+                async for row in rows_stream:
+                    index = int(row.pop(__INDEX_COLUMN__["name"]))
+                    if index >= len(items):
+                        logger.warning(
+                            f"Index {index} out of range, row: {row}, items: {items}"
+                        )
+                        continue
+
+                    emitted_indices.add(index)
+                    self._update_row_tokens_estimate(row)
+
+                    yield Row(
                         hash=items[index]["hash"],
                         original_data_index=index,
                         values=row,
                     )
-                )
+        except TruncatedResponseError:
+            truncated = True
         except Exception as e:
+            # let the task runner back off and retry
+            if is_congestion_error(e):
+                raise
+
             logger.warning(
                 f"Error parsing the response: {traceback.format_exc()}",
             )
             await ctx.send_error_message(f"Error parsing the response: {str(e)}")
 
-        return results
+        if not truncated:
+            return
+
+        # the items that were not emitted are re-dispatched as smaller batches by `summarize_stream`
+        missing_items = [
+            item for i, item in enumerate(items) if i not in emitted_indices
+        ]
+
+        if missing_items:
+            raise _TruncatedBatchError(missing_items)
+
+    def get_loop_lag(self) -> LoopLagMonitor | None:
+        """Get the event loop lag measured during the last `summarize_stream` run"""
+        return self._loop_lag
+
+    def get_batch_stats(self) -> List[BatchStats]:
+        """Get the fill stats of the batches packed in the last `batch_tokens` run"""
+        return getattr(self, "_batch_stats", [])
+
+    def _build_summarize_prompt(self, output_columns: List[Column]) -> str:
+        # add id column to the output columns
+        output_columns_with_index = [__INDEX_COLUMN__, *output_columns]
+
+        return self.summarize_prompt.format(
+            column_defs=json.dumps(output_columns_with_index, ensure_ascii=False)
+        )
+
+    @staticmethod
+    def _estimate_tokens(data: Any) -> int:
+        if not isinstance(data, str):
+            data = json.dumps(data, ensure_ascii=False)
+
+        # ~4 characters per token for english text
+        return len(data) // 4
+
+    def _pack_items(
+        self,
+        items: List[SourceItem],
+        budget: int,
+        output_columns: List[Column],
+    ) -> Tuple[int, int]:
+        """
+        Greedily pack items into a batch within the token budget.
+        Returns the number of packed items and their estimated tokens.
+
+        Args:
+            items: The candidate items.
+            budget: The token budget of the items.
+            output_columns: The columns of the output table.
+        """
+        row_tokens = self._row_tokens_estimate or _COLUMN_OUTPUT_TOKENS * (
+            len(output_columns) + 1
+        )
+
+        count = 0
+        total_tokens = 0
+
+        for item in items:
+            tokens = self._estimate_tokens({"index": count, "data": item["data"]})
+            tokens += row_tokens
+
+            # always take at least one item
+            if count > 0 and total_tokens + tokens > budget:
+                break
+
+            count += 1
+            total_tokens += tokens
+
+        return count, int(total_tokens)
+
+    def _update_row_tokens_estimate(self, values: Dict[str, str | None]):
+        # each cell is quoted and delimited, ~4 characters per token
+        tokens = sum(len(v or "") + 3 for v in values.values()) / 4
+
+        if self._row_tokens_estimate is None:
+            self._row_tokens_estimate = tokens
+        else:
+            self._row_tokens_estimate = 0.8 * self._row_tokens_estimate + 0.2 * tokens
+
+    def _max_rows_per_call(self) -> int | None:
+        """Estimate the maximum number of rows that fit into one summary response"""
+        if not self._row_tokens_estimate:
+            return None
+
+        # leave some headroom for the header and the estimation error
+        return max(1, int(self.summarize_max_tokens * 0.8 / self._row_tokens_estimate))
@@ -1,6 +1,7 @@
 import asyncio
 import json
-from typing import AsyncGenerator, List, cast
+from collections import deque
+from typing import AsyncGenerator, Deque, List, Literal, cast
 
 import pymupdf
 from litellm.types.completion import (
@@ -11,7 +12,12 @@ from typing_extensions import TypedDict
 
 from npiai import Context
 from npiai.tools.shared_types.base_email_tool import BaseEmailTool, EmailMessage
-from npiai.utils import llm_tool_call, concurrent_task_runner
+from npiai.utils import (
+    llm_tool_call,
+    concurrent_task_runner,
+    AdaptiveConcurrency,
+    is_congestion_error,
+)
 from npiai.tools.scrapers import BaseScraper, SourceItem
 from .prompts import FILTER_PROMPT
 from .types import FilterResult
@@ -109,7 +115,7 @@ class EmailOrganizer(BaseScraper):
         self,
         ctx: Context,
         criteria: str,
-        concurrency: int = 1,
+        concurrency: int | Literal["auto"] | AdaptiveConcurrency = 1,
     ) -> AsyncGenerator[FilterResult, None]:
         """
         Filter emails based on specific criteria
@@ -117,19 +123,35 @@ class EmailOrganizer(BaseScraper):
         Args:
             ctx: NPi Context
             criteria: Filtering criteria
-            concurrency: Number of concurrent filtering tasks
+            concurrency: Number of concurrent filtering tasks, or "auto" to adjust it adaptively
         """
 
-        async def process_email(results_queue: asyncio.Queue[FilterResult]):
-            emails = await self.next_items(ctx, 1)
+        # emails taken by a call that failed on congestion, picked up again by the next call
+        retry_emails: Deque[SourceItem] = deque()
+
+        async def process_email(results_queue: asyncio.Queue[FilterResult]) -> bool:
+            if retry_emails:
+                email = retry_emails.popleft()
+            else:
+                emails = await self.next_items(ctx, 1)
+
+                if not emails:
+                    return False
+
+                email = emails[0]
 
-            if not emails:
-                return
+            try:
+                res = await self._filter_llm_call(ctx, email["data"], criteria)
+            except Exception as e:
+                # the task runner retries congestion errors by calling `process_email` again,
+                # which would fetch the next email and drop this one
+                if is_congestion_error(e):
+                    retry_emails.append(email)
+                raise
 
-            res = await self._filter_llm_call(ctx, emails[0]["data"], criteria)
             await results_queue.put(res)
 
-            await process_email(results_queue)
+            return True
 
         async for result in concurrent_task_runner(process_email, concurrency):
             yield result
@@ -1,3 +1,4 @@
 from .app import PageAnalyzer
+from .cache import AnalysisCache
 
-__all__ = ["PageAnalyzer"]
+__all__ = ["PageAnalyzer", "AnalysisCache"]
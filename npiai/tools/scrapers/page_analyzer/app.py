@@ -1,7 +1,8 @@
+import asyncio
 import json
 from urllib.parse import urljoin
 from textwrap import dedent
-from typing import Literal, List
+from typing import Literal, List, Dict, Tuple, Callable, Awaitable
 from typing_extensions import TypedDict
 from playwright.async_api import Error as PlaywrightError
 
@@ -13,13 +14,27 @@ from litellm.types.completion import (
 
 
 from npiai import BrowserTool, function, Context
-from npiai.utils import llm_tool_call, html_to_markdown
-from npiai.tools.scrapers.utils import init_items_observer, has_items_added
+from npiai.core import ResourcePolicy
+from npiai.core.browser import ImageFormat
+from npiai.utils import llm_tool_call, markdown_service
+from npiai.tools.scrapers.types import PaginationURLTemplate
+from npiai.tools.scrapers.utils import (
+    init_items_observer,
+    has_items_added,
+    get_pagination_link,
+    get_page_signature,
+    infer_pagination_url_template,
+)
+
+from .cache import AnalysisCache, get_analysis_key, get_url_pattern
 
 ScrapingType = Literal["list-like", "single"]
 
 _MAX_SCREENSHOT_SIZE = (1280, 720)
 
+# depth of the DOM skeleton used to fingerprint the page structure
+_STRUCTURE_FINGERPRINT_DEPTH = 8
+
 
 class CommonSelectors(TypedDict):
     items: str
@@ -27,6 +42,23 @@ class CommonSelectors(TypedDict):
     anchors: str
 
 
+class PaginationCandidate(TypedDict):
+    selector: str
+    # between 0 and 1
+    confidence: float
+    # names of the matched signals, e.g. `rel-next` or `name-next`
+    signals: List[str]
+
+
+class PageAnalysis(TypedDict):
+    url: str
+    scraping_type: ScrapingType
+    selectors: CommonSelectors | None
+    infinite_scroll: bool
+    pagination_button_selector: str | None
+    pagination_url_template: PaginationURLTemplate | None
+
+
 class PageAnalyzer(BrowserTool):
     name = "page_analyzer"
     description = "Analyze a web page for scraping purposes"
@@ -39,10 +71,20 @@ class PageAnalyzer(BrowserTool):
     _force_captcha_detection: bool
     _open_new_page: bool
 
+    # inferred URL templates keyed by the page URL and the pagination button selector
+    _pagination_url_templates: Dict[Tuple[str, str], PaginationURLTemplate | None]
+
+    _analysis_cache: AnalysisCache | None = None
+    # minimum number of items a cached items selector must match to be reused
+    _analysis_cache_min_items: int = 3
+
     def __init__(
         self,
         force_captcha_detection: bool = False,
         open_new_page=True,
+        resource_policy: ResourcePolicy | None = ResourcePolicy.text_only(),
+        screenshot_format: ImageFormat = "jpeg",
+        screenshot_quality: int | None = 80,
         **kwargs,
     ):
         """
@@ -51,11 +93,134 @@ class PageAnalyzer(BrowserTool):
         Args:
             force_captcha_detection: Whether to force the captcha detection when loading the page.
             open_new_page: Whether to open a new page when analyzing the page. If set to False, the current page will be used.
+            resource_policy: Policy of the requests to block for the analyses without screenshots. Screenshot based analyses always load the full page.
+            screenshot_format: Image format of the screenshots sent to the vision model.
+            screenshot_quality: Quality of jpeg and webp screenshots between 0 and 100.
             **kwargs: BrowserTool arguments
         """
-        super().__init__(**kwargs)
+        super().__init__(
+            resource_policy=resource_policy,
+            screenshot_format=screenshot_format,
+            screenshot_quality=screenshot_quality,
+            **kwargs,
+        )
         self._force_captcha_detection = force_captcha_detection
         self._open_new_page = open_new_page
+        self._pagination_url_templates = {}
+
+    def use_analysis_cache(
+        self,
+        cache: AnalysisCache | None,
+        min_items: int = 3,
+    ) -> None:
+        """
+        Reuse the analyses of the pages rendered from the same template instead of analyzing them again
+
+        Args:
+            cache: The cache to use. Pass None to disable caching.
+            min_items: Minimum number of items the cached items selector must match in the page to be reused. Pages with fewer items in the cached analysis only need to match as many.
+        """
+        self._analysis_cache = cache
+        self._analysis_cache_min_items = min_items
+
+    async def _get_analysis_key(self) -> str:
+        structure_fingerprint = await self.playwright.page.evaluate(
+            "(maxDepth) => npi.getStructureFingerprint(maxDepth)",
+            _STRUCTURE_FINGERPRINT_DEPTH,
+        )
+
+        return get_analysis_key(
+            url_pattern=get_url_pattern(await self.get_page_url()),
+            structure_fingerprint=structure_fingerprint,
+        )
+
+    async def _get_cached_analysis(
+        self,
+        ctx: Context,
+        url: str,
+        key: str,
+    ) -> PageAnalysis | None:
+        cached = await self._analysis_cache.get(key)
+
+        if cached is None:
+            return None
+
+        # make sure the cached selectors still work in the current page
+        selectors = cached["selectors"]
+        pagination_button_selector = cached["pagination_button_selector"]
+        checks = []
+
+        if selectors:
+            checks.append(
+                (
+                    selectors["items"],
+                    min(self._analysis_cache_min_items, cached["items_count"]),
+                )
+            )
+            checks.append((selectors["ancestor"], 1))
+
+        if pagination_button_selector:
+            checks.append((pagination_button_selector, 1))
+
+        if checks:
+            counts = await self.playwright.page.evaluate(
+                "(selectors) => npi.countElements(selectors)",
+                [selector for selector, _ in checks],
+            )
+
+            if any(count < min_count for (_, min_count), count in zip(checks, counts)):
+                await ctx.send_debug_message(
+                    "Cached page analysis does not match the page"
+                )
+                return None
+
+        pagination_url_template = None
+
+        if pagination_button_selector:
+            # the template depends on the URL, so it is inferred for each page
+            pagination_url_template = await self._infer_pagination_url_template(
+                ctx=ctx,
+                url=url,
+                pagination_button_selector=pagination_button_selector,
+            )
+
+        # infinite scroll can change without the DOM structure changing,
+        # and checking it does not need the LLM, so it is not cached
+        infinite_scroll = await self.playwright.page.evaluate(
+            "(itemsSelector) => npi.supportInfiniteScroll(itemsSelector)",
+            selectors["items"] if selectors else "*",
+        )
+
+        await ctx.send_debug_message("Served page analysis from cache")
+
+        return {
+            "url": await self.get_page_url(),
+            "scraping_type": cached["scraping_type"],
+            "selectors": selectors,
+            "infinite_scroll": infinite_scroll,
+            "pagination_button_selector": pagination_button_selector,
+            "pagination_url_template": pagination_url_template,
+        }
+
+    async def _set_cached_analysis(self, key: str, analysis: PageAnalysis):
+        selectors = analysis["selectors"]
+        items_count = 0
+
+        if selectors:
+            [items_count] = await self.playwright.page.evaluate(
+                "(selectors) => npi.countElements(selectors)",
+                [selectors["items"]],
+            )
+
+        await self._analysis_cache.set(
+            key,
+            {
+                "scraping_type": analysis["scraping_type"],
+                "selectors": selectors,
+                "items_count": items_count,
+                "pagination_button_selector": analysis["pagination_button_selector"],
+            },
+        )
 
     async def _validate_pagination(
         self,
@@ -67,10 +232,13 @@ class PageAnalyzer(BrowserTool):
         if not pagination_button_selector:
             return False
 
-        # validate the pagination button in a new playwright instance to avoid side effects
-        playwright_clone = await self.playwright.clone()
+        # validate the pagination button in a sibling browser context to avoid side effects,
+        # which shares the browser instead of launching a new one
+        playwright = await self.playwright.new_sibling()
+        # the validation compares screenshots
+        await playwright.set_resource_policy(None)
 
-        async with BrowserTool(playwright=playwright_clone) as browser:
+        async with BrowserTool(playwright=playwright) as browser:
             await browser.load_page(ctx, url)
 
             handle = await browser.playwright.page.evaluate_handle(
@@ -83,11 +251,20 @@ class PageAnalyzer(BrowserTool):
             if not elem:
                 return False
 
+            has_items_selector = items_selector and items_selector != "*"
+            old_signature = has_items_selector and await get_page_signature(
+                browser.playwright.page,
+                items_selector,
+            )
+
+            # the screenshots only cover the viewport around the pagination button,
+            # which is where the content changes
             await browser.back_to_top()
-            old_screenshot = await browser.get_screenshot(
-                full_page=True,
-                max_size=_MAX_SCREENSHOT_SIZE,
+            await elem.scroll_into_view_if_needed()
+            old_scroll = await browser.playwright.page.evaluate(
+                "() => [window.scrollX, window.scrollY]"
             )
+            old_screenshot = await browser.get_screenshot()
             old_url = await browser.get_page_url()
             old_title = await browser.get_page_title()
 
@@ -98,8 +275,6 @@ class PageAnalyzer(BrowserTool):
             except PlaywrightError:
                 return False
 
-            has_items_selector = items_selector and items_selector != "*"
-
             # attach mutation observer to check if new items are added
             if has_items_selector:
                 await init_items_observer(
@@ -118,13 +293,30 @@ class PageAnalyzer(BrowserTool):
 
             new_url = await browser.get_page_url()
 
-            if new_url == old_url and has_items_selector:
-                return await has_items_added(browser.playwright, timeout=5000)
+            # the URL and the items tell whether the button works in most cases,
+            # the screenshots are only compared when they are not conclusive
+            if has_items_selector:
+                if new_url == old_url:
+                    return await has_items_added(browser.playwright, timeout=5000)
+
+                new_signature = await get_page_signature(
+                    browser.playwright.page,
+                    items_selector,
+                    timeout=3000,
+                )
+
+                if new_signature and new_signature != old_signature:
+                    return True
 
-            new_screenshot = await browser.get_screenshot(
-                full_page=True,
-                max_size=_MAX_SCREENSHOT_SIZE,
+            # a navigating click opens the next page at the top, scroll it to the position
+            # of the old screenshot so that both show the same part of the page
+            await browser.playwright.page.evaluate(
+                "([x, y]) => window.scrollTo(x, y)",
+                old_scroll,
             )
+            await browser.playwright.page.wait_for_timeout(300)
+
+            new_screenshot = await browser.get_screenshot()
             new_title = await browser.get_page_title()
 
             async def callback(is_next_page: bool):
@@ -198,206 +390,18 @@ class PageAnalyzer(BrowserTool):
                 ],
             )
 
-    async def get_selector_of_marker(self, marker_id: int = -1) -> str | None:
-        """
-        Get the CSS selector of the element with the given marker ID. If the marker ID is -1, it means the marker is not found and None is returned.
-
-        Args:
-            marker_id: Marker ID of the element.
-        """
-
-        if marker_id == -1:
-            return None
-
-        return await self.playwright.page.evaluate(
-            """(markerId) => {
-                const el = npi.getElement(markerId);
-                return el && npi.getUniqueSelector(el);
-            }""",
-            marker_id,
-        )
-
-    async def compute_common_selectors(
+    async def _collect_interactive_elements(
         self,
-        anchor_ids: List[int],
-    ) -> CommonSelectors | None:
+        page_url: str,
+        raw_screenshot: str,
+    ) -> Tuple[List[dict], str]:
         """
-        Expand the anchors with the given IDs and compute the common items and ancestor selector.
+        Mark the interactive elements and take the annotated screenshot
 
         Args:
-            anchor_ids: An array of IDs of the elements that are similar to each other and represent a meaningful list of items.
+            page_url: URL of the current page.
+            raw_screenshot: Screenshot of the page without annotations.
         """
-        # print("anchor_ids:", anchor_ids)
-
-        if not anchor_ids:
-            return None
-
-        # extract the first 3 elements
-        # to find common items and ancestor selector
-        return await self.playwright.page.evaluate(
-            """(anchorIds) => {
-                try {
-                    const anchorElements = anchorIds.map(id => npi.getElement(id));
-                                        
-                    const selectors = npi.selectorUtils.getCommonItemsAndAncestor(...anchorElements);
-                    
-                    if (!selectors) {
-                        return null;
-                    }
-                    
-                    const splitSelectors = selectors.items.split(' ');
-                    const lastSelector = splitSelectors.at(-1);
-                    const isDirectChildrenSelector = splitSelectors.at(-2) === '>';
-                    
-                    if (!lastSelector) {
-                        return null;
-                    }
-                                        
-                    if (
-                      !isDirectChildrenSelector &&
-                      !lastSelector.startsWith('.') && 
-                      !lastSelector.startsWith('[')
-                    ) {
-                      // avoid using tag name selector to select all descendants
-                      return null;
-                    }
-                    
-                    return {
-                        ...selectors,
-                        anchors: anchorElements.map(el => npi.getUniqueSelector(el)).join(', '),
-                    }
-                } catch {
-                    return null;
-                }
-            }""",
-            anchor_ids[:3],
-        )
-
-    @function
-    async def support_infinite_scroll(
-        self,
-        ctx: Context,
-        url: str,
-        items_selector: str | None = None,
-    ) -> bool:
-        """
-        Open the given URL and determine whether the page supports infinite scroll.
-
-        Args:
-            ctx: NPi Context
-            url: URL of the page
-            items_selector: CSS selector of the items on the page
-        """
-        if self._open_new_page:
-            # use long wait time for pages to be fully loaded
-            await self.load_page(
-                ctx=ctx,
-                url=url,
-                timeout=3000,
-                wait_for_selector=items_selector,
-                force_capcha_detection=self._force_captcha_detection,
-            )
-
-        return await self.playwright.page.evaluate(
-            """
-            (items_selector) => {
-                let mutateElementsCount = 0;
-                const threshold = items_selector === '*' ? 10 : 3;
-                const targetSelector = `${items_selector}, ${items_selector} *`;
-                
-                const npiScrollObserver = new MutationObserver((records) => {
-                    for (const record of records) {
-                        for (const node of record.addedNodes) {
-                            if (node.nodeType === Node.ELEMENT_NODE && node.matches(targetSelector)) {
-                                mutateElementsCount++;
-                            }
-                        }
-                    }
-                });
-                
-                npiScrollObserver.observe(
-                    document.body, 
-                    { childList: true, subtree: true }
-                );
-                
-                return new Promise((resolve) => {
-                    function done() {
-                        npiScrollObserver.disconnect();
-                        resolve(mutateElementsCount >= threshold);
-                    }
-                    
-                    const body = document.body;
-                    const html = document.documentElement;
-                
-                    const pageHeight = Math.max(
-                        body.scrollHeight,
-                        body.offsetHeight,
-                        html.clientHeight,
-                        html.scrollHeight,
-                        html.offsetHeight,
-                    );
-                    
-                    const stepSize = pageHeight / 10;
-                    let current = 0;
-                    
-                    if (items_selector !== '*') {
-                      const lastItem = [...document.querySelectorAll(items_selector)].at(-1);
-                      
-                      if (lastItem) {
-                          current = lastItem.getBoundingClientRect().top;
-                          window.scrollTo(0, current);
-                      }
-                    }
-                    
-                    const interval = setInterval(() => {
-                        current += stepSize;
-                        window.scrollTo(0, current);
-                        
-                        if (current >= pageHeight || mutateElementsCount >= threshold) {
-                            clearInterval(interval);
-                            
-                            if (mutateElementsCount >= threshold) {
-                                done();
-                            } else {
-                                setTimeout(done, 300);
-                            }
-                        }
-                    }, 300);
-                });
-            }
-            """,
-            items_selector or "*",
-        )
-
-    @function
-    async def get_pagination_button(
-        self,
-        ctx: Context,
-        url: str,
-        items_selector: str | None = None,
-    ) -> str | None:
-        """
-        Open the given URL and determine whether there is a pagination button. If there is, return the CSS selector of the pagination button. Otherwise, return None.
-
-        Args:
-            ctx: NPi Context
-            url: URL of the page
-            items_selector: CSS selector of the items on the page
-        """
-        if self._open_new_page:
-            await self.load_page(
-                ctx,
-                url,
-                force_capcha_detection=self._force_captcha_detection,
-            )
-
-        # use latest page url in case of redirections
-        page_url = await self.get_page_url()
-        page_title = await self.get_page_title()
-        raw_screenshot = await self.get_screenshot(
-            full_page=True,
-            max_size=(128, 72),  # raw screenshot is only used to mark elements
-        )
         elements, _ = await self.get_interactive_elements(
             screenshot=raw_screenshot,
             full_page=True,
@@ -415,9 +419,20 @@ class PageAnalyzer(BrowserTool):
             if attrs and "href" in attrs:
                 el["href"] = urljoin(page_url, attrs["href"])
 
-        pagination_button_selector = await llm_tool_call(
+        return elements, annotated_screenshot
+
+    async def _ask_pagination_button(
+        self,
+        ctx: Context,
+        page_url: str,
+        page_title: str,
+        elements: List[dict],
+        annotated_screenshot: str,
+        get_selector_of_marker: Callable[[int], Awaitable[str | None]],
+    ) -> str | None:
+        return await llm_tool_call(
             ctx=ctx,
-            tool=self.get_selector_of_marker,
+            tool=get_selector_of_marker,
             messages=[
                 ChatCompletionSystemMessageParam(
                     role="system",
@@ -481,43 +496,13 @@ class PageAnalyzer(BrowserTool):
             ],
         )
 
-        await ctx.send_debug_message(
-            f"Pagination button selector: {pagination_button_selector}"
-        )
-
-        is_working = await self._validate_pagination(
-            ctx=ctx,
-            url=url,
-            pagination_button_selector=pagination_button_selector,
-            items_selector=items_selector,
-        )
-        await ctx.send_debug_message(f"Pagination button is working: {is_working}")
-
-        return pagination_button_selector if is_working else None
-
-    @function
-    async def infer_scraping_type(self, ctx: Context, url: str) -> ScrapingType:
-        """
-        Infer the scraping type of the page. Returns 'list-like' if the page contains a list of items, otherwise 'single'.
-
-        Args:
-            ctx: NPi Context
-            url: URL of the page
-        """
-        if self._open_new_page:
-            await self.load_page(
-                ctx,
-                url,
-                force_capcha_detection=self._force_captcha_detection,
-            )
-
-        page_url = await self.get_page_url()
-        page_title = await self.get_page_title()
-        screenshot = await self.get_screenshot(
-            full_page=True,
-            max_size=_MAX_SCREENSHOT_SIZE,
-        )
-
+    async def _ask_scraping_type(
+        self,
+        ctx: Context,
+        page_url: str,
+        page_title: str,
+        screenshot: str,
+    ) -> ScrapingType:
         async def callback(scraping_type: ScrapingType):
             """
             Set the inferrd scraping type of the page.
@@ -576,32 +561,16 @@ class PageAnalyzer(BrowserTool):
             ],
         )
 
-    @function
-    async def infer_similar_items_selector(
+    async def _collect_contentful_elements(
         self,
-        ctx: Context,
-        url: str,
-    ) -> CommonSelectors | None:
+        raw_screenshot: str,
+    ) -> Tuple[List[dict], str]:
         """
-        Open the given URL and determine whether there are similar elements representing a meaningful list of items. If there are, return the common selector of the similar elements, the ancestor selector, and the selectors of the anchor elements. Otherwise, return None.
+        Mark the most contentful elements and take the annotated screenshot
 
         Args:
-            ctx: NPi Context
-            url: URL of the page
+            raw_screenshot: Full-size screenshot of the page without annotations.
         """
-        if self._open_new_page:
-            await self.load_page(
-                ctx,
-                url,
-                timeout=3000,
-                force_capcha_detection=self._force_captcha_detection,
-            )
-
-        # use latest page url in case of redirections
-        page_url = await self.get_page_url()
-        page_title = await self.get_page_title()
-        raw_screenshot = await self.get_screenshot(full_page=True)
-
         contentful_elements = await self.playwright.page.evaluate(
             """
             (screenshot) => npi.getMostContentfulElements(screenshot, 5)
@@ -631,10 +600,27 @@ class PageAnalyzer(BrowserTool):
                 {
                     "id": el["id"],
                     "groupId": group_id,
-                    "content": html_to_markdown(el["html"]),
+                    "content": el["html"],
                 }
             )
 
+        contents = await markdown_service.convert_batch(
+            [el["content"] for el in elements_as_markdown]
+        )
+
+        for el, content in zip(elements_as_markdown, contents):
+            el["content"] = content.strip()
+
+        return elements_as_markdown, annotated_screenshot
+
+    async def _ask_similar_items(
+        self,
+        ctx: Context,
+        page_url: str,
+        page_title: str,
+        elements: List[dict],
+        annotated_screenshot: str,
+    ) -> CommonSelectors | None:
         return await llm_tool_call(
             ctx=ctx,
             tool=self.compute_common_selectors,
@@ -681,7 +667,7 @@ class PageAnalyzer(BrowserTool):
                                 {
                                     "url": page_url,
                                     "title": page_title,
-                                    "elements": elements_as_markdown,
+                                    "elements": elements,
                                 },
                                 ensure_ascii=False,
                             ),
@@ -696,3 +682,421 @@ class PageAnalyzer(BrowserTool):
                 ),
             ],
         )
+
+    async def find_pagination_candidate(self) -> PaginationCandidate | None:
+        """
+        Score the "next page" and "load more" controls of the current page by their rel attributes, accessible names and links, and return the best one. Returns None if there is no candidate.
+        """
+        return await self.playwright.page.evaluate("() => npi.findPaginationButton()")
+
+    async def get_selector_of_marker(self, marker_id: int = -1) -> str | None:
+        """
+        Get the CSS selector of the element with the given marker ID. If the marker ID is -1, it means the marker is not found and None is returned.
+
+        Args:
+            marker_id: Marker ID of the element.
+        """
+
+        if marker_id == -1:
+            return None
+
+        return await self.playwright.page.evaluate(
+            "(markerId) => npi.getSelectorOfMarker(markerId)",
+            marker_id,
+        )
+
+    async def compute_common_selectors(
+        self,
+        anchor_ids: List[int],
+    ) -> CommonSelectors | None:
+        """
+        Expand the anchors with the given IDs and compute the common items and ancestor selector.
+
+        Args:
+            anchor_ids: An array of IDs of the elements that are similar to each other and represent a meaningful list of items.
+        """
+        # print("anchor_ids:", anchor_ids)
+
+        if not anchor_ids:
+            return None
+
+        # extract the first 3 elements
+        # to find common items and ancestor selector
+        return await self.playwright.page.evaluate(
+            "(anchorIds) => npi.computeCommonSelectors(anchorIds)",
+            anchor_ids[:3],
+        )
+
+    @function
+    async def support_infinite_scroll(
+        self,
+        ctx: Context,
+        url: str,
+        items_selector: str | None = None,
+    ) -> bool:
+        """
+        Open the given URL and determine whether the page supports infinite scroll.
+
+        Args:
+            ctx: NPi Context
+            url: URL of the page
+            items_selector: CSS selector of the items on the page
+        """
+        if self._open_new_page:
+            # use long wait time for pages to be fully loaded
+            await self.load_page(
+                ctx=ctx,
+                url=url,
+                timeout=3000,
+                wait_for_selector=items_selector,
+                force_capcha_detection=self._force_captcha_detection,
+            )
+
+        return await self.playwright.page.evaluate(
+            "(itemsSelector) => npi.supportInfiniteScroll(itemsSelector)",
+            items_selector or "*",
+        )
+
+    @function
+    async def get_pagination_button(
+        self,
+        ctx: Context,
+        url: str,
+        items_selector: str | None = None,
+    ) -> str | None:
+        """
+        Open the given URL and determine whether there is a pagination button. If there is, return the CSS selector of the pagination button. Otherwise, return None.
+
+        Args:
+            ctx: NPi Context
+            url: URL of the page
+            items_selector: CSS selector of the items on the page
+        """
+        if self._open_new_page:
+            await self.load_page(
+                ctx,
+                url,
+                force_capcha_detection=self._force_captcha_detection,
+                full_rendering=True,
+            )
+
+        # use latest page url in case of redirections
+        page_url = await self.get_page_url()
+        page_title = await self.get_page_title()
+        raw_screenshot = await self.get_screenshot(
+            full_page=True,
+            max_size=(128, 72),  # raw screenshot is only used to mark elements
+        )
+        elements, annotated_screenshot = await self._collect_interactive_elements(
+            page_url=page_url,
+            raw_screenshot=raw_screenshot,
+        )
+
+        pagination_button_selector = await self._ask_pagination_button(
+            ctx=ctx,
+            page_url=page_url,
+            page_title=page_title,
+            elements=elements,
+            annotated_screenshot=annotated_screenshot,
+            get_selector_of_marker=self.get_selector_of_marker,
+        )
+
+        await ctx.send_debug_message(
+            f"Pagination button selector: {pagination_button_selector}"
+        )
+
+        if pagination_button_selector:
+            # the page is still loaded here, so the template comes for free
+            await self._infer_pagination_url_template(
+                ctx=ctx,
+                url=url,
+                pagination_button_selector=pagination_button_selector,
+            )
+
+        is_working = await self._validate_pagination(
+            ctx=ctx,
+            url=url,
+            pagination_button_selector=pagination_button_selector,
+            items_selector=items_selector,
+        )
+        await ctx.send_debug_message(f"Pagination button is working: {is_working}")
+
+        return pagination_button_selector if is_working else None
+
+    async def _infer_pagination_url_template(
+        self,
+        ctx: Context,
+        url: str,
+        pagination_button_selector: str,
+    ) -> PaginationURLTemplate | None:
+        page_url = await self.get_page_url()
+        link = await get_pagination_link(
+            self.playwright.page,
+            pagination_button_selector,
+        )
+        template = link and infer_pagination_url_template(page_url, link)
+
+        await ctx.send_debug_message(f"Pagination URL template: {template}")
+
+        self._pagination_url_templates[(url, pagination_button_selector)] = template
+        return template
+
+    @function
+    async def get_pagination_url_template(
+        self,
+        ctx: Context,
+        url: str,
+        pagination_button_selector: str,
+    ) -> PaginationURLTemplate | None:
+        """
+        Infer the URL template of the following pages from the link of the pagination button, e.g. `https://example.com/list?page={page}`. Returns None if the pagination button is not a link or the page number can not be found in the URL.
+
+        Args:
+            ctx: NPi Context
+            url: URL of the page
+            pagination_button_selector: CSS selector of the pagination button
+        """
+        key = (url, pagination_button_selector)
+
+        if key in self._pagination_url_templates:
+            return self._pagination_url_templates[key]
+
+        if self._open_new_page:
+            await self.load_page(
+                ctx,
+                url,
+                wait_for_selector=pagination_button_selector,
+                timeout=3000,
+                force_capcha_detection=self._force_captcha_detection,
+            )
+
+        return await self._infer_pagination_url_template(
+            ctx=ctx,
+            url=url,
+            pagination_button_selector=pagination_button_selector,
+        )
+
+    @function
+    async def infer_scraping_type(self, ctx: Context, url: str) -> ScrapingType:
+        """
+        Infer the scraping type of the page. Returns 'list-like' if the page contains a list of items, otherwise 'single'.
+
+        Args:
+            ctx: NPi Context
+            url: URL of the page
+        """
+        if self._open_new_page:
+            await self.load_page(
+                ctx,
+                url,
+                force_capcha_detection=self._force_captcha_detection,
+                full_rendering=True,
+            )
+
+        page_url = await self.get_page_url()
+        page_title = await self.get_page_title()
+        screenshot = await self.get_screenshot(
+            full_page=True,
+            max_size=_MAX_SCREENSHOT_SIZE,
+        )
+
+        return await self._ask_scraping_type(
+            ctx=ctx,
+            page_url=page_url,
+            page_title=page_title,
+            screenshot=screenshot,
+        )
+
+    @function
+    async def infer_similar_items_selector(
+        self,
+        ctx: Context,
+        url: str,
+    ) -> CommonSelectors | None:
+        """
+        Open the given URL and determine whether there are similar elements representing a meaningful list of items. If there are, return the common selector of the similar elements, the ancestor selector, and the selectors of the anchor elements. Otherwise, return None.
+
+        Args:
+            ctx: NPi Context
+            url: URL of the page
+        """
+        if self._open_new_page:
+            await self.load_page(
+                ctx,
+                url,
+                timeout=3000,
+                force_capcha_detection=self._force_captcha_detection,
+                full_rendering=True,
+            )
+
+        # use latest page url in case of redirections
+        page_url = await self.get_page_url()
+        page_title = await self.get_page_title()
+        raw_screenshot = await self.get_screenshot(full_page=True)
+
+        elements, annotated_screenshot = await self._collect_contentful_elements(
+            raw_screenshot
+        )
+
+        return await self._ask_similar_items(
+            ctx=ctx,
+            page_url=page_url,
+            page_title=page_title,
+            elements=elements,
+            annotated_screenshot=annotated_screenshot,
+        )
+
+    @function
+    async def analyze(self, ctx: Context, url: str) -> PageAnalysis:
+        """
+        Open the given URL once and run all the analyses on it: the scraping type, the selectors of the similar items, the infinite scroll support, the pagination button and its URL template.
+        If an analysis cache is used, pages rendered from an already analyzed template are served from the cache without calling the LLM.
+
+        Args:
+            ctx: NPi Context
+            url: URL of the page
+        """
+        if self._open_new_page:
+            await self.load_page(
+                ctx,
+                url,
+                timeout=3000,
+                force_capcha_detection=self._force_captcha_detection,
+                full_rendering=True,
+            )
+
+        cache_key = None
+
+        if self._analysis_cache is not None:
+            cache_key = await self._get_analysis_key()
+            cached = await self._get_cached_analysis(ctx, url, cache_key)
+
+            if cached is not None:
+                return cached
+
+        # use latest page url in case of redirections
+        page_url = await self.get_page_url()
+        page_title = await self.get_page_title()
+
+        # the smaller screenshots are downscaled by the browser from the same rendering
+        raw_screenshot = await self.get_screenshot(full_page=True)
+        screenshot = await self.get_screenshot(
+            full_page=True,
+            max_size=_MAX_SCREENSHOT_SIZE,
+        )
+
+        interactive_elements, interactive_screenshot = (
+            await self._collect_interactive_elements(
+                page_url=page_url,
+                raw_screenshot=await self.get_screenshot(
+                    full_page=True,
+                    max_size=(128, 72),
+                ),
+            )
+        )
+
+        # the markers are replaced by the contentful elements below,
+        # so the selectors of the interactive elements are resolved beforehand
+        marker_selectors = await self.playwright.page.evaluate(
+            "(markerIds) => npi.getSelectorsOfMarkers(markerIds)",
+            [el["id"] for el in interactive_elements],
+        )
+        await self.clear_bboxes()
+
+        async def get_selector_of_marker(marker_id: int = -1) -> str | None:
+            """
+            Get the CSS selector of the element with the given marker ID. If the marker ID is -1, it means the marker is not found and None is returned.
+
+            Args:
+                marker_id: Marker ID of the element.
+            """
+            return marker_selectors.get(str(marker_id))
+
+        contentful_elements, contentful_screenshot = (
+            await self._collect_contentful_elements(raw_screenshot)
+        )
+
+        scraping_type, selectors, pagination_button_selector = await asyncio.gather(
+            self._ask_scraping_type(
+                ctx=ctx,
+                page_url=page_url,
+                page_title=page_title,
+                screenshot=screenshot,
+            ),
+            self._ask_similar_items(
+                ctx=ctx,
+                page_url=page_url,
+                page_title=page_title,
+                elements=contentful_elements,
+                annotated_screenshot=contentful_screenshot,
+            ),
+            self._ask_pagination_button(
+                ctx=ctx,
+                page_url=page_url,
+                page_title=page_title,
+                elements=interactive_elements,
+                annotated_screenshot=interactive_screenshot,
+                get_selector_of_marker=get_selector_of_marker,
+            ),
+        )
+
+        await self.clear_bboxes()
+
+        if scraping_type != "list-like":
+            selectors = None
+
+        items_selector = selectors and selectors["items"]
+
+        await ctx.send_debug_message(f"Scraping type: {scraping_type}")
+        await ctx.send_debug_message(f"Similar items selectors: {selectors}")
+        await ctx.send_debug_message(
+            f"Pagination button selector: {pagination_button_selector}"
+        )
+
+        pagination_url_template = None
+
+        if pagination_button_selector:
+            # read the link before scrolling changes the page
+            pagination_url_template = await self._infer_pagination_url_template(
+                ctx=ctx,
+                url=url,
+                pagination_button_selector=pagination_button_selector,
+            )
+
+        # scrolling happens in the loaded page while the pagination button
+        # is clicked in a cloned context, so the two checks can run together
+        infinite_scroll, is_pagination_working = await asyncio.gather(
+            self.playwright.page.evaluate(
+                "(itemsSelector) => npi.supportInfiniteScroll(itemsSelector)",
+                items_selector or "*",
+            ),
+            self._validate_pagination(
+                ctx=ctx,
+                url=url,
+                pagination_button_selector=pagination_button_selector,
+                items_selector=items_selector,
+            ),
+        )
+
+        await ctx.send_debug_message(f"Support infinite scroll: {infinite_scroll}")
+        await ctx.send_debug_message(
+            f"Pagination button is working: {is_pagination_working}"
+        )
+
+        if not is_pagination_working:
+            pagination_button_selector = None
+            pagination_url_template = None
+
+        analysis: PageAnalysis = {
+            "url": page_url,
+            "scraping_type": scraping_type,
+            "selectors": selectors,
+            "infinite_scroll": infinite_scroll,
+            "pagination_button_selector": pagination_button_selector,
+            "pagination_url_template": pagination_url_template,
+        }
+
+        if cache_key is not None:
+            await self._set_cached_analysis(cache_key, analysis)
+
+        return analysis
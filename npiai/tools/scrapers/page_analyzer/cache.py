@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import re
+import tempfile
+from typing import Any, Dict
+from urllib.parse import urlparse, parse_qsl
+
+from npiai.utils import SqliteStore
+
+# path segments that identify a page rather than a template, e.g. ids and slugs
+_VARIABLE_SEGMENT = re.compile(r"\d|^[0-9a-f]{8,}$|^[\w-]{24,}$", re.IGNORECASE)
+
+
+def get_url_pattern(url: str) -> str:
+    """
+    Reduce the URL to the pattern shared by the pages of the same template,
+    e.g. `https://shop.com/category/shoes?page=2` becomes `shop.com/category/*?page`.
+
+    The first path segment is kept as the section of the site, the following ones are kept
+    only if they do not look like ids. Query values are dropped.
+
+    Args:
+        url: URL of the page
+    """
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split("/") if s]
+    pattern = [
+        s if i == 0 and not _VARIABLE_SEGMENT.search(s) else "*"
+        for i, s in enumerate(segments)
+    ]
+    query_keys = sorted({k for k, _ in parse_qsl(parsed.query)})
+
+    result = parsed.netloc.lower() + "/" + "/".join(pattern)
+
+    if query_keys:
+        result += "?" + "&".join(query_keys)
+
+    return result
+
+
+def get_analysis_key(url_pattern: str, structure_fingerprint: str) -> str:
+    """
+    Compute the cache key of a page analysis
+
+    Args:
+        url_pattern: URL pattern computed by `get_url_pattern`
+        structure_fingerprint: Fingerprint of the tag and class skeleton of the page
+    """
+    return hashlib.sha256(f"{url_pattern}:{structure_fingerprint}".encode()).hexdigest()
+
+
+class AnalysisCache(SqliteStore):
+    """
+    Persistent cache of page analyses, keyed by URL pattern and DOM structure fingerprint.
+
+    Pages rendered from the same template are served from the cache, so that only new templates are analyzed by the LLM.
+    """
+
+    table = "analyses"
+
+    def __init__(
+        self,
+        path: str | pathlib.Path | None = None,
+        ttl: float | None = 30 * 24 * 3600,
+        max_size: int = 64 * 1024 * 1024,
+    ):
+        """
+        Initialize the page analysis cache
+
+        Args:
+            path: Path to the sqlite database. Defaults to `<tmpdir>/.npi/analysis_cache.sqlite`.
+            ttl: Time-to-live of the cached analyses in seconds. None means never expire.
+            max_size: Maximum total size of the cached analyses in bytes.
+        """
+        super().__init__(
+            path=path
+            or pathlib.Path(tempfile.gettempdir()) / ".npi" / "analysis_cache.sqlite",
+            ttl=ttl,
+            max_size=max_size,
+        )
+
+    async def get(self, key: str) -> Dict[str, Any] | None:
+        """
+        Get the cached analysis of the given key
+
+        Args:
+            key: Analysis key computed by `get_analysis_key`
+        """
+        value = await asyncio.to_thread(self._get, key)
+
+        if value is None:
+            return None
+
+        return json.loads(value)
+
+    async def set(self, key: str, analysis: Dict[str, Any]):
+        """
+        Save the analysis into cache
+
+        Args:
+            key: Analysis key computed by `get_analysis_key`
+            analysis: The page analysis
+        """
+        await asyncio.to_thread(
+            self._set, key, json.dumps(analysis, ensure_ascii=False)
+        )
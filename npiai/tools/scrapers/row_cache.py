@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import tempfile
+from typing import Dict
+
+from npiai.utils import SqliteStore
+
+
+def get_row_key(item_hash: str, column_spec: str, model: str) -> str:
+    """
+    Compute the cache key of a summarized row
+
+    Args:
+        item_hash: The hash of the source item
+        column_spec: The serialized output columns and summarize prompt
+        model: The model name
+    """
+    spec_hash = hashlib.sha256(column_spec.encode()).hexdigest()
+    return hashlib.sha256(f"{model}:{spec_hash}:{item_hash}".encode()).hexdigest()
+
+
+class RowCache(SqliteStore):
+    """
+    Persistent cache of summarized rows, keyed by item hash, column spec and model.
+
+    Unchanged items are served from the cache so that only new or modified items are sent to the LLM.
+    """
+
+    table = "rows"
+
+    def __init__(
+        self,
+        path: str | pathlib.Path | None = None,
+        ttl: float | None = 30 * 24 * 3600,
+        max_size: int = 512 * 1024 * 1024,
+    ):
+        """
+        Initialize the row cache
+
+        Args:
+            path: Path to the sqlite database. Defaults to `<tmpdir>/.npi/row_cache.sqlite`.
+            ttl: Time-to-live of the cached rows in seconds. None means never expire.
+            max_size: Maximum total size of the cached rows in bytes.
+        """
+        super().__init__(
+            path=path
+            or pathlib.Path(tempfile.gettempdir()) / ".npi" / "row_cache.sqlite",
+            ttl=ttl,
+            max_size=max_size,
+        )
+
+    async def get(self, key: str) -> Dict[str, str | None] | None:
+        """
+        Get the cached row values of the given key
+
+        Args:
+            key: Row key computed by `get_row_key`
+        """
+        value = await asyncio.to_thread(self._get, key)
+
+        if value is None:
+            return None
+
+        return json.loads(value)
+
+    async def set(self, key: str, values: Dict[str, str | None]):
+        """
+        Save the row values into cache
+
+        Args:
+            key: Row key computed by `get_row_key`
+            values: The summarized row values
+        """
+        await asyncio.to_thread(self._set, key, json.dumps(values, ensure_ascii=False))
@@ -28,3 +28,20 @@ class RowBatch(TypedDict):
     offset: int
     batch_id: int
     items: List[Row]
+
+
+class BatchStats(TypedDict):
+    batch_id: int
+    item_count: int
+    # estimated input and output tokens of the batch
+    estimated_tokens: int
+    budget: int
+
+
+class PaginationURLTemplate(TypedDict):
+    # URL of the following pages with a `{page}` placeholder
+    template: str
+    # placeholder value of the page next to the analyzed one
+    next_page: int
+    # increment of the placeholder value between pages, e.g. 20 for `?offset=20`
+    step: int
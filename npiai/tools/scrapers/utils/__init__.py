@@ -1 +1,15 @@
-from .dom import init_items_observer, has_items_added
+from .dom import (
+    init_items_observer,
+    has_items_added,
+    init_html_minimizer,
+    init_item_fingerprints,
+    add_item_fingerprints,
+    DEFAULT_ALLOWED_ATTRIBUTES,
+)
+from .pagination import (
+    infer_pagination_url_template,
+    format_pagination_url,
+    get_pagination_url,
+    get_pagination_link,
+    get_page_signature,
+)
@@ -1,3 +1,5 @@
+from typing import List
+
 from npiai.core import PlaywrightContext
 
 
@@ -8,64 +10,92 @@ async def init_items_observer(
 ):
     # attach mutation observer to the ancestor element
     await playwright.page.evaluate(
-        """
-        ([ancestor_selector, items_selector]) => {
-            const ancestor = document.querySelector(ancestor_selector);
-            
-            if (!ancestor) {
-                return;
-            }
-            
-            window.addedNodes = [];
-            
-            window.npiObserver = new MutationObserver((records) => {
-                for (const record of records) {
-                    for (const addedNode of record.addedNodes) {
-                        if (addedNode.nodeType === Node.ELEMENT_NODE &&
-                            (addedNode.matches(items_selector) || addedNode.querySelector(items_selector))
-                        ) {
-                            window.addedNodes.push(addedNode);
-                        }
-                    }
-                }
-            });
-            
-            window.npiObserver.observe(
-                document.querySelector(ancestor_selector), 
-                { childList: true, subtree: true }
-            );
-        }
-        """,
+        "([ancestor, items]) => npi.initItemsObserver(ancestor, items)",
         [ancestor_selector or "body", items_selector or "*"],
     )
 
 
 async def has_items_added(playwright: PlaywrightContext, timeout: int = 3000) -> bool:
     return await playwright.page.evaluate(
-        """
-        (timeout) => {
-            return new Promise(resolve => {
-                let count = 0;
-                const maxCount = Math.floor(timeout / 100);
-                
-                function check() {
-                    if (!window.addedNodes) {
-                        return resolve(false);
-                    }
-                    if (window.addedNodes.length > 0) {
-                        return resolve(true);
-                    }
-                    if (count > maxCount) {
-                        return resolve(false);
-                    }
-                    
-                    count++;
-                    setTimeout(check, 100);
-                }
-                
-                check();
-            });
-        }
-        """,
+        "(timeout) => npi.hasItemsAdded(timeout)",
         timeout,
     )
+
+
+# attributes used by the markdown converters
+DEFAULT_ALLOWED_ATTRIBUTES = [
+    "href",
+    "src",
+    "alt",
+    "title",
+    "type",
+    "checked",
+    "aria-label",
+    "colspan",
+    "rowspan",
+    "start",
+]
+
+
+async def init_html_minimizer(
+    playwright: PlaywrightContext,
+    allowed_attributes: List[str] | None = None,
+):
+    """
+    Enable `npi.minimizeHTML(elem)` in the page, which serializes a copy of the element
+    without scripts, styles, base64 images and attributes outside the allowlist.
+
+    Only the content the markdown converters drop is removed, so the markdown and the item hashes
+    do not change as long as the allowlist covers the attributes the converters read.
+
+    Args:
+        playwright: The playwright context.
+        allowed_attributes: The attributes to keep. Defaults to the attributes used by the markdown converters.
+    """
+    await playwright.page.evaluate(
+        "(attributes) => npi.setAllowedAttributes(attributes)",
+        allowed_attributes or DEFAULT_ALLOWED_ATTRIBUTES,
+    )
+
+
+async def init_item_fingerprints(
+    playwright: PlaywrightContext,
+    known_fingerprints: List[str],
+):
+    """
+    Set the fingerprints of the known items in the page, which are compared with `npi.fingerprint(elem)`.
+
+    The fingerprint is a hash of the text and the attributes the markdown converters read,
+    which is stable across runs as long as the markdown of the item does not change.
+
+    Args:
+        playwright: The playwright context.
+        known_fingerprints: The fingerprints of the items to skip.
+    """
+    await playwright.page.evaluate(
+        "(fingerprints) => npi.setKnownFingerprints(fingerprints)",
+        known_fingerprints,
+    )
+
+
+async def add_item_fingerprints(
+    playwright: PlaywrightContext,
+    fingerprints: List[str],
+    known_count: int,
+) -> bool:
+    """
+    Add fingerprints to the known items in the page without transferring the known ones again.
+
+    Args:
+        playwright: The playwright context.
+        fingerprints: The new fingerprints of the items to skip.
+        known_count: The number of fingerprints the page is expected to know already.
+
+    Returns:
+        False if the page does not know `known_count` fingerprints, e.g. after a reload.
+        Nothing is added in that case, use `init_item_fingerprints` to transfer all of them.
+    """
+    return await playwright.page.evaluate(
+        "([fingerprints, count]) => npi.addKnownFingerprints(fingerprints, count)",
+        [fingerprints, known_count],
+    )
@@ -0,0 +1,254 @@
+import re
+from typing import List, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from playwright.async_api import Page, TimeoutError
+
+from npiai.tools.scrapers.types import PaginationURLTemplate
+
+PAGE_PLACEHOLDER = "{page}"
+
+# prefix, page number, suffix, e.g. `page-2.html`
+_numbered_re = re.compile(r"^(\D*?)(\d+)(\D*)$")
+
+
+def _split_number(value: str) -> Tuple[str, int, str] | None:
+    match = _numbered_re.match(value)
+
+    if not match:
+        return None
+
+    prefix, number, suffix = match.groups()
+    return prefix, int(number), suffix
+
+
+def _infer_numbers(current: str | None, next_: str) -> Tuple[str, int, int] | None:
+    """
+    Compare the same URL component of two pages.
+    Returns the component with a placeholder, the next page number and the step.
+    """
+    next_parts = _split_number(next_)
+
+    if not next_parts:
+        return None
+
+    prefix, next_page, suffix = next_parts
+
+    if current is None:
+        # the first page usually omits the page number: `?page=2` follows page 1,
+        # while `?start=20` follows offset 0
+        if next_page == 2:
+            current_page = 1
+        elif next_page >= 10:
+            current_page = 0
+        else:
+            # most likely a filter or sort option rather than a page number
+            return None
+    else:
+        current_parts = _split_number(current)
+
+        if not current_parts or current_parts[::2] != (prefix, suffix):
+            return None
+
+        current_page = current_parts[1]
+
+    if next_page <= current_page:
+        return None
+
+    return prefix + PAGE_PLACEHOLDER + suffix, next_page, next_page - current_page
+
+
+def _infer_path(current: str, next_: str) -> Tuple[str, int, int] | None:
+    current_segments = current.rstrip("/").split("/")
+    next_segments = next_.rstrip("/").split("/")
+    trailing_slash = "/" if next_.endswith("/") else ""
+
+    if len(current_segments) == len(next_segments):
+        diff = [
+            i for i, (a, b) in enumerate(zip(current_segments, next_segments)) if a != b
+        ]
+
+        if len(diff) != 1:
+            return None
+
+        index = diff[0]
+        result = _infer_numbers(current_segments[index], next_segments[index])
+    elif len(next_segments) - len(current_segments) in (1, 2) and (
+        next_segments[: len(current_segments)] == current_segments
+    ):
+        # `/list` -> `/list/2` or `/list/page/2`
+        index = len(next_segments) - 1
+        result = _infer_numbers(None, next_segments[index])
+    else:
+        return None
+
+    if not result:
+        return None
+
+    template, next_page, step = result
+    next_segments[index] = template
+
+    return "/".join(next_segments) + trailing_slash, next_page, step
+
+
+def _split_query(query: str) -> List[Tuple[str, str | None]]:
+    # keep the raw encoding so that the template reproduces the original links
+    return [
+        (param.split("=", 1)[0], param.split("=", 1)[1] if "=" in param else None)
+        for param in query.split("&")
+        if param
+    ]
+
+
+def _infer_query(current: str, next_: str) -> Tuple[str, int, int] | None:
+    current_params = dict(_split_query(current))
+    next_params = _split_query(next_)
+
+    changed = [
+        i
+        for i, (key, value) in enumerate(next_params)
+        if current_params.get(key) != value
+    ]
+
+    if len(changed) != 1 or set(current_params) - {key for key, _ in next_params}:
+        return None
+
+    index = changed[0]
+    key, value = next_params[index]
+
+    if value is None:
+        return None
+
+    result = _infer_numbers(current_params.get(key), value)
+
+    if not result:
+        return None
+
+    template, next_page, step = result
+    next_params[index] = (key, template)
+
+    query = "&".join(
+        key if value is None else f"{key}={value}" for key, value in next_params
+    )
+
+    return query, next_page, step
+
+
+def infer_pagination_url_template(
+    current_url: str,
+    next_url: str,
+) -> PaginationURLTemplate | None:
+    """
+    Infer the URL template of the following pages by comparing the URL of a page with the URL of its next page.
+    Only a single numeric path segment or query parameter is allowed to change.
+
+    Args:
+        current_url: The URL of the current page.
+        next_url: The URL that the pagination link points to.
+    """
+    current = urlsplit(current_url)
+    next_ = urlsplit(next_url)
+
+    if (current.scheme, current.netloc) != (next_.scheme, next_.netloc):
+        return None
+
+    if current.path == next_.path:
+        result = _infer_query(current.query, next_.query)
+
+        if not result:
+            return None
+
+        query, next_page, step = result
+        path = next_.path
+    elif current.query == next_.query:
+        result = _infer_path(current.path, next_.path)
+
+        if not result:
+            return None
+
+        path, next_page, step = result
+        query = next_.query
+    else:
+        return None
+
+    template = urlunsplit((next_.scheme, next_.netloc, path, query, ""))
+
+    # the template should reproduce the link
+    if format_pagination_url(template, next_page) != urlunsplit(
+        next_._replace(fragment="")
+    ):
+        return None
+
+    return PaginationURLTemplate(
+        template=template,
+        next_page=next_page,
+        step=step,
+    )
+
+
+def format_pagination_url(template: str, page: int) -> str:
+    """
+    Fill the page number into a pagination URL template
+
+    Args:
+        template: URL template with a `{page}` placeholder.
+        page: The page number, or the offset for offset based pagination.
+    """
+    return template.replace(PAGE_PLACEHOLDER, str(page))
+
+
+def get_pagination_url(pagination: PaginationURLTemplate, index: int) -> str:
+    """
+    Get the URL of the n-th page after the analyzed page
+
+    Args:
+        pagination: The inferred pagination URL template.
+        index: Zero-based index of the following pages.
+    """
+    return format_pagination_url(
+        pagination["template"],
+        pagination["next_page"] + index * pagination["step"],
+    )
+
+
+async def get_pagination_link(page: Page, selector: str) -> str | None:
+    """
+    Get the absolute URL that the pagination button links to, or None if it is not a link
+
+    Args:
+        page: The page containing the pagination button.
+        selector: CSS selector of the pagination button.
+    """
+    return await page.evaluate(
+        "(selector) => npi.getPaginationLink(selector)",
+        selector,
+    )
+
+
+async def get_page_signature(
+    page: Page,
+    selector: str,
+    timeout: int | None = None,
+) -> str | None:
+    """
+    Summarize the first and the last items, which is enough to tell whether two pages show the same items.
+    Returns None if there are no items on the page.
+
+    Args:
+        page: The page containing the items.
+        selector: CSS selector of the items.
+        timeout: Time in milliseconds to wait for the items to be attached. The items are not waited for if None.
+    """
+    if timeout is not None:
+        try:
+            await page.locator(selector).first.wait_for(
+                state="attached",
+                timeout=timeout,
+            )
+        except TimeoutError:
+            return None
+
+    return await page.evaluate(
+        "(selector) => npi.getPageSignature(selector)",
+        selector,
+    )
@@ -14,68 +14,28 @@ async def auto_scrape(
     url: str,
 ):
     async with PageAnalyzer(headless=False, force_captcha_detection=True) as analyzer:
-        ancestor_selector = None
-        items_selector = None
-
         print(f"Analyzing {url}:")
         step_start_time = time.monotonic()
 
-        scraping_type = await analyzer.infer_scraping_type(
-            ctx=ctx,
-            url=url,
-        )
+        analysis = await analyzer.analyze(ctx=ctx, url=url)
 
         print(
-            f"  - ({time.monotonic() - step_start_time:.2f}s) Inferred scraping type:",
-            scraping_type,
+            f"  - ({time.monotonic() - step_start_time:.2f}s) Page analysis:",
+            indent(json.dumps(analysis, indent=2), prefix="    ").lstrip(),
         )
 
-        if scraping_type == "list-like":
-            step_start_time = time.monotonic()
-            selectors = await analyzer.infer_similar_items_selector(ctx, url)
-
-            print(
-                f"  - ({time.monotonic() - step_start_time:.2f}s) Possible selectors:",
-                indent(json.dumps(selectors, indent=2), prefix="    ").lstrip(),
-            )
-
-            if selectors:
-                ancestor_selector = selectors["ancestor"]
-                items_selector = selectors["items"]
-
-        step_start_time = time.monotonic()
-
-        infinite_scroll = await analyzer.support_infinite_scroll(
-            ctx=ctx,
-            url=url,
-            items_selector=items_selector,
-        )
-
-        print(
-            f"  - ({time.monotonic() - step_start_time:.2f}s) Support infinite scroll:",
-            infinite_scroll,
-        )
-
-        step_start_time = time.monotonic()
-        pagination_button_selector = await analyzer.get_pagination_button(
-            ctx=ctx,
-            url=url,
-            items_selector=items_selector,
-        )
-
-        print(
-            f"  - ({time.monotonic() - step_start_time:.2f}s) Pagination button:",
-            pagination_button_selector,
-        )
+        selectors = analysis["selectors"]
 
         scraper = WebScraper(
             headless=False,
             playwright=analyzer.playwright,
             url=url,
-            scraping_type=scraping_type,
-            ancestor_selector=ancestor_selector,
-            items_selector=items_selector,
-            pagination_button_selector=pagination_button_selector,
+            scraping_type=analysis["scraping_type"],
+            ancestor_selector=selectors and selectors["ancestor"],
+            items_selector=selectors and selectors["items"],
+            pagination_button_selector=analysis["pagination_button_selector"],
+            pagination_url_template=analysis["pagination_url_template"],
+            page_concurrency=3,
         )
         step_start_time = time.monotonic()
         columns = await scraper.infer_columns(
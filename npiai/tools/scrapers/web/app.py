@@ -2,20 +2,38 @@ import asyncio
 import hashlib
 import re
 from textwrap import dedent
-from typing import List, Set, Literal
+from typing import List, Set, Literal, Dict, Tuple
+
+from typing_extensions import TypedDict
 
 from markdownify import MarkdownConverter
-from playwright.async_api import TimeoutError
+from playwright.async_api import TimeoutError, Page
 
 from npiai import BrowserTool, Context
-from npiai.core import PlaywrightContext
-from npiai.tools.scrapers import BaseScraper, SourceItem
-from npiai.tools.scrapers.utils import init_items_observer, has_items_added
-from npiai.utils import CompactMarkdownConverter
+from npiai.core import PlaywrightContext, ResourcePolicy
+from npiai.tools.scrapers import BaseScraper, SourceItem, PaginationURLTemplate
+from npiai.tools.scrapers.utils import (
+    init_items_observer,
+    has_items_added,
+    init_html_minimizer,
+    init_item_fingerprints,
+    add_item_fingerprints,
+    DEFAULT_ALLOWED_ATTRIBUTES,
+    get_pagination_link,
+    get_pagination_url,
+    get_page_signature,
+)
+from npiai.utils import CompactMarkdownConverter, markdown_service, logger
 
 ScrapingType = Literal["single", "list-like"]
 
 
+class _ExtractedItem(TypedDict):
+    fingerprint: str
+    # None if the item is known
+    html: str | None
+
+
 class WebScraper(BaseScraper, BrowserTool):
     name = "web-scraper"
     description = (
@@ -27,8 +45,13 @@ class WebScraper(BaseScraper, BrowserTool):
         """
     )
 
+    # set to `LxmlMarkdownConverter()` for a faster conversion with the same output
     markdown_converter: MarkdownConverter = CompactMarkdownConverter()
 
+    # attributes kept when minimizing the item HTML in the page,
+    # set to None to transfer the raw HTML
+    allowed_attributes: List[str] | None = DEFAULT_ALLOWED_ATTRIBUTES
+
     url: str
     scraping_type: ScrapingType
     ancestor_selector: str
@@ -46,9 +69,33 @@ class WebScraper(BaseScraper, BrowserTool):
     # The list of hashes of items that have been skipped
     _matched_hashes: List[str]
 
+    # Mapping from in-page item fingerprints to markdown hashes
+    _item_fingerprints: Dict[str, str]
+
+    # Fingerprints of the skipped items, split by whether the current page knows them
+    _sent_fingerprints: Set[str]
+    _unsent_fingerprints: Set[str]
+
     # Whether to open a new page when start scraping
     _open_new_page: bool
 
+    # Whether to check the first page for captchas even if the items are found
+    _force_captcha_detection: bool
+
+    # URL template of the following pages, see `PageAnalyzer.get_pagination_url_template`
+    pagination_url_template: PaginationURLTemplate | None
+
+    # Number of pages to load in parallel when the pages can be opened by URL
+    page_concurrency: int
+
+    # Prefetched pages in page order, each with a task resolving to the page signature, None at the end
+    _page_queue: asyncio.Queue[Tuple[Page, asyncio.Task] | None] | None
+    _prefetch_task: asyncio.Task | None
+
+    # Signature of the items on the current page, used to detect repeated pages
+    _page_signature: str | None
+    _prefetched_page_count: int
+
     def __init__(
         self,
         url: str,
@@ -57,12 +104,22 @@ class WebScraper(BaseScraper, BrowserTool):
         items_selector: str | None = None,
         pagination_button_selector: str | None = None,
         skip_item_hashes: List[str] | None = None,
+        item_fingerprints: Dict[str, str] | None = None,
+        pagination_url_template: PaginationURLTemplate | None = None,
+        page_concurrency: int = 1,
         headless: bool = True,
         open_new_page: bool = True,
+        force_captcha_detection: bool = False,
         playwright: PlaywrightContext = None,
+        resource_policy: ResourcePolicy | None = ResourcePolicy.text_only(),
     ):
         BaseScraper.__init__(self)
-        BrowserTool.__init__(self, headless=headless, playwright=playwright)
+        BrowserTool.__init__(
+            self,
+            headless=headless,
+            playwright=playwright,
+            resource_policy=resource_policy,
+        )
         self.url = url
         self.scraping_type = scraping_type
         self.ancestor_selector = ancestor_selector or "body"
@@ -70,14 +127,40 @@ class WebScraper(BaseScraper, BrowserTool):
         self.pagination_button_selector = pagination_button_selector
         self.skip_item_hashes = set(skip_item_hashes) if skip_item_hashes else None
         self._open_new_page = open_new_page
+        self._force_captcha_detection = force_captcha_detection
         self._matched_hashes = []
+        self._item_fingerprints = dict(item_fingerprints or {})
+        self._sent_fingerprints = set()
+        self._unsent_fingerprints = {
+            fingerprint
+            for fingerprint, md5 in self._item_fingerprints.items()
+            if self.skip_item_hashes and md5 in self.skip_item_hashes
+        }
+        self.pagination_url_template = pagination_url_template
+        self.page_concurrency = page_concurrency
+        self._page_queue = None
+        self._prefetch_task = None
+        self._page_signature = None
+        self._prefetched_page_count = 0
         self._webpage_access_lock = asyncio.Lock()
 
     def get_matched_hashes(self) -> List[str]:
         return self._matched_hashes
 
+    def get_item_fingerprints(self) -> Dict[str, str]:
+        """
+        Get the mapping from in-page item fingerprints to markdown hashes.
+        Pass it to the next run as `item_fingerprints` to skip known items before they are transferred.
+        """
+        return self._item_fingerprints
+
+    async def end(self):
+        await self._clear_prefetched_pages()
+        await super().end()
+
     async def init_data(self, ctx: Context):
         self._matched_hashes = []
+        await self._clear_prefetched_pages()
 
         if self._open_new_page:
             await self.load_page(
@@ -85,21 +168,18 @@ class WebScraper(BaseScraper, BrowserTool):
                 url=self.url,
                 timeout=3000,
                 wait_for_selector=self.items_selector,
-                force_capcha_detection=True,
+                # the page is checked for captchas when the items selector times out,
+                # without a selector there is nothing telling a captcha page apart
+                force_capcha_detection=self._force_captcha_detection
+                or self.items_selector is None,
             )
         else:
             # clear visited marks and scroll to the top
-            await self.playwright.page.evaluate(
-                """
-                () => {
-                    window.scrollTo(0, 0);
-                    
-                    [...document.querySelectorAll('[data-npi-visited]')].forEach(e => {
-                        e.removeAttribute('data-npi-visited');
-                    });
-                }
-                """
-            )
+            await self.playwright.page.evaluate("() => npi.clearVisited()")
+
+        if self._use_prefetch():
+            # start loading the following pages while the current one is summarized
+            self._start_prefetch()
 
     async def next_items(
         self,
@@ -115,6 +195,9 @@ class WebScraper(BaseScraper, BrowserTool):
             # convert relative links to absolute links
             await self._process_relative_links()
 
+            if self.allowed_attributes is not None:
+                await init_html_minimizer(self.playwright, self.allowed_attributes)
+
             if self.items_selector is None:
                 res = await self._convert_ancestor()
             else:
@@ -162,53 +245,82 @@ class WebScraper(BaseScraper, BrowserTool):
 
         results: List[SourceItem] = []
 
-        # use element handles here to snapshot the items
-        for elem in await locator.element_handles():
-            html = await elem.evaluate(
-                """
-                async (elem) => {
-                    elem.scrollIntoView();
-                    elem.setAttribute('data-npi-visited', 'true');
-                    
-                    const contentLength = elem.textContent?.replace(/\\s/g, '').length || 0;
-                    
-                    if (contentLength > 10) {
-                        return elem.outerHTML;
-                    }
-                    
-                    // in case the page uses lazy loading,
-                    // wait for the content to be loaded
-                    
-                    return new Promise((resolve) => {
-                        setTimeout(() => {
-                            resolve(elem.outerHTML);
-                        }, 300);
-                    });
-                }
-                """
+        while limit == -1 or len(results) < limit:
+            extracted = await self._extract_items_html(
+                limit - len(results) if limit != -1 else -1
             )
 
-            if not html:
-                continue
+            if not extracted:
+                break
 
-            markdown, md5 = self._html_to_md_and_hash(html)
+            for item in extracted:
+                if item["html"] is None:
+                    # known item filtered in the page
+                    self._matched_hashes.append(
+                        self._item_fingerprints[item["fingerprint"]]
+                    )
 
-            if self.skip_item_hashes and md5 in self.skip_item_hashes:
-                self._matched_hashes.append(md5)
-                continue
+            extracted = [item for item in extracted if item["html"]]
+            converted = await self._htmls_to_md_and_hash(
+                [item["html"] for item in extracted]
+            )
 
-            results.append(
-                SourceItem(
-                    hash=md5,
-                    data=markdown,
+            for item, (markdown, md5) in zip(extracted, converted):
+                self._item_fingerprints[item["fingerprint"]] = md5
+
+                if self.skip_item_hashes and md5 in self.skip_item_hashes:
+                    self._matched_hashes.append(md5)
+
+                    if item["fingerprint"] not in self._sent_fingerprints:
+                        self._unsent_fingerprints.add(item["fingerprint"])
+
+                    continue
+
+                results.append(
+                    SourceItem(
+                        hash=md5,
+                        data=markdown,
+                    )
                 )
-            )
 
-            if len(results) >= limit:
+            # all unvisited items have been extracted
+            if limit == -1:
                 break
 
         return results
 
+    async def _extract_items_html(self, limit: int = -1) -> List[_ExtractedItem]:
+        """
+        Mark, scroll and collect the outer HTML of the unvisited items in a single round-trip.
+        Items with known fingerprints are marked as visited and returned without HTML.
+
+        Args:
+            limit: The maximum number of unknown items to collect. -1 means all unvisited items.
+
+        Returns:
+            The fingerprint and outer HTML of the collected items.
+        """
+        added = await add_item_fingerprints(
+            self.playwright,
+            list(self._unsent_fingerprints),
+            len(self._sent_fingerprints),
+        )
+
+        if not added:
+            # the page is a new one, transfer all the known fingerprints again
+            self._unsent_fingerprints |= self._sent_fingerprints
+            await init_item_fingerprints(
+                self.playwright, list(self._unsent_fingerprints)
+            )
+
+        self._sent_fingerprints |= self._unsent_fingerprints
+        self._unsent_fingerprints = set()
+
+        return await self.playwright.page.evaluate(
+            "([selector, limit]) => npi.extractItems(selector, limit)",
+            [self.items_selector, limit],
+        )
+
     async def _convert_ancestor(
         self,
     ) -> List[SourceItem] | None:
@@ -220,20 +332,7 @@ class WebScraper(BaseScraper, BrowserTool):
         """
 
         # check if there are mutation records
-        htmls = await self.playwright.page.evaluate(
-            """
-            () => {
-                const { addedNodes } = window;
-                
-                if (addedNodes?.length) {
-                    window.addedNodes = [];
-                    return addedNodes.map(node => node.outerHTML);
-                }
-                
-                return null;
-            }
-            """,
-        )
+        htmls = await self.playwright.page.evaluate("() => npi.takeAddedNodes()")
 
         if htmls is None:
             locator = self.playwright.page.locator(
@@ -253,21 +352,11 @@ class WebScraper(BaseScraper, BrowserTool):
 
             # use all ancestors here to avoid missing any items
             for elem in await locator.all():
-                htmls.append(
-                    await elem.evaluate(
-                        """
-                        elem => {
-                            elem.setAttribute('data-npi-visited', 'true');
-                            return elem.outerHTML;
-                        }
-                        """
-                    )
-                )
+                htmls.append(await elem.evaluate("elem => npi.markVisited(elem)"))
 
         results: List[SourceItem] = []
 
-        for html in htmls:
-            markdown, md5 = self._html_to_md_and_hash(html)
+        for markdown, md5 in await self._htmls_to_md_and_hash(htmls):
 
             if self.skip_item_hashes and md5 in self.skip_item_hashes:
                 self._matched_hashes.append(md5)
@@ -282,23 +371,26 @@ class WebScraper(BaseScraper, BrowserTool):
 
         return results
 
-    def _html_to_md_and_hash(self, html: str):
-        markdown = re.sub(r"\n+", "\n", self.markdown_converter.convert(html)).strip()
-        md5 = hashlib.md5(markdown.encode()).hexdigest()
-        return markdown, md5
+    async def _htmls_to_md_and_hash(self, htmls: List[str]) -> List[Tuple[str, str]]:
+        results = []
+
+        for markdown in await markdown_service.convert_batch(
+            htmls, self.markdown_converter
+        ):
+            markdown = re.sub(r"\n+", "\n", markdown).strip()
+            md5 = hashlib.md5(markdown.encode()).hexdigest()
+            results.append((markdown, md5))
+
+        return results
 
     async def _load_more(
         self,
         ctx: Context,
     ):
-        unvisited_items_selector = (
-            self.items_selector or "*"
-        ) + ":not([data-npi-visited])"
-
         # check if there are unvisited items
         has_unvisited_items = await self.playwright.page.evaluate(
-            f"selector => !!document.querySelector(selector)",
-            unvisited_items_selector,
+            "selector => npi.hasUnvisited(selector)",
+            self.items_selector or "*",
         )
 
         if has_unvisited_items:
@@ -320,26 +412,21 @@ class WebScraper(BaseScraper, BrowserTool):
         # if so, scroll to load more items
         if await self.is_scrollable():
             await self.playwright.page.evaluate(
-                """
-                (ancestor_selector) => {
-                    let elem;
-                    const items = document.querySelectorAll('[data-npi-visited]');
-                    
-                    if (items.length) {
-                        const elem = items[items.length - 1];
-                        elem?.scrollIntoView();
-                    } else {
-                        const elem = document.querySelector(ancestor_selector);
-                        elem?.scrollIntoView({ block: 'end' });
-                    }
-                }
-                """,
+                "(selector) => npi.scrollToLastVisited(selector)",
                 self.ancestor_selector,
             )
             await ctx.send_debug_message(f"[{self.name}] Scrolled to load more items")
             more_content_loaded = await has_items_added(self.playwright, timeout=3000)
 
-        if not more_content_loaded and self.pagination_button_selector:
+        if not more_content_loaded and self._use_prefetch():
+            more_content_loaded = await self._goto_prefetched_page(ctx)
+
+        # fall back to clicking only if the pagination button is not a working link
+        if (
+            not more_content_loaded
+            and not self._prefetched_page_count
+            and self.pagination_button_selector
+        ):
             handle = await self.playwright.page.evaluate_handle(
                 "selector => document.querySelector(selector)",
                 self.pagination_button_selector,
@@ -364,52 +451,198 @@ class WebScraper(BaseScraper, BrowserTool):
                 pass
 
         # clear the mutation observer
-        await self.playwright.page.evaluate(
-            "() => { window.npiObserver?.disconnect(); }"
+        await self.playwright.page.evaluate("() => npi.disconnectItemsObserver()")
+
+    def _use_prefetch(self) -> bool:
+        return self.pagination_url_template is not None or (
+            self.page_concurrency > 1 and self.pagination_button_selector is not None
         )
 
-    async def _process_relative_links(self):
-        await self.playwright.page.evaluate(
-            """
-            () => {
-                if (window.npiProcessedRelativeLinks) {
-                    return;
-                }
-                
-                function process(root) {
-                    const elements = [...root.querySelectorAll('a[href]')];
-                    
-                    if (root.matches('a[href]')) {
-                        elements.push(root);
-                    }
-                    
-                    elements.forEach(a => {
-                        const href = a.getAttribute('href');
-                        
-                        if (!href) {
-                            return;
-                        }
-                        
-                        const url = new URL(href, window.location.href);
-                        a.setAttribute('href', url.href);
-                    });
-                }
-                
-                process(document.body);
-                
-                const observer = new MutationObserver((records) => {
-                    for (const record of records) {
-                        for (const node of record.addedNodes) {
-                            if (node.nodeType === Node.ELEMENT_NODE) {
-                                process(node);
-                            }
-                        }
-                    }
-                });
-                
-                observer.observe(document.body, { childList: true, subtree: true });
-                
-                window.npiProcessedRelativeLinks = true;
-            }
-            """
+    def _start_prefetch(self):
+        # the current page and the pages in the queue make up the page concurrency
+        self._page_queue = asyncio.Queue(maxsize=max(1, self.page_concurrency - 1))
+        self._prefetch_task = asyncio.create_task(
+            self._prefetch_pages(self.playwright.page)
         )
+        self._page_signature = None
+        self._prefetched_page_count = 0
+
+    async def _resolve_next_page_url(self, page: Page) -> str | None:
+        """
+        Get the target URL of the pagination button if it is a real link
+
+        Args:
+            page: The page to resolve the URL from.
+        """
+        try:
+            await page.locator(self.pagination_button_selector).first.wait_for(
+                state="attached",
+                timeout=3_000,
+            )
+        except TimeoutError:
+            return None
+
+        return await get_pagination_link(page, self.pagination_button_selector)
+
+    async def _get_page_signature(self, page: Page) -> str | None:
+        """
+        Wait for the items and summarize the first and the last items,
+        which is enough to tell whether two pages show the same items.
+        Returns None if there are no items on the page.
+
+        Args:
+            page: The page to compute the signature of.
+        """
+        return await get_page_signature(
+            page,
+            self.items_selector or self.ancestor_selector,
+            timeout=10_000,
+        )
+
+    async def _load_page_by_url(self, page: Page, url: str) -> str | None:
+        await page.goto(url, wait_until="domcontentloaded")
+        return await self._get_page_signature(page)
+
+    async def _put_prefetched_page(self, page: Page, loading: asyncio.Task):
+        try:
+            await self._page_queue.put((page, loading))
+        except asyncio.CancelledError:
+            loading.cancel()
+            await page.close()
+            raise
+
+    async def _prefetch_pages(self, first_page: Page):
+        """
+        Load the following pages in parallel and put them into the queue in page order, followed by None.
+        With a URL template, the pages are opened directly. Otherwise, the pagination links are followed.
+
+        Args:
+            first_page: The page to start from.
+        """
+        try:
+            if self.pagination_url_template:
+                await self._prefetch_pages_by_template()
+            else:
+                await self._prefetch_pages_by_link(first_page)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Failed to prefetch pages: {e}")
+
+        await self._page_queue.put(None)
+
+    async def _prefetch_pages_by_template(self):
+        index = 0
+
+        # the end of the pages is detected by the consumer, while the queue limits the lookahead
+        while True:
+            url = get_pagination_url(self.pagination_url_template, index)
+            index += 1
+
+            page = await self.playwright.context.new_page()
+            await self._put_prefetched_page(
+                page,
+                asyncio.create_task(self._load_page_by_url(page, url)),
+            )
+
+    async def _prefetch_pages_by_link(self, page: Page):
+        visited_urls = {page.url}
+
+        while True:
+            url = await self._resolve_next_page_url(page)
+
+            if not url or url in visited_urls:
+                return
+
+            visited_urls.add(url)
+            page = await self.playwright.context.new_page()
+
+            try:
+                # the next link is usually available once the DOM is loaded,
+                # so the following page starts loading while this one is still rendering
+                await page.goto(url, wait_until="domcontentloaded")
+            except BaseException:
+                await page.close()
+                raise
+
+            await self._put_prefetched_page(
+                page,
+                asyncio.create_task(self._get_page_signature(page)),
+            )
+
+    async def _goto_prefetched_page(self, ctx: Context) -> bool:
+        """
+        Switch to the next prefetched page. Returns False if there are no more pages.
+
+        Args:
+            ctx: NPi context.
+        """
+        if self._prefetch_task is None:
+            self._start_prefetch()
+
+        if self._page_signature is None:
+            self._page_signature = await self._get_page_signature(self.playwright.page)
+
+        entry = await self._page_queue.get()
+
+        if entry is None:
+            # re-put the sentinel for the following calls
+            self._page_queue.put_nowait(None)
+            return False
+
+        page, loading = entry
+
+        try:
+            signature = await loading
+        except Exception as e:
+            await ctx.send_error_message(
+                f"[{self.name}] Failed to load the next page: {e}"
+            )
+            signature = None
+
+        # empty or repeated pages mean that the pagination is exhausted,
+        # as sites often redirect to the last page or render nothing for out of range pages
+        if signature is None or signature == self._page_signature:
+            await page.close()
+            await self._stop_prefetch()
+            await ctx.send_debug_message(
+                f"[{self.name}] No more pages after {page.url}"
+            )
+            return False
+
+        prev_page = self.playwright.page
+        self.playwright.detach_events(prev_page)
+        self.playwright.page = page
+        self.playwright.attach_events(page)
+        await prev_page.close()
+
+        self._page_signature = signature
+        self._prefetched_page_count += 1
+
+        await ctx.send_debug_message(f"[{self.name}] Switched to next page: {page.url}")
+
+        return True
+
+    async def _stop_prefetch(self):
+        """Cancel the prefetching and close the pending pages, leaving the sentinel in the queue"""
+        self._prefetch_task.cancel()
+        await asyncio.gather(self._prefetch_task, return_exceptions=True)
+
+        while not self._page_queue.empty():
+            entry = self._page_queue.get_nowait()
+
+            if entry is not None:
+                page, loading = entry
+                loading.cancel()
+                await page.close()
+
+        self._page_queue.put_nowait(None)
+
+    async def _clear_prefetched_pages(self):
+        if self._prefetch_task is None:
+            return
+
+        await self._stop_prefetch()
+        self._prefetch_task = None
+        self._page_queue = None
+
+    async def _process_relative_links(self):
+        await self.playwright.page.evaluate("() => npi.absolutizeLinks()")
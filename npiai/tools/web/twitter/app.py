@@ -10,7 +10,7 @@ from npiai.constant import app
 from npiai.context import Context
 from npiai.core import PlaywrightContext
 from npiai.core.browser import NavigatorAgent
-from npiai.utils import is_cloud_env
+from npiai.utils import is_cloud_env, markdown_service
 from .twitter_client import TwitterClient
 
 __SYSTEM_PROMPT__ = """
@@ -98,6 +98,10 @@ def html_to_md(html: str, **options) -> str:
     return ImageFilterConverter(**options).convert(html)
 
 
+async def ahtml_to_md(html: str, **options) -> str:
+    return await markdown_service.convert(html, ImageFilterConverter(**options))
+
+
 class Twitter(BrowserTool):
     name = "twitter"
     description = "retrieve and manage tweets"
@@ -278,7 +282,7 @@ class Twitter(BrowserTool):
                 results.append(
                     {
                         "link": f"https://x.com{link}",
-                        "content": html_to_md(await tweet.inner_html()),
+                        "content": await ahtml_to_md(await tweet.inner_html()),
                     }
                 )
             except TimeoutError as e:
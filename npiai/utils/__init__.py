@@ -9,9 +9,14 @@ from .parse_json_response import parse_json_response
 from .llm_tool_call import llm_tool_call
 from .parse_npi_function import parse_npi_function
 from .html_to_markdown import html_to_markdown, CompactMarkdownConverter
+from .lxml_markdown_converter import LxmlMarkdownConverter
+from .markdown_service import MarkdownService, markdown_service, ahtml_to_markdown
+from .loop_lag import LoopLagMonitor
+from .adaptive_concurrency import AdaptiveConcurrency, is_congestion_error
 from .concurrent_task_runner import concurrent_task_runner
 from .llm_summarize import llm_summarize
 from .with_checkpoint import with_checkpoint
+from .sqlite_store import SqliteStore
 
 __all__ = [
     "logger",
@@ -26,7 +31,15 @@ __all__ = [
     "parse_npi_function",
     "html_to_markdown",
     "CompactMarkdownConverter",
+    "LxmlMarkdownConverter",
+    "MarkdownService",
+    "markdown_service",
+    "ahtml_to_markdown",
+    "LoopLagMonitor",
+    "AdaptiveConcurrency",
+    "is_congestion_error",
     "concurrent_task_runner",
     "llm_summarize",
     "with_checkpoint",
+    "SqliteStore",
 ]
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import litellm
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .logger import logger
+
+
+def is_congestion_error(err: BaseException) -> bool:
+    """
+    Check if the error indicates that the upstream service is overloaded,
+    i.e. rate limits, timeouts and 429/503 responses.
+    Other errors, e.g. closed pages or invalid selectors, do not call for backing off.
+    """
+    if isinstance(
+        err,
+        (
+            litellm.RateLimitError,
+            litellm.ServiceUnavailableError,
+            litellm.Timeout,
+            asyncio.TimeoutError,
+            PlaywrightTimeoutError,
+        ),
+    ):
+        return True
+
+    return getattr(err, "status_code", None) in (429, 503)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency controller.
+
+    The concurrency level grows by one per round of healthy tasks, and is halved on
+    rate limit errors, timeouts or 429/503 responses.
+    """
+
+    min_concurrency: int
+    max_concurrency: int
+    latency_tolerance: float
+
+    # number of completed tasks
+    successes: int
+    # number of congestion errors
+    errors: int
+    # highest concurrency level reached
+    peak: int
+
+    _limit: float
+    _latency_avg: float | None
+    _latency_baseline: float | None
+    _last_decrease_at: float
+
+    def __init__(
+        self,
+        initial: int = 2,
+        min_concurrency: int = 1,
+        max_concurrency: int = 16,
+        latency_tolerance: float = 2.0,
+    ):
+        """
+        Initialize the concurrency controller
+
+        Args:
+            initial: The initial concurrency level.
+            min_concurrency: The minimum concurrency level.
+            max_concurrency: The maximum concurrency level.
+            latency_tolerance: Stop growing when the average task latency exceeds the baseline by this factor.
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.successes = 0
+        self.errors = 0
+        self._limit = max(min_concurrency, min(initial, max_concurrency))
+        self.peak = self.level
+        self._latency_avg = None
+        self._latency_baseline = None
+        self._last_decrease_at = 0
+
+    @property
+    def level(self) -> int:
+        """The current concurrency level"""
+        return int(self._limit)
+
+    def _is_healthy(self) -> bool:
+        if self._latency_avg is None or self._latency_baseline is None:
+            return True
+
+        return self._latency_avg <= self._latency_baseline * self.latency_tolerance
+
+    def on_success(self, latency: float):
+        """
+        Report a completed task
+
+        Args:
+            latency: Time taken by the task in seconds
+        """
+        self.successes += 1
+
+        if self._latency_avg is None:
+            self._latency_avg = latency
+        else:
+            self._latency_avg = 0.8 * self._latency_avg + 0.2 * latency
+
+        if self._latency_baseline is None or latency < self._latency_baseline:
+            self._latency_baseline = latency
+
+        if not self._is_healthy():
+            return
+
+        prev_level = self.level
+        # grow by 1 after `level` consecutive healthy tasks
+        self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+
+        if self.level != prev_level:
+            self.peak = max(self.peak, self.level)
+            logger.debug(f"Concurrency increased to {self.level}")
+
+    def on_error(self, err: BaseException) -> bool:
+        """
+        Report a failed task. Returns True if the error is a congestion signal and the task can be retried.
+
+        Args:
+            err: The error raised by the task
+        """
+        if not is_congestion_error(err):
+            return False
+
+        self.errors += 1
+        now = time.monotonic()
+
+        # errors of the same burst only back off once
+        if now - self._last_decrease_at < (self._latency_avg or 1):
+            return True
+
+        self._last_decrease_at = now
+        self._limit = max(self.min_concurrency, self._limit / 2)
+        logger.debug(f"Concurrency decreased to {self.level} due to {err!r}")
+
+        return True
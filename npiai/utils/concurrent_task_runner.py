@@ -1,61 +1,161 @@
 import asyncio
-import sys
+import time
 import traceback
-from typing import Callable, Awaitable, Any, AsyncGenerator
+from typing import Callable, Awaitable, Any, AsyncGenerator, List, Literal
+
+from .adaptive_concurrency import AdaptiveConcurrency, is_congestion_error
+from .logger import logger
+
+# maximum number of consecutive congestion errors before a worker gives up
+_MAX_CONSECUTIVE_ERRORS = 3
+
+ErrorPolicy = Literal["log", "fail_fast", "collect"]
+
+
+class _WorkerExit:
+    """Sentinel put into the results queue when a worker exits"""
+
+    error: Exception | None
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
 
 
 async def concurrent_task_runner[
     T
 ](
     fn: Callable[[asyncio.Queue[T]], Awaitable[Any]],
-    concurrency: int = 1,
+    concurrency: int | Literal["auto"] | AdaptiveConcurrency = 1,
+    on_error: ErrorPolicy = "log",
+    max_pending_results: int = 0,
 ) -> AsyncGenerator[T, None]:
-    # results queue
-    results_queue: asyncio.Queue[T] = asyncio.Queue()
+    """
+    Run `fn` in concurrent workers and yield the results put into the queue.
+
+    `fn` processes a unit of work and returns a truthy value if there may be more work,
+    in which case the worker calls it again. Congestion errors are retried by calling `fn` again,
+    so `fn` has to put back the work it has taken before raising, otherwise the work is lost.
+
+    Args:
+        fn: The task function.
+        concurrency: The number of workers, or "auto" / an `AdaptiveConcurrency` instance to adjust the number of workers with AIMD.
+        on_error: How to handle worker errors. "log" logs the error and stops the worker, "fail_fast" cancels all workers and raises the error, "collect" raises all errors as an ExceptionGroup after the other workers have finished.
+        max_pending_results: The maximum number of results waiting to be consumed. Workers are blocked when the limit is reached. 0 means unbounded.
+    """
+    if concurrency == "auto":
+        controller = AdaptiveConcurrency()
+    elif isinstance(concurrency, AdaptiveConcurrency):
+        controller = concurrency
+    else:
+        controller = None
+
+    # results queue, also carries the exit sentinels of the workers
+    results_queue: asyncio.Queue[T | _WorkerExit] = asyncio.Queue(
+        maxsize=max_pending_results
+    )
     # number of running tasks
     running_task_count = 0
-    # lock for the counter
-    counter_lock = asyncio.Lock()
+    # whether fn has reported that there is no more work
+    exhausted = False
+    tasks: List[asyncio.Task] = []
 
-    async def process():
-        try:
-            await fn(results_queue)
-        except Exception:
-            print(
-                f"Error in concurrent_task_runner: {traceback.format_exc()}",
-                file=sys.stderr,
-            )
+    async def run_worker() -> Exception | None:
+        nonlocal exhausted
+        consecutive_errors = 0
+
+        while True:
+            # retire the worker if the concurrency level has been reduced
+            if controller and running_task_count > controller.level:
+                return None
+
+            start_time = time.monotonic()
+
+            try:
+                has_more = await fn(results_queue)
+            except Exception as e:
+                consecutive_errors += 1
+
+                if controller:
+                    retry = controller.on_error(e)
+                else:
+                    retry = is_congestion_error(e)
+
+                if retry and consecutive_errors < _MAX_CONSECUTIVE_ERRORS:
+                    # back off before retrying
+                    await asyncio.sleep(consecutive_errors)
+                    continue
+
+                return e
+
+            consecutive_errors = 0
+
+            if controller:
+                controller.on_success(time.monotonic() - start_time)
+
+                # scale up the workers if the concurrency level has been increased
+                while not exhausted and running_task_count < controller.level:
+                    spawn()
+
+            if not has_more:
+                exhausted = True
+
+            if exhausted:
+                return None
 
     async def task_runner():
         nonlocal running_task_count
-        async with counter_lock:
-            running_task_count += 1
-
-        await process()
 
-        async with counter_lock:
+        try:
+            error = await run_worker()
+        finally:
             running_task_count -= 1
 
+        # results put by this worker are consumed before the sentinel
+        await results_queue.put(_WorkerExit(error))
+
+    def spawn():
+        nonlocal running_task_count
+        running_task_count += 1
+        tasks.append(asyncio.create_task(task_runner()))
+
     # schedule tasks
-    tasks = [asyncio.create_task(task_runner()) for _ in range(concurrency)]
+    for _ in range(controller.level if controller else concurrency):
+        spawn()
 
-    # wait for the first task to start
-    while running_task_count == 0:
-        await asyncio.sleep(0.1)
+    errors: List[Exception] = []
+    exited_count = 0
 
-    # collect results
-    while running_task_count > 0:
-        # consume the queue only when there are running tasks
-        while not results_queue.empty():
+    try:
+        # new workers are spawned before the spawning worker exits,
+        # so all workers have exited once the counts match
+        while exited_count < len(tasks):
             res = await results_queue.get()
-            yield res
 
-        await asyncio.sleep(0.1)
+            if not isinstance(res, _WorkerExit):
+                yield res
+                continue
+
+            exited_count += 1
+
+            if res.error is None:
+                continue
+
+            match on_error:
+                case "fail_fast":
+                    raise res.error
+                case "collect":
+                    errors.append(res.error)
+                case _:
+                    logger.error(
+                        "Error in concurrent_task_runner: "
+                        + "".join(traceback.format_exception(res.error))
+                    )
+    finally:
+        # propagate cancellation to the workers if the consumer exits early
+        for task in tasks:
+            task.cancel()
 
-    # wait for all tasks to finish
-    await asyncio.gather(*tasks)
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-    # consume the remaining items if any
-    while not results_queue.empty():
-        res = await results_queue.get()
-        yield res
+    if errors:
+        raise ExceptionGroup("Errors in concurrent_task_runner", errors)
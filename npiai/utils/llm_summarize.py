@@ -2,6 +2,7 @@ import csv
 import re
 from typing import List, AsyncGenerator, Dict
 
+from litellm import stream_chunk_builder
 from litellm.types.completion import (
     ChatCompletionMessageParam,
     ChatCompletionUserMessageParam,
@@ -9,41 +10,187 @@ from litellm.types.completion import (
 
 from npiai.llm import LLM
 from npiai.context import Context
+from npiai.error import TruncatedResponseError
+
+
+class _CSVRowParser:
+    """Incrementally parse `;`-delimited csv rows from the streamed content"""
+
+    _buffer: str
+    _round_head: str | None
+    _pending_record: str
+    _header: List[str] | None
+    _fenced: bool | None
+    _closed: bool
+
+    def __init__(self):
+        self._buffer = ""
+        # beginning of a continued response, None if not in a new round
+        self._round_head = None
+        self._pending_record = ""
+        self._header = None
+        # whether the table is wrapped in a code block, None if unknown yet
+        self._fenced = None
+        self._closed = False
+
+    def new_round(self):
+        """Mark the start of a continued response"""
+        self._round_head = ""
+        self._closed = False
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Feed a chunk of content and return the completed rows"""
+        if self._round_head is not None:
+            # a continued response may open a new code block,
+            # which should be dropped to join the content seamlessly
+            head = self._round_head + text
+
+            if len(head) < 3 or (head.startswith("```") and "\n" not in head):
+                self._round_head = head
+                return []
+
+            self._round_head = None
+            text = head.split("\n", 1)[1] if head.startswith("```") else head
+
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._parse_lines(lines)
+
+    def flush(self) -> List[Dict[str, str]]:
+        """Parse the remaining content at the end of the response"""
+        if self._round_head and not self._round_head.startswith("```"):
+            self._buffer += self._round_head
+
+        self._round_head = None
+        lines = [self._buffer, ""] if self._buffer else [""]
+        self._buffer = ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines: List[str]) -> List[Dict[str, str]]:
+        rows = []
+
+        for line in lines:
+            if self._closed:
+                break
+
+            if line.startswith("```"):
+                if self._fenced is None:
+                    self._fenced = True
+                    continue
+
+                if self._fenced:
+                    self._closed = True
+                    break
+
+            if self._fenced is None:
+                self._fenced = False
+
+            self._pending_record += line + "\n"
+
+            # a quoted value may span multiple lines,
+            # wait for the closing quote before parsing the record
+            if self._pending_record.count('"') % 2 != 0:
+                continue
+
+            record = self._pending_record
+            self._pending_record = ""
+
+            if not record.strip():
+                continue
+
+            values = next(csv.reader([record.rstrip("\n")], delimiter=";"), None)
+
+            if not values:
+                continue
+
+            if self._header is None:
+                self._header = values
+                continue
+
+            # mimic csv.DictReader
+            row = dict(zip(self._header, values))
+
+            for key in self._header[len(values) :]:
+                row[key] = None
+
+            rows.append(row)
+
+        return rows
 
 
 async def llm_summarize(
     ctx: Context,
     messages: List[ChatCompletionMessageParam],
+    stream: bool = False,
+    max_tokens: int = 4096,
+    continue_on_length: bool = True,
 ) -> AsyncGenerator[Dict[str, str], None]:
+    """
+    Summarize the given messages into a `;`-delimited csv table
+
+    Args:
+        ctx: NPi context.
+        messages: The prompt messages.
+        stream: Whether to stream the completion and yield each row as soon as its line is complete.
+        max_tokens: The maximum number of tokens of each completion.
+        continue_on_length: Whether to ask the model to continue generating when the response is truncated. If False, TruncatedResponseError is raised after the completed rows are yielded.
+    """
     messages_copy = messages.copy()
-    final_response_content = ""
+    parser = _CSVRowParser()
 
     while True:
-        response = await ctx.llm.acompletion(
-            messages=messages_copy,
-            max_tokens=4096,
-            # use fixed temperature and seed to ensure deterministic results
-            temperature=0.0,
-            seed=42,
-        )
+        if stream:
+            chunks = []
+            response_stream = await ctx.llm.acompletion(
+                messages=messages_copy,
+                max_tokens=max_tokens,
+                # use fixed temperature and seed to ensure deterministic results
+                temperature=0.0,
+                seed=42,
+                stream=True,
+            )
+
+            async for chunk in response_stream:
+                chunks.append(chunk)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+
+                if delta:
+                    for row in parser.feed(delta):
+                        yield row
+
+            response = stream_chunk_builder(chunks, messages=messages_copy)
+        else:
+            response = await ctx.llm.acompletion(
+                messages=messages_copy,
+                max_tokens=max_tokens,
+                # use fixed temperature and seed to ensure deterministic results
+                temperature=0.0,
+                seed=42,
+            )
 
         ctx.record(prompts=messages_copy, response=response)
 
         messages_copy.append(response.choices[0].message)
 
-        content = response.choices[0].message.content
-        match = re.match(r"```.*\n([\s\S]+?)(```|$)", content)
+        if not stream:
+            content = response.choices[0].message.content
+            match = re.match(r"```.*\n([\s\S]+?)(```|$)", content)
 
-        if match:
-            csv_table = match.group(1)
-        else:
-            csv_table = content
+            if match:
+                csv_table = match.group(1)
+            else:
+                csv_table = content
 
-        final_response_content += csv_table
+            for row in parser.feed(csv_table):
+                yield row
 
         if response.choices[0].finish_reason != "length":
             break
 
+        if not continue_on_length:
+            # the last line may be cut off, drop it instead of flushing
+            raise TruncatedResponseError("The summary response was truncated")
+
         messages_copy.append(
             ChatCompletionUserMessageParam(
                 role="user",
@@ -51,5 +198,8 @@ async def llm_summarize(
             ),
         )
 
-    for row in csv.DictReader(final_response_content.splitlines(), delimiter=";"):
+        if stream:
+            parser.new_round()
+
+    for row in parser.flush():
         yield row
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+
+class LoopLagMonitor:
+    """
+    Measure how long the event loop is blocked by synchronous work.
+
+    A background task sleeps for `interval` seconds repeatedly, and the delay between
+    the expected and the actual wake-up time is recorded as lag.
+
+    Usage:
+        async with LoopLagMonitor() as monitor:
+            ...
+
+        print(monitor.max_lag, monitor.avg_lag)
+    """
+
+    interval: float
+
+    # longest observed stall in seconds
+    max_lag: float
+    samples: int
+
+    _total_lag: float
+    _task: asyncio.Task | None
+
+    def __init__(self, interval: float = 0.05):
+        """
+        Initialize the monitor
+
+        Args:
+            interval: Sampling interval in seconds.
+        """
+        self.interval = interval
+        self.max_lag = 0
+        self.samples = 0
+        self._total_lag = 0
+        self._task = None
+
+    @property
+    def avg_lag(self) -> float:
+        """Average lag in seconds"""
+        return self._total_lag / self.samples if self.samples else 0
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - start - self.interval)
+
+            self.samples += 1
+            self._total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
@@ -0,0 +1,273 @@
+import re
+from typing import List
+
+from lxml import etree
+
+from .html_to_markdown import CompactMarkdownConverter
+
+_whitespace_re = re.compile(r"[\t ]+")
+_heading_re = re.compile(r"h[1-6]")
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+# leading whitespace around the doctype, which lxml drops but BeautifulSoup keeps
+_document_re = re.compile(r"(\s*)(<!doctype[^>]*>)?(\s*)<html", re.IGNORECASE)
+_document_tail_re = re.compile(r"</html>(\s*)$", re.IGNORECASE)
+
+# plain elements are faster than the lxml.html element classes
+_parser = etree.HTMLParser()
+
+# elements whose whitespace-only text nodes are removed, see `MarkdownConverter.process_tag`
+_NESTED_TAGS = frozenset(
+    ["ol", "ul", "li", "table", "thead", "tbody", "tfoot", "tr", "td", "th"]
+)
+
+
+class _Text(str):
+    """Text node, `name` is None as in BeautifulSoup's NavigableString"""
+
+    name = None
+    __slots__ = ()
+
+
+class _Node:
+    """Minimal BeautifulSoup-like element so that the markdownify convert_* rules can be reused"""
+
+    __slots__ = ("name", "parent", "contents", "_el", "_attrs", "_index")
+
+    name: str
+    parent: "_Node | None"
+    # child nodes and plain strings for the text nodes
+    contents: List["_Node | str"]
+
+    _el: etree.ElementBase | None
+    _attrs: dict | None
+    # position in the contents of the parent, set when the tree is built
+    _index: int
+
+    def __init__(
+        self,
+        name: str,
+        parent: "_Node | None",
+        el: etree.ElementBase | None = None,
+    ):
+        self.name = name
+        self.parent = parent
+        self.contents = []
+        self._el = el
+        self._attrs = None
+        self._index = 0
+
+    def __bool__(self):
+        return True
+
+    @property
+    def attrs(self) -> dict:
+        if self._attrs is None:
+            self._attrs = dict(self._el.attrib) if self._el is not None else {}
+
+        return self._attrs
+
+    def __getitem__(self, key: str):
+        return self.attrs[key]
+
+    def get(self, key: str, default=None):
+        return self.attrs.get(key, default)
+
+    def index(self, child: "_Node") -> int:
+        return child._index
+
+    def _sibling(self, offset: int):
+        if self.parent is None:
+            return None
+
+        index = self._index + offset
+
+        if not 0 <= index < len(self.parent.contents):
+            return None
+
+        el = self.parent.contents[index]
+        return _Text(el) if isinstance(el, str) else el
+
+    @property
+    def previous_sibling(self):
+        return self._sibling(-1)
+
+    @property
+    def next_sibling(self):
+        return self._sibling(1)
+
+    def find_all(self, names: List[str]) -> List["_Node"]:
+        results = []
+
+        for el in self.contents:
+            if isinstance(el, _Node):
+                if el.name in names:
+                    results.append(el)
+
+                results.extend(el.find_all(names))
+
+        return results
+
+
+def _normalize_blank(text: str) -> str:
+    # BeautifulSoup collapses whitespace-only strings into a single space or newline
+    if text.strip(_ASCII_SPACES):
+        return text
+
+    return "\n" if "\n" in text else " "
+
+
+def _build_tree(
+    el: etree.ElementBase,
+    parent: _Node,
+    preserve_whitespace: bool = False,
+) -> _Node:
+    node = _Node(el.tag, parent, el)
+    contents = node.contents
+    preserve_whitespace = preserve_whitespace or el.tag in ("pre", "textarea")
+
+    if el.text:
+        contents.append(el.text if preserve_whitespace else _normalize_blank(el.text))
+
+    for child in el:
+        # comments and processing instructions have non-string tags
+        if isinstance(child.tag, str):
+            child_node = _build_tree(child, node, preserve_whitespace)
+            child_node._index = len(contents)
+            contents.append(child_node)
+
+        if child.tail:
+            contents.append(
+                child.tail if preserve_whitespace else _normalize_blank(child.tail)
+            )
+
+    return node
+
+
+class LxmlMarkdownConverter(CompactMarkdownConverter):
+    """
+    Drop-in replacement of `CompactMarkdownConverter` that parses HTML with lxml.
+
+    The markdownify conversion rules are reused on a lightweight element tree,
+    while ancestor lookups are replaced by flags passed down the traversal.
+    Converters that rely on other BeautifulSoup APIs should keep using markdownify.
+    """
+
+    def convert(self, html: str) -> str:
+        root = _Node("[document]", None)
+
+        if html and html.strip():
+            if match := _document_re.match(html):
+                doc = etree.fromstring(html, _parser)
+                root.contents.extend(
+                    _normalize_blank(space)
+                    for space in (match.group(1), match.group(3))
+                    if space
+                )
+                doc_node = _build_tree(doc, root)
+                doc_node._index = len(root.contents)
+                root.contents.append(doc_node)
+
+                if (tail := _document_tail_re.search(html)) and tail.group(1):
+                    root.contents.append(_normalize_blank(tail.group(1)))
+            else:
+                # wrap the fragment so that leading text is not put into a paragraph
+                doc = etree.fromstring(f"<div>{html}</div>", _parser)
+                root.contents = _build_tree(doc.find("body/div"), root).contents
+
+                for el in root.contents:
+                    if isinstance(el, _Node):
+                        el.parent = root
+        elif html:
+            root.contents.append(html)
+
+        if not hasattr(self, "_tag_rules"):
+            self._tag_rules = {}
+
+        return self._process_children(root, False, False, False)
+
+    def _get_tag_rule(self, name: str):
+        """Get the convert function and whether the children are converted as inline"""
+        convert_fn = getattr(self, f"convert_{name}", None)
+
+        if convert_fn and not self.should_convert_tag(name):
+            convert_fn = None
+
+        # markdown headings or cells can't include block elements
+        inline_children = _heading_re.match(name) is not None or name in ("td", "th")
+
+        rule = self._tag_rules[name] = (convert_fn, inline_children)
+        return rule
+
+    def _process_children(
+        self,
+        node: _Node,
+        convert_as_inline: bool,
+        in_pre: bool,
+        in_code: bool,
+    ) -> str:
+        contents = node.contents
+
+        if node.name in _NESTED_TAGS:
+            # remove whitespace-only text nodes next to nested nodes
+            last = len(contents) - 1
+            contents[:] = [
+                el
+                for i, el in enumerate(contents)
+                if not isinstance(el, str)
+                or el.strip() != ""
+                or not (
+                    i == 0
+                    or i == last
+                    or getattr(contents[i - 1], "name", None) in _NESTED_TAGS
+                    or getattr(contents[i + 1], "name", None) in _NESTED_TAGS
+                )
+            ]
+
+            for i, el in enumerate(contents):
+                if isinstance(el, _Node):
+                    el._index = i
+
+        tag_rules = self._tag_rules
+        escape = self.escape
+        is_li = node.name == "li"
+        last = len(contents) - 1
+        parts = []
+
+        for i, el in enumerate(contents):
+            if isinstance(el, str):
+                # normalize whitespace if we're not inside a preformatted element
+                if not in_pre:
+                    el = _whitespace_re.sub(" ", el)
+
+                # escape special characters if we're not inside a preformatted or code element
+                if not in_code:
+                    el = escape(el)
+
+                # remove trailing whitespaces of the last text node in li
+                # or the text node followed by an embedded list
+                if is_li and (
+                    i == last or getattr(contents[i + 1], "name", None) in ("ul", "ol")
+                ):
+                    el = el.rstrip()
+
+                parts.append(el)
+                continue
+
+            name = el.name
+            convert_fn, inline_children = tag_rules.get(name) or self._get_tag_rule(
+                name
+            )
+
+            text = self._process_children(
+                el,
+                convert_as_inline or inline_children,
+                in_pre or name == "pre",
+                in_code or name in ("pre", "code", "kbd", "samp"),
+            )
+
+            if convert_fn:
+                text = convert_fn(el, text, convert_as_inline)
+
+            parts.append(text)
+
+        return "".join(parts)
@@ -0,0 +1,177 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Type
+
+from markdownify import MarkdownConverter
+
+from .html_to_markdown import CompactMarkdownConverter
+from .logger import logger
+
+
+def _convert_chunk(
+    converter_cls: Type[MarkdownConverter],
+    options: Dict[str, Any],
+    htmls: List[str],
+) -> List[str]:
+    # markdownify caches unpicklable closures on the instance,
+    # so the converter is re-created from its class and options in the worker
+    converter = converter_cls(**options)
+    return [converter.convert(html) for html in htmls]
+
+
+def _is_picklable(converter: MarkdownConverter) -> bool:
+    try:
+        pickle.dumps((type(converter), converter.options))
+        return True
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        # e.g. converters defined in a local scope
+        logger.debug(f"Converting markdown in a thread: {e!r}")
+        return False
+
+
+class MarkdownService:
+    """
+    Convert HTML to markdown off the event loop.
+
+    Large documents are converted on a process pool so that the BeautifulSoup work
+    does not block the browser and LLM I/O. Small documents are converted inline
+    since the IPC overhead would exceed the conversion cost.
+    """
+
+    max_workers: int | None
+    chunk_size: int
+    inline_threshold: int
+
+    _pool: ProcessPoolExecutor | None
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        chunk_size: int = 16,
+        inline_threshold: int = 2048,
+    ):
+        """
+        Initialize the markdown service
+
+        Args:
+            max_workers: The number of worker processes. Defaults to the number of CPUs minus one.
+            chunk_size: The number of documents submitted to a worker at once.
+            inline_threshold: Total HTML length below which the conversion runs inline.
+        """
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.chunk_size = chunk_size
+        self.inline_threshold = inline_threshold
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # forking a process with a running event loop and browser threads is unsafe
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(method),
+            )
+            atexit.register(self.shutdown)
+
+        return self._pool
+
+    async def convert(
+        self,
+        html: str,
+        converter: MarkdownConverter | None = None,
+    ) -> str:
+        """
+        Convert a HTML document to markdown
+
+        Args:
+            html: The HTML document.
+            converter: The markdown converter to use. Defaults to `CompactMarkdownConverter`.
+        """
+        results = await self.convert_batch([html], converter)
+        return results[0]
+
+    async def convert_batch(
+        self,
+        htmls: List[str],
+        converter: MarkdownConverter | None = None,
+    ) -> List[str]:
+        """
+        Convert HTML documents to markdown, preserving the order
+
+        Args:
+            htmls: The HTML documents.
+            converter: The markdown converter to use. Defaults to `CompactMarkdownConverter`.
+        """
+        converter = converter or CompactMarkdownConverter()
+
+        if sum(len(html) for html in htmls) < self.inline_threshold:
+            return [converter.convert(html) for html in htmls]
+
+        chunks = [
+            htmls[i : i + self.chunk_size]
+            for i in range(0, len(htmls), self.chunk_size)
+        ]
+
+        if _is_picklable(converter):
+            loop = asyncio.get_running_loop()
+            pool = self._get_pool()
+
+            try:
+                results = await asyncio.gather(
+                    *[
+                        loop.run_in_executor(
+                            pool,
+                            _convert_chunk,
+                            type(converter),
+                            converter.options,
+                            chunk,
+                        )
+                        for chunk in chunks
+                    ]
+                )
+                return [markdown for chunk in results for markdown in chunk]
+            except BrokenProcessPool:
+                self.shutdown()
+
+        results = await asyncio.gather(
+            *[
+                asyncio.to_thread(
+                    _convert_chunk, type(converter), converter.options, chunk
+                )
+                for chunk in chunks
+            ]
+        )
+
+        return [markdown for chunk in results for markdown in chunk]
+
+    def shutdown(self):
+        """Stop the worker processes, a new pool is started on the next conversion"""
+        if self._pool is not None:
+            atexit.unregister(self.shutdown)
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# shared by all tools in the process
+markdown_service = MarkdownService()
+
+
+async def ahtml_to_markdown(html: str, **options) -> str:
+    """
+    Async version of `html_to_markdown` that converts off the event loop
+
+    Args:
+        html: The HTML document.
+        **options: markdownify options.
+    """
+    markdown = await markdown_service.convert(html, CompactMarkdownConverter(**options))
+    return markdown.strip()
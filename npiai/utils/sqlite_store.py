@@ -0,0 +1,150 @@
+import asyncio
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+
+class SqliteStore:
+    """
+    Persistent key-value store backed by sqlite, the base of the caches.
+
+    The database file can be shared across processes. Entries expire after `ttl` seconds,
+    and the least recently used entries are evicted once the total size exceeds `max_size` bytes.
+    Subclasses keep their entries in their own `table` and (de)serialize the values in their `get` and `set`.
+    """
+
+    table: str = "entries"
+
+    path: pathlib.Path
+    ttl: float | None
+    max_size: int
+
+    _conn: sqlite3.Connection | None
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        path: str | pathlib.Path,
+        ttl: float | None,
+        max_size: int,
+    ):
+        """
+        Initialize the sqlite store
+
+        Args:
+            path: Path to the sqlite database.
+            ttl: Time-to-live of the entries in seconds. None means never expire.
+            max_size: Maximum total size of the entries in bytes.
+        """
+        self.path = pathlib.Path(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+
+        os.makedirs(self.path.parent, exist_ok=True)
+
+        conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        # WAL mode allows concurrent readers while another process is writing
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_accessed_at ON {self.table} (accessed_at)"
+        )
+
+        self._conn = conn
+        return conn
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, created_at = row
+            now = time.time()
+
+            if self.ttl is not None and now - created_at > self.ttl:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+
+            conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+
+            return value
+
+    def _set(self, key: str, value: str):
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+
+            conn.execute(
+                f"""
+                INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, value, len(value.encode()), now, now),
+            )
+
+            if self.ttl is not None:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?",
+                    (now - self.ttl,),
+                )
+
+            # keep the most recently used entries within the size budget
+            conn.execute(
+                f"""
+                DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total
+                        FROM {self.table}
+                    )
+                    WHERE total > ?
+                )
+                """,
+                (self.max_size,),
+            )
+
+    def _clear(self):
+        with self._lock:
+            self._connect().execute(f"DELETE FROM {self.table}")
+
+    async def clear(self):
+        """Remove all entries"""
+        await asyncio.to_thread(self._clear)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,33 @@
+from npiai.core.browser import get_browser_pool, stop_browser_pools
+from npiai.core.browser._pool import _borrow_shared_pool, _return_shared_pool
+
+
+async def test_shared_pool_is_stopped_with_the_last_borrower():
+    pool = _borrow_shared_pool(headless=True, channel=None)
+    assert _borrow_shared_pool(headless=True, channel=None) is pool
+
+    await _return_shared_pool(pool)
+    assert _borrow_shared_pool(headless=True, channel=None) is pool
+
+    await _return_shared_pool(pool)
+    await _return_shared_pool(pool)
+
+    # the stopped pool is not handed out again
+    new_pool = _borrow_shared_pool(headless=True, channel=None)
+    assert new_pool is not pool
+
+    await _return_shared_pool(new_pool)
+
+
+async def test_held_pool_outlives_its_borrowers():
+    pool = get_browser_pool()
+    assert _borrow_shared_pool(headless=True, channel=None) is pool
+
+    await _return_shared_pool(pool)
+    assert _borrow_shared_pool(headless=True, channel=None) is pool
+
+    await _return_shared_pool(pool)
+    await stop_browser_pools()
+
+    assert get_browser_pool() is not pool
+    await stop_browser_pools()
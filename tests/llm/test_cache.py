@@ -0,0 +1,67 @@
+import time
+
+from litellm import ModelResponse
+
+from npiai.llm import LLMCache
+from npiai.llm.cache import get_request_key
+
+
+def response(content: str) -> ModelResponse:
+    return ModelResponse(choices=[{"message": {"content": content}}])
+
+
+def test_request_key_ignores_transport_params():
+    messages = [{"role": "user", "content": "hi"}]
+    key = get_request_key("gpt-4o", {"messages": messages, "temperature": 0})
+
+    assert key == get_request_key(
+        "gpt-4o", {"temperature": 0, "messages": messages, "timeout": 30}
+    )
+    assert key != get_request_key("gpt-4o", {"messages": messages, "temperature": 1})
+    assert key != get_request_key(
+        "gpt-4o-mini", {"messages": messages, "temperature": 0}
+    )
+
+
+async def test_get_returns_the_saved_response(tmp_path):
+    cache = LLMCache(path=tmp_path / "cache.sqlite")
+
+    assert await cache.get("key") is None
+
+    await cache.set("key", response("cached"))
+    cached = await cache.get("key")
+
+    assert cached.choices[0].message.content == "cached"
+    cache.close()
+
+
+async def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache = LLMCache(path=tmp_path / "cache.sqlite", ttl=60)
+    await cache.set("key", response("cached"))
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    assert await cache.get("key") is None
+    cache.close()
+
+
+async def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    size = len(response("0").model_dump_json().encode())
+    cache = LLMCache(path=tmp_path / "cache.sqlite", max_size=2 * size)
+
+    now = time.time()
+
+    for i in range(3):
+        monkeypatch.setattr(time, "time", lambda: now + i)
+        await cache.set(str(i), response(str(i)))
+
+        if i == 1:
+            # touch the first entry so that the second one is the least recently used
+            monkeypatch.setattr(time, "time", lambda: now + 1.5)
+            assert await cache.get("0") is not None
+
+    assert await cache.get("0") is not None
+    assert await cache.get("1") is None
+    assert await cache.get("2") is not None
+    cache.close()
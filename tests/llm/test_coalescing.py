@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+from litellm import ModelResponse
+
+from npiai.llm import OpenAI
+
+MESSAGES = [{"role": "user", "content": "Is there a captcha?"}]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    llm = OpenAI(api_key="test", model="gpt-4o")
+
+    async def acompletion(**kwargs):
+        await asyncio.sleep(0.01)
+        return ModelResponse(choices=[{"message": {"content": "no"}}])
+
+    monkeypatch.setattr(llm, "_acompletion", acompletion)
+
+    return llm
+
+
+async def test_identical_deterministic_requests_are_coalesced(llm):
+    responses = await asyncio.gather(
+        *[llm.acompletion(messages=MESSAGES, temperature=0) for _ in range(3)]
+    )
+
+    assert llm.stats.requests == 1
+    assert llm.stats.coalesced == 2
+
+    # each caller gets its own response object
+    assert len({id(response) for response in responses}) == 3
+    assert all(response.choices[0].message.content == "no" for response in responses)
+
+
+async def test_sampled_requests_are_not_coalesced(llm):
+    await asyncio.gather(*[llm.acompletion(messages=MESSAGES) for _ in range(3)])
+
+    assert llm.stats.requests == 3
+    assert llm.stats.coalesced == 0
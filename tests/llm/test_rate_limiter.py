@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import litellm
+import pytest
+
+from npiai.llm import RateLimiter
+from npiai.llm import rate_limiter
+from npiai.llm.rate_limiter import estimate_tokens
+
+
+class FakeClock:
+    """Replaces the monotonic clock and the sleeps of the rate limiter"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(
+        rate_limiter,
+        "asyncio",
+        SimpleNamespace(sleep=clock.sleep, Lock=asyncio.Lock),
+    )
+
+    return clock
+
+
+def test_estimate_tokens():
+    messages = [
+        {"role": "system", "content": "a" * 400},
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": "b" * 400},
+                {"type": "image_url", "image_url": {"url": "data:"}},
+            ],
+        },
+    ]
+
+    assert estimate_tokens({"messages": messages}) == 1200
+    assert estimate_tokens({"messages": messages, "max_tokens": 100}) == 1300
+    assert estimate_tokens({"messages": messages, "max_tokens": None}) == 1200
+
+
+async def test_requests_wait_for_the_bucket_to_refill(clock):
+    limiter = RateLimiter(rpm=2)
+
+    for _ in range(3):
+        await limiter.acquire(tokens=0)
+
+    # the third request waits for one request to refill at 2 per minute
+    assert clock.sleeps == [30]
+
+
+async def test_tokens_wait_for_the_bucket_to_refill(clock):
+    limiter = RateLimiter(tpm=1000)
+
+    await limiter.acquire(tokens=800)
+    await limiter.acquire(tokens=800)
+
+    assert clock.sleeps == [pytest.approx(36)]
+
+
+async def test_budgets_adapt_to_the_rate_limit_headers(clock):
+    limiter = RateLimiter()
+
+    limiter.update(
+        headers={
+            "X-RateLimit-Limit-Requests": "60",
+            "X-RateLimit-Remaining-Requests": "0",
+            "X-RateLimit-Limit-Tokens": "6000",
+        },
+        estimated=1000,
+        used=200,
+    )
+    await limiter.acquire(tokens=100)
+
+    # no request is left, one refills every second
+    assert clock.sleeps == [1]
+
+
+async def test_unused_tokens_are_refunded(clock):
+    limiter = RateLimiter(tpm=1000)
+
+    await limiter.acquire(tokens=1000)
+    limiter.update(headers={}, estimated=1000, used=400)
+    await limiter.acquire(tokens=600)
+
+    assert clock.sleeps == []
+
+
+async def test_rate_limit_errors_pause_until_retry_after(clock):
+    limiter = RateLimiter(max_retries=1)
+    calls = []
+
+    async def completion(**kwargs):
+        calls.append(clock.now)
+
+        if len(calls) == 1:
+            raise litellm.RateLimitError(
+                "rate limited",
+                "openai",
+                "gpt-4o",
+                response=httpx.Response(
+                    429,
+                    headers={"retry-after": "6m0s"},
+                    request=httpx.Request("POST", "https://api.openai.com"),
+                ),
+            )
+
+        return "done"
+
+    assert await limiter.run(completion, messages=[]) == "done"
+    assert calls == [0, 360]
@@ -0,0 +1,91 @@
+import json
+from typing import List
+
+from npiai import Context
+from npiai.tools.scrapers import BaseScraper, SourceItem
+from npiai.tools.scrapers.types import Column
+
+COLUMNS = [Column(name="text", type="text", prompt="the text")]
+
+
+class ListScraper(BaseScraper):
+    def __init__(self, items: List[SourceItem]):
+        super().__init__()
+        self.items = items
+        self.cursor = 0
+
+    async def init_data(self, ctx: Context):
+        self.cursor = 0
+
+    async def next_items(self, ctx: Context, count: int) -> List[SourceItem] | None:
+        items = self.items[self.cursor : self.cursor + count]
+        self.cursor += len(items)
+        return items
+
+
+def make_items(*lengths: int) -> List[SourceItem]:
+    return [
+        SourceItem(hash=str(i), data={"text": "x" * length})
+        for i, length in enumerate(lengths)
+    ]
+
+
+def test_items_are_packed_within_the_budget():
+    scraper = ListScraper([])
+    scraper._row_tokens_estimate = 10
+    items = make_items(400, 400, 400)
+    item_tokens = BaseScraper._estimate_tokens({"index": 0, "data": items[0]["data"]})
+
+    count, tokens = scraper._pack_items(
+        items, budget=2 * (item_tokens + 10), output_columns=COLUMNS
+    )
+
+    assert count == 2
+    assert tokens == 2 * (item_tokens + 10)
+
+
+def test_an_oversized_item_is_packed_alone():
+    scraper = ListScraper([])
+
+    count, _ = scraper._pack_items(
+        make_items(4000, 10), budget=100, output_columns=COLUMNS
+    )
+
+    assert count == 1
+
+
+def test_output_is_estimated_from_the_columns_before_any_rows():
+    scraper = ListScraper([])
+    items = make_items(0)
+
+    _, tokens = scraper._pack_items(items, budget=1000, output_columns=COLUMNS)
+    _, more_tokens = scraper._pack_items(items, budget=1000, output_columns=COLUMNS * 3)
+
+    assert more_tokens > tokens
+
+
+async def test_summarize_stream_packs_batches_by_tokens(monkeypatch):
+    async def llm_summarize(ctx, messages, **kwargs):
+        for item in json.loads(messages[-1]["content"]):
+            yield {"__npi_item_index__": str(item["index"]), "text": "ok"}
+
+    monkeypatch.setattr("npiai.tools.scrapers.base.llm_summarize", llm_summarize)
+
+    scraper = ListScraper(make_items(400, 400, 400, 400, 4000, 400))
+    batches = [
+        batch
+        async for batch in scraper.summarize_stream(
+            Context(),
+            output_columns=COLUMNS,
+            batch_size=10,
+            batch_tokens=600,
+        )
+    ]
+
+    assert sum(len(batch["items"]) for batch in batches) == 6
+
+    stats = scraper.get_batch_stats()
+
+    assert [s["item_count"] for s in stats] == [len(b["items"]) for b in batches]
+    # the large item is packed alone even though it exceeds the budget
+    assert [s["item_count"] for s in stats if s["estimated_tokens"] > 600] == [1]
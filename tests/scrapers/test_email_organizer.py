@@ -0,0 +1,37 @@
+import litellm
+import pytest
+
+from npiai import Context
+from npiai.tools.scrapers.email_organizer import EmailOrganizer
+from npiai.tools.scrapers.email_organizer.types import FilterResult
+
+
+class FlakyEmailOrganizer(EmailOrganizer):
+    """Fails the LLM call of the given email once with a rate limit error"""
+
+    def __init__(self, emails, flaky_subject: str):
+        super().__init__(provider=None, email_or_id_list=emails)
+        self.flaky_subject = flaky_subject
+
+    async def _filter_llm_call(self, ctx, email, criteria) -> FilterResult:
+        if email["subject"] == self.flaky_subject:
+            self.flaky_subject = None
+            raise litellm.RateLimitError("rate limited", "openai", "gpt-4o")
+
+        return FilterResult(matched=True, email=email)
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+async def test_filter_stream_keeps_emails_of_retried_calls(concurrency: int):
+    emails = [{"id": str(i), "subject": f"email {i}"} for i in range(6)]
+    organizer = FlakyEmailOrganizer(emails, flaky_subject="email 2")
+
+    await organizer.init_data(Context())
+    results = [
+        result["email"]["subject"]
+        async for result in organizer.filter_stream(
+            Context(), criteria="all", concurrency=concurrency
+        )
+    ]
+
+    assert sorted(results) == [email["subject"] for email in emails]
@@ -0,0 +1,106 @@
+import pytest
+
+from npiai.tools.scrapers.utils import (
+    infer_pagination_url_template,
+    get_pagination_url,
+)
+
+
+@pytest.mark.parametrize(
+    "current_url, next_url, template, next_page, step",
+    [
+        (
+            "https://example.com/list?page=1&sort=new",
+            "https://example.com/list?page=2&sort=new",
+            "https://example.com/list?page={page}&sort=new",
+            2,
+            1,
+        ),
+        # the first page omits the page number
+        (
+            "https://example.com/list?q=shoes",
+            "https://example.com/list?q=shoes&page=2",
+            "https://example.com/list?q=shoes&page={page}",
+            2,
+            1,
+        ),
+        # offset based pagination
+        (
+            "https://example.com/search?q=a",
+            "https://example.com/search?q=a&start=20",
+            "https://example.com/search?q=a&start={page}",
+            20,
+            20,
+        ),
+        (
+            "https://example.com/blog/page/3/",
+            "https://example.com/blog/page/4/",
+            "https://example.com/blog/page/{page}/",
+            4,
+            1,
+        ),
+        (
+            "https://example.com/blog",
+            "https://example.com/blog/page/2",
+            "https://example.com/blog/page/{page}",
+            2,
+            1,
+        ),
+        (
+            "https://example.com/list/page-2.html",
+            "https://example.com/list/page-3.html#top",
+            "https://example.com/list/page-{page}.html",
+            3,
+            1,
+        ),
+    ],
+)
+def test_infer_pagination_url_template(
+    current_url: str,
+    next_url: str,
+    template: str,
+    next_page: int,
+    step: int,
+):
+    assert infer_pagination_url_template(current_url, next_url) == {
+        "template": template,
+        "next_page": next_page,
+        "step": step,
+    }
+
+
+@pytest.mark.parametrize(
+    "current_url, next_url",
+    [
+        # other hosts
+        ("https://example.com/list?page=1", "https://other.com/list?page=2"),
+        # several parameters change
+        ("https://example.com/list?page=1&a=1", "https://example.com/list?page=2&a=2"),
+        # both the path and the query change
+        ("https://example.com/a?page=1", "https://example.com/b?page=2"),
+        # a filter rather than a page number
+        ("https://example.com/list", "https://example.com/list?color=5"),
+        # going back
+        ("https://example.com/list?page=3", "https://example.com/list?page=2"),
+        # not a number
+        ("https://example.com/list?cursor=abc", "https://example.com/list?cursor=def"),
+    ],
+)
+def test_infer_pagination_url_template_rejects_non_numbered_links(
+    current_url: str,
+    next_url: str,
+):
+    assert infer_pagination_url_template(current_url, next_url) is None
+
+
+def test_get_pagination_url():
+    template = infer_pagination_url_template(
+        "https://example.com/search?q=a",
+        "https://example.com/search?q=a&start=20",
+    )
+
+    assert [get_pagination_url(template, i) for i in range(3)] == [
+        "https://example.com/search?q=a&start=20",
+        "https://example.com/search?q=a&start=40",
+        "https://example.com/search?q=a&start=60",
+    ]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from typing import List
+
+import pytest
+
+from npiai import Context
+from npiai.error import TruncatedResponseError
+from npiai.tools.scrapers import BaseScraper, SourceItem
+from npiai.tools.scrapers.types import Column
+
+# number of rows a response fits before it is truncated
+MAX_ROWS = 2
+
+
+class ListScraper(BaseScraper):
+    def __init__(self, count: int):
+        super().__init__()
+        self.items = [SourceItem(hash=str(i), data={"n": i}) for i in range(count)]
+        self.cursor = 0
+
+    async def init_data(self, ctx: Context):
+        self.cursor = 0
+
+    async def next_items(self, ctx: Context, count: int) -> List[SourceItem] | None:
+        items = self.items[self.cursor : self.cursor + count]
+        self.cursor += len(items)
+        return items
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = {"items": [], "inflight": 0, "max_inflight": 0}
+
+    async def llm_summarize(ctx, messages, continue_on_length=True, **kwargs):
+        items = json.loads(messages[-1]["content"])
+        calls["items"].append(len(items))
+        calls["inflight"] += 1
+        calls["max_inflight"] = max(calls["max_inflight"], calls["inflight"])
+
+        try:
+            for item in items[:MAX_ROWS]:
+                await asyncio.sleep(0.01)
+                yield {
+                    "__npi_item_index__": str(item["index"]),
+                    "n": str(item["data"]["n"]),
+                }
+        finally:
+            calls["inflight"] -= 1
+
+        if len(items) > MAX_ROWS and not continue_on_length:
+            raise TruncatedResponseError("The summary response was truncated")
+
+    monkeypatch.setattr("npiai.tools.scrapers.base.llm_summarize", llm_summarize)
+
+    return calls
+
+
+@pytest.mark.parametrize("stream_rows", [False, True])
+async def test_truncated_batch_is_split_across_consumers(llm_calls, stream_rows: bool):
+    scraper = ListScraper(8)
+
+    rows = [
+        row
+        async for batch in scraper.summarize_stream(
+            Context(),
+            output_columns=[Column(name="n", type="text", prompt="the number")],
+            batch_size=8,
+            concurrency=2,
+            stream_rows=stream_rows,
+        )
+        for row in batch["items"]
+    ]
+
+    # every item is summarized exactly once and the row numbers do not overlap
+    assert sorted(int(row["values"]["n"]) for row in rows) == list(range(8))
+    assert sorted(row["row_no"] for row in rows) == list(range(1, 9))
+
+    # the halves of the truncated batch run in parallel on the idle consumer
+    assert llm_calls["items"][:3] == [8, 3, 3]
+    assert llm_calls["max_inflight"] == 2
@@ -0,0 +1,133 @@
+import asyncio
+
+import litellm
+import pytest
+
+from npiai.utils import (
+    AdaptiveConcurrency,
+    concurrent_task_runner,
+    is_congestion_error,
+)
+
+
+def rate_limit_error() -> litellm.RateLimitError:
+    return litellm.RateLimitError("rate limited", "openai", "gpt-4o")
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_congestion_errors():
+    assert is_congestion_error(rate_limit_error())
+    assert is_congestion_error(asyncio.TimeoutError())
+    assert is_congestion_error(StatusError(429))
+    assert is_congestion_error(StatusError(503))
+    assert not is_congestion_error(StatusError(500))
+    assert not is_congestion_error(ValueError("invalid selector"))
+
+
+def test_concurrency_grows_additively_up_to_the_max():
+    controller = AdaptiveConcurrency(initial=2, max_concurrency=4)
+
+    # one more worker after a round of `level` healthy tasks
+    for _ in range(3):
+        controller.on_success(1.0)
+
+    assert controller.level == 3
+
+    for _ in range(20):
+        controller.on_success(1.0)
+
+    assert controller.level == 4
+    assert controller.peak == 4
+
+
+def test_concurrency_stops_growing_when_latency_degrades():
+    controller = AdaptiveConcurrency(initial=2, latency_tolerance=2.0)
+    controller.on_success(1.0)
+    level = controller.level
+
+    for _ in range(10):
+        controller.on_success(5.0)
+
+    assert controller.level == level
+
+
+def test_concurrency_is_halved_once_per_burst_of_congestion_errors():
+    controller = AdaptiveConcurrency(initial=8, max_concurrency=8)
+
+    assert not controller.on_error(ValueError("not congestion"))
+    assert controller.level == 8
+
+    assert controller.on_error(rate_limit_error())
+    assert controller.on_error(rate_limit_error())
+    assert controller.level == 4
+    assert controller.errors == 2
+
+
+async def test_runner_retries_congestion_errors():
+    items = list(range(5))
+    failed = set()
+
+    async def fn(queue: asyncio.Queue[int]) -> bool:
+        if not items:
+            return False
+
+        item = items.pop(0)
+
+        if item == 2 and item not in failed:
+            failed.add(item)
+            # put the item back before raising
+            items.insert(0, item)
+            raise rate_limit_error()
+
+        await queue.put(item)
+        return True
+
+    results = [result async for result in concurrent_task_runner(fn, 2)]
+
+    assert sorted(results) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("on_error", ["fail_fast", "collect"])
+async def test_runner_raises_other_errors(on_error):
+    async def fn(queue: asyncio.Queue[int]) -> bool:
+        raise ValueError("boom")
+
+    with pytest.raises((ValueError, ExceptionGroup)) as exc_info:
+        async for _ in concurrent_task_runner(fn, 2, on_error=on_error):
+            pass
+
+    if on_error == "collect":
+        assert len(exc_info.value.exceptions) == 2
+
+
+async def test_runner_scales_workers_with_adaptive_concurrency():
+    remaining = 40
+    running = 0
+    max_running = 0
+
+    async def fn(queue: asyncio.Queue[int]) -> bool:
+        nonlocal remaining, running, max_running
+
+        if remaining <= 0:
+            return False
+
+        remaining -= 1
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+        await queue.put(1)
+        return True
+
+    controller = AdaptiveConcurrency(initial=1, max_concurrency=4)
+    results = [result async for result in concurrent_task_runner(fn, controller)]
+
+    assert len(results) == 40
+    assert controller.level == 4
+    assert max_running > 1
@@ -0,0 +1,68 @@
+import csv
+import io
+from typing import List
+
+import pytest
+
+from npiai.utils.llm_summarize import _CSVRowParser
+
+TABLE = 'id;name;note\n0;apple;"red;\nround"\n1;"pear";\n2;plum\n'
+
+
+def parse(chunks: List[str]) -> List[dict]:
+    parser = _CSVRowParser()
+    rows = []
+
+    for chunk in chunks:
+        rows.extend(parser.feed(chunk))
+
+    return rows + parser.flush()
+
+
+def split(text: str, size: int) -> List[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, len(TABLE)])
+def test_rows_match_csv_dict_reader(size: int):
+    expected = list(csv.DictReader(io.StringIO(TABLE), delimiter=";"))
+
+    assert parse(split(TABLE, size)) == expected
+    assert parse(split(f"```csv\n{TABLE}```\n", size)) == expected
+
+
+def test_rows_are_returned_once_their_line_completes():
+    parser = _CSVRowParser()
+
+    assert parser.feed("id;name\n0;app") == []
+    assert parser.feed("le\n1") == [{"id": "0", "name": "apple"}]
+    assert parser.flush() == [{"id": "1", "name": None}]
+
+
+def test_content_after_the_closing_fence_is_ignored():
+    rows = parse(["```\nid;name\n0;apple\n```\nThe table above lists the fruits.\n"])
+
+    assert rows == [{"id": "0", "name": "apple"}]
+
+
+@pytest.mark.parametrize("size", [1, 3, 100])
+def test_continued_responses_are_joined(size: int):
+    parser = _CSVRowParser()
+    rows = []
+
+    for chunk in split("```csv\nid;name\n0;apple\n1;pe", size):
+        rows.extend(parser.feed(chunk))
+
+    # the continuation reopens the code block
+    parser.new_round()
+
+    for chunk in split("```csv\nar\n2;plum\n```", size):
+        rows.extend(parser.feed(chunk))
+
+    rows.extend(parser.flush())
+
+    assert rows == [
+        {"id": "0", "name": "apple"},
+        {"id": "1", "name": "pear"},
+        {"id": "2", "name": "plum"},
+    ]